@@ -0,0 +1,127 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        # removed between the walk and the stat, mid-rebuild: counts as changed
+        return path, None, None
+    return path, stat.st_size, stat.st_mtime_ns
+
+
+def corpus_fingerprint(paths):
+    """Size and mtime of every file under paths; changes whenever the Act JSON or the Chroma store is rebuilt."""
+    parts = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in sorted(os.walk(path)):
+                for name in sorted(files):
+                    parts.append(_stat(os.path.join(root, name)))
+        elif os.path.exists(path):
+            parts.append(_stat(path))
+    return hash(tuple(parts))
+
+
+def _normalize(vector):
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class AnswerCache:
+    """
+    Semantic question -> answer cache, one namespace per pipeline.
+    A stored answer is served when the new question's embedding is within
+    `threshold` cosine similarity of a cached question AND retrieval returned
+    exactly the same source ids. Entries expire after ttl_seconds, the oldest
+    are dropped past max_entries, and everything is cleared when the
+    corpus files in watch_paths change. Walking the index directories costs
+    real I/O, so they are rechecked at most every recheck_seconds, not per question.
+    """
+
+    def __init__(self, embeddings, watch_paths, threshold=0.95, ttl_seconds=24 * 3600, max_entries=1000,
+                 recheck_seconds=30):
+        self.embeddings = embeddings
+        self.watch_paths = watch_paths
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.recheck_seconds = recheck_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._next_id = 0
+        self._fingerprint = corpus_fingerprint(watch_paths)
+        self._checked = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _check_corpus(self):
+        now = time.monotonic()
+        if now - self._checked < self.recheck_seconds:
+            return
+        self._checked = now
+        fingerprint = corpus_fingerprint(self.watch_paths)
+        if fingerprint != self._fingerprint:
+            self._entries.clear()
+            self._buckets.clear()
+            self._fingerprint = fingerprint
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        bucket = self._buckets[entry["bucket"]]
+        bucket.remove(entry_id)
+        if not bucket:
+            del self._buckets[entry["bucket"]]
+
+    def lookup(self, pipeline, question, source_ids):
+        vector = _normalize(self.embeddings.embed_query(question))
+        bucket_key = (pipeline, frozenset(source_ids))
+        now = time.time()
+        with self._lock:
+            self._check_corpus()
+            best_id, best_score = None, self.threshold
+            for entry_id in list(self._buckets.get(bucket_key, ())):
+                entry = self._entries[entry_id]
+                if now - entry["created"] > self.ttl_seconds:
+                    self._remove(entry_id)
+                    continue
+                score = sum(a * b for a, b in zip(vector, entry["vector"]))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+            if best_id is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            return self._entries[best_id]["answer"]
+
+    def store(self, pipeline, question, source_ids, answer):
+        vector = _normalize(self.embeddings.embed_query(question))
+        bucket_key = (pipeline, frozenset(source_ids))
+        with self._lock:
+            self._check_corpus()
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "bucket": bucket_key,
+                "vector": vector,
+                "answer": answer,
+                "created": time.time(),
+            }
+            self._buckets.setdefault(bucket_key, []).append(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
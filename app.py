@@ -1,4 +1,6 @@
+import importlib
 import os
+from contextlib import closing
 import time
 import sys
 import sqlite3
@@ -11,17 +13,11 @@ if sqlite3.sqlite_version < "3.35":
         pass
 
 
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_community.graphs import Neo4jGraph
-from langchain_huggingface import HuggingFaceEndpointEmbeddings
-from langchain_groq import ChatGroq
-from langchain_core.output_parsers import StrOutputParser
-from langchain_community.vectorstores import Chroma
-from langchain_classic.retrievers import EnsembleRetriever
-from langchain_google_genai import ChatGoogleGenerativeAI
+from chat_history import FULL_TURNS, MAX_TURNS, ChatHistory
+from instrumentation import Recorder, traced
+from startup import PROFILE, Warmup, gated
 
 import streamlit as st
-import pickle
 import json
 if "LANGCHAIN_API_KEY" in st.secrets:
     os.environ["LANGCHAIN_TRACING_V2"] = st.secrets["LANGCHAIN_TRACING_V2"]
@@ -32,263 +28,382 @@ if "LANGCHAIN_API_KEY" in st.secrets:
     os.environ["LANGSMITH_ENDPOINT"] = st.secrets["LANGSMITH_ENDPOINT"]
     os.environ["LANGSMITH_API_KEY"] = st.secrets["LANGSMITH_API_KEY"]
     os.environ["GOOGLE_API_KEY"]= st.secrets["GOOGLE_API_KEY"]
+PROFILE.mark("app imports done")
 st.title("WHO TO SUE NEXT")
-@st.cache_resource
-def get_vector_rag_resources():
-    embeddings = HuggingFaceEndpointEmbeddings(model="BAAI/bge-m3", huggingfacehub_api_token=st.secrets["HF_TOKEN"],
+
+# Everything below is built on warm-up threads (see startup.Warmup), so the page renders
+# first; the heavy LangChain / Chroma / Neo4j / model imports happen inside the builders.
+
+def build_scheduler():
+    # one per process, so concurrent sessions share its batches
+    if st.secrets.get("REQUEST_BATCHING", "off") != "on":
+        return None
+    from request_scheduler import RequestScheduler
+
+    return RequestScheduler(max_batch=int(st.secrets.get("REQUEST_BATCH_SIZE", 16)),
+                            max_wait_ms=float(st.secrets.get("REQUEST_BATCH_WAIT_MS", 5)))
+
+def build_embeddings(scheduler):
+    from embedding_cache import EmbeddingCache, CachedEmbeddings
+    from embedding_service import SharedEmbeddings
+
+    if st.secrets.get("EMBEDDING_BACKEND", "endpoint") == "local":
+        from local_embeddings import LOCAL_MODEL_DIR, LocalEmbeddings
+
+        # int8 ONNX bge-m3 on this machine's CPU; no network round-trip on the query path
+        client = LocalEmbeddings(st.secrets.get("LOCAL_EMBEDDING_MODEL_DIR", LOCAL_MODEL_DIR),
+                                 max_wait_ms=float(st.secrets.get("EMBEDDING_BATCH_WAIT_MS", 5)))
+        # its vectors differ slightly from the endpoint's, so they get their own cache entries
+        cache_model = "BAAI/bge-m3:onnx-qint8"
+    else:
+        from langchain_huggingface import HuggingFaceEndpointEmbeddings
+
+        client = HuggingFaceEndpointEmbeddings(model="BAAI/bge-m3", huggingfacehub_api_token=st.secrets["HF_TOKEN"],
                                                task="feature-extraction")
-    vector_db = Chroma(persist_directory="./chroma_db_store_new",embedding_function=embeddings,collection_name='cpa_legal_index')
-    chroma_retriever = vector_db.as_retriever(search_kwargs={"k": 5})
-    with open('bm25_retriever.pkl', 'rb') as f:
-        bm25_retriever = pickle.load(f)
-    bm25_retriever.k = 5
-    ensemble_retriever = EnsembleRetriever(retrievers=[bm25_retriever, chroma_retriever],weights=[0.5, 0.5])
-    with open('cpa_anchored_refined_v2.json', 'r', encoding='UTF8') as f:
-        data = json.load(f)
-    parent_store = {}
-    for chapter in data:
-        for section in chapter['sections']:
-            parent_store[section['section_id']] = section['original_content']
+        cache_model = "BAAI/bge-m3"
+    if scheduler is not None:
+        # only cache misses reach the scheduler, and they are embedded in batches
+        client = scheduler.embeddings(client)
+    cache = EmbeddingCache(st.secrets.get("EMBEDDING_CACHE_PATH", "./embedding_cache.sqlite3"), cache_model,
+                           max_entries=int(st.secrets.get("EMBEDDING_CACHE_SIZE", 50000)))
+    return SharedEmbeddings(CachedEmbeddings(client, cache))
+
+def build_vector_rag_resources(embeddings):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from context_store import ContextStore
+
     vector_llm = ChatGoogleGenerativeAI(model='gemini-2.5-flash', temperature=0.2)
-    return ensemble_retriever, vector_llm, parent_store
-try:
-    ensemble_retriever, vector_llm, parent_store = get_vector_rag_resources()
-except Exception as e:
-    st.error(e)
+    # 0 packs whole sections, like the original parent_store join
+    context_budget = int(st.secrets.get("HYBRID_CONTEXT_TOKENS", 3000)) or None
+    context_neighbours = int(st.secrets.get("HYBRID_CONTEXT_NEIGHBOURS", 1))
+    rerank = st.secrets.get("RERANKER", "off") == "cross-encoder"
+    # with re-ranking on, the retrievers hand the cross-encoder a deeper candidate set
+    hybrid_k = int(st.secrets.get("RERANK_CANDIDATES", 30)) if rerank else int(st.secrets.get("HYBRID_K", 10))
+    ensemble_k = hybrid_k // 2 if rerank else 5
+    if st.secrets.get("CORPUS_MODE", "single") == "sharded":
+        from sharding import ShardedHybridRetriever
+
+        # many Acts: route to the likely Acts first, then search only their shards
+        ensemble_retriever = ShardedHybridRetriever(
+            embeddings, root=st.secrets.get("SHARDS_ROOT", "./shards"),
+            n_acts=int(st.secrets.get("ROUTER_ACTS", 3)),
+            k=hybrid_k,
+            candidate_depth=int(st.secrets.get("HYBRID_CANDIDATE_DEPTH", 30)),
+            fusion=st.secrets.get("HYBRID_FUSION", "rrf"))
+        context_store = ContextStore(ensemble_retriever.context_sections, budget=context_budget,
+                                     neighbours=context_neighbours)
+    else:
+        from bm25_index import BM25Index, BM25IndexRetriever
+        from dense_index import DenseIndex, DenseIndexRetriever
+
+        with PROFILE.stage("load bm25_index"):
+            bm25_index = BM25Index('./bm25_index')
+        # HYBRID_RETRIEVER="fused" and DENSE_BACKEND="numpy" need ./dense_index, which is not committed:
+        # build it once with `python incremental_index.py dense`
+        if st.secrets.get("HYBRID_RETRIEVER", "ensemble") == "fused":
+            from hybrid_retriever import FusedHybridRetriever
+
+            ensemble_retriever = FusedHybridRetriever(
+                bm25_index=bm25_index, dense_index=DenseIndex('./dense_index'), embeddings=embeddings,
+                k=hybrid_k,
+                candidate_depth=int(st.secrets.get("HYBRID_CANDIDATE_DEPTH", 30)),
+                fusion=st.secrets.get("HYBRID_FUSION", "rrf"))
+        else:
+            from langchain_classic.retrievers import EnsembleRetriever
 
-@st.cache_resource
-def resources():
-    graph= Neo4jGraph(
-        url=st.secrets["NEO4J_URI"],
-        username=st.secrets["NEO4J_USERNAME"],
-        password=st.secrets["NEO4J_PASSWORD"]
-    )
-    embeddings = HuggingFaceEndpointEmbeddings(model="BAAI/bge-m3", huggingfacehub_api_token=st.secrets["HF_TOKEN"],
-                                               task="feature-extraction")
+            if st.secrets.get("DENSE_BACKEND", "chroma") == "numpy":
+                dense_retriever = DenseIndexRetriever(index=DenseIndex('./dense_index'), embeddings=embeddings,
+                                                      k=ensemble_k)
+            else:
+                from langchain_community.vectorstores import Chroma
+                from dense_index import TimedRetriever
+
+                with PROFILE.stage("open chroma"):
+                    vector_db = Chroma(persist_directory="./chroma_db_store_new",embedding_function=embeddings,collection_name='cpa_legal_index')
+                dense_retriever = TimedRetriever(retriever=vector_db.as_retriever(search_kwargs={"k": ensemble_k}),
+                                                 stage="chroma")
+            bm25_retriever = BM25IndexRetriever(index=bm25_index, k=ensemble_k)
+            ensemble_retriever = EnsembleRetriever(retrievers=[bm25_retriever, dense_retriever],weights=[0.5, 0.5])
+        with PROFILE.stage("load context_store"):
+            context_store = ContextStore.load('./context_store.json', anchored_path='cpa_anchored_refined_v2.json',
+                                              budget=context_budget, neighbours=context_neighbours)
+    if rerank:
+        from reranker import RERANKER_MODEL, CrossEncoderReranker, RerankedRetriever
+
+        latency_budget = st.secrets.get("RERANK_LATENCY_MS")
+        reranker = CrossEncoderReranker(
+            model_name=st.secrets.get("RERANKER_MODEL", RERANKER_MODEL),
+            backend=st.secrets.get("RERANKER_BACKEND", "onnx"),
+            latency_budget_ms=float(latency_budget) if latency_budget else None)
+        ensemble_retriever = RerankedRetriever(ensemble_retriever, reranker,
+                                               top_parents=int(st.secrets.get("RERANK_TOP_PARENTS", 3)))
+    return ensemble_retriever, vector_llm, context_store
+
+def build_graph_resources(embeddings, scheduler):
+    sharded = st.secrets.get("CORPUS_MODE", "single") == "sharded"
+    snapshot = st.secrets.get("GRAPH_BACKEND", "neo4j") == "snapshot"
+    if sharded and snapshot:
+        # a sharded corpus keeps one Neo4j database per Act; a snapshot holds a single graph and has none
+        raise ValueError('GRAPH_BACKEND="snapshot" does not support CORPUS_MODE="sharded"; use GRAPH_BACKEND="neo4j"')
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from graph_queries import BATCHED_RETRIEVAL_QUERY, DEFAULT_PARAMS
+
+    graph_params = {
+        "k": int(st.secrets.get("GRAPH_K", DEFAULT_PARAMS["k"])),
+        "threshold": float(st.secrets.get("GRAPH_SCORE_THRESHOLD", DEFAULT_PARAMS["threshold"])),
+        "max_entities": int(st.secrets.get("GRAPH_MAX_ENTITIES", DEFAULT_PARAMS["max_entities"])),
+    }
+    act_router = None
+    if sharded:
+        from sharding import ActRouter
+
+        act_router = ActRouter(st.secrets.get("SHARDS_ROOT", "./shards"))
+    graph_search = None
+    if snapshot:
+        from graph_snapshot import GraphSnapshot
+
+        # exported with python graph_snapshot.py export; graph retrieval runs in process, no Bolt round-trip
+        graph = GraphSnapshot(st.secrets.get("GRAPH_SNAPSHOT_PATH", "./graph_snapshot"))
+        graph_search = lambda vector: graph.context(vector, **graph_params)
+    else:
+        from graph_client import ManagedGraph
+
+        with PROFILE.stage("connect neo4j"):
+            graph = ManagedGraph(
+                st.secrets["NEO4J_URI"], st.secrets["NEO4J_USERNAME"], st.secrets["NEO4J_PASSWORD"],
+                database=st.secrets.get("NEO4J_DATABASE"),
+                max_pool_size=int(st.secrets.get("NEO4J_POOL_SIZE", 20)),
+                acquire_timeout=float(st.secrets.get("NEO4J_ACQUIRE_TIMEOUT", 5)),
+                query_timeout=float(st.secrets.get("NEO4J_QUERY_TIMEOUT", 10)),
+                max_retries=int(st.secrets.get("NEO4J_RETRIES", 3)))
+            graph.driver.verify_connectivity()
+        if scheduler is not None and act_router is None:
+            graph_search = scheduler.graph_search(graph, BATCHED_RETRIEVAL_QUERY, graph_params)
     llm = ChatGoogleGenerativeAI(model='gemini-2.5-flash', temperature=0)
-    return graph, embeddings, llm
-
-try:
-    graph, embeddings, groq_llm = resources()
-except Exception as e:
-    st.error(e)
-    st.stop()
-
-ret_query='''
-CALL db.index.vector.queryNodes('section_embedding',5,$embedding)
-YIELD node as s, score
-WHERE score>0.7
-WITH collect(
-{ type: 'Section',
-    title: s.title,
-    text: s.text,
-    score: score,
-    id: s.id
-}
-) as section_results
-
-CALL db.index.vector.queryNodes('concept_embedding',5,$embedding)
-YIELD node as lc, score
-WHERE score>0.7
-MATCH (section2:Section)-[:DEFINES]->(lc)
-WITH section_results, collect(
-{ type: 'definition',
-
-    term: lc.id,
-    definition: lc.definition,
-
-    score: score,
-    source: section2.title}) as concept_results
-
-UNWIND section_results as sec_res
-MATCH (s:Section {id: sec_res.id})
-OPTIONAL MATCH (s)-[:MENTIONS]->(entity)
-WITH section_results, concept_results, sec_res, labels(entity) as tags, entity
-WITH section_results, concept_results, sec_res, tags, entity,
-CASE
-    WHEN 'Authority' IN tags THEN 'Authority'
-    WHEN 'Offense' IN tags THEN 'Offense'
-    WHEN 'Penalty' IN tags THEN 'Penalty'
-    WHEN 'Remedy' IN tags THEN 'Remedy'
-    WHEN 'Stakeholder' IN tags THEN 'Stakeholder'
-    ELSE head(tags) END AS label
-
-WITH section_results, concept_results, sec_res, collect(DISTINCT entity.id + ' (' +label+ ')') as entities
-
-WITH
-collect({ type: 'Section',
-    title: sec_res.title,
-    text: sec_res.text,
-    score: sec_res.score,
-    mentions: entities
-}) as updated_section, concept_results
-
-RETURN {
-sections: updated_section,
-definitions: concept_results} as context
-
-'''
-
-
-
-
-
-def llm_context(context):
-    llm_query=''
-    if context:
-        if context['definitions']:
-            llm_query += 'Relevant Legal Definitions:\n'
-            for item in context['definitions']:
-                llm_query+=f'Term: {item["term"]}\n'
-                llm_query += f'Source: {item["source"]}\n'
-                llm_query += f'Definition: {item["definition"]}\n'
-
-                llm_query += f'Score: {item["score"]}\n\n'
-        if context['sections']:
-            llm_query += 'Relevant Legal Sections:\n'
-            for item in context['sections']:
-                llm_query += f'Title: {item["title"]}\n'
-                llm_query += f'Text: {item["text"]}\n'
-
-                if item['mentions']:
-                    mentions=[m for m in item['mentions']]
-                    llm_query += f'Mentions: {", ".join(mentions)}\n'
-        else:
-            llm_query += 'Got no relevant legal context from the graph\n'
-            return ''
-    return llm_query
+    return {"graph": graph, "embeddings": embeddings, "llm": llm, "act_router": act_router,
+            "graph_search": graph_search, "graph_params": graph_params}
+
+def build_answer_cache(embeddings):
+    from answer_cache import AnswerCache
+
+    return AnswerCache(
+        embeddings,
+        watch_paths=['cpa_anchored_refined_v2.json', './chroma_db_store_new', './dense_index', './context_store.json', './shards', './graph_snapshot'],
+        threshold=float(st.secrets.get("ANSWER_CACHE_THRESHOLD", 0.95)),
+        ttl_seconds=int(st.secrets.get("ANSWER_CACHE_TTL_SECONDS", 24 * 3600)),
+        max_entries=int(st.secrets.get("ANSWER_CACHE_SIZE", 1000)),
+        recheck_seconds=float(st.secrets.get("ANSWER_CACHE_RECHECK_SECONDS", 30)),
+    )
+
+def build_citation_index(context_store):
+    # in sharded mode "section 35" does not say which Act it means
+    if st.secrets.get("CITATION_FAST_PATH", "on") != "on" or st.secrets.get("CORPUS_MODE", "single") == "sharded":
+        return None
+    from citations import CitationIndex
+
+    return CitationIndex(context_store)
+
+def preload_modules():
+    # what the first question would otherwise import on the script thread
+    for module in ("pipelines", "langchain_core.prompts"):
+        importlib.import_module(module)
+
+@st.cache_resource
+def get_warmup():
+    warmup = Warmup(PROFILE)
+    warmup.start("modules", preload_modules)
+    warmup.start("scheduler", build_scheduler)
+    warmup.start("embeddings", lambda: build_embeddings(warmup.result("scheduler")))
+    warmup.start("hybrid", lambda: build_vector_rag_resources(warmup.result("embeddings")))
+    warmup.start("graph", lambda: build_graph_resources(warmup.result("embeddings"), warmup.result("scheduler")))
+    warmup.start("answer_cache", lambda: build_answer_cache(warmup.result("embeddings")))
+    warmup.start("citations", lambda: build_citation_index(warmup.result("hybrid")[2]))
+    return warmup
+
+@st.cache_resource
+def get_recorder():
+    # per-stage timings of every run; LangSmith stays optional
+    recorder = Recorder(trace_path=st.secrets.get("TRACE_PATH"))
+    metrics_port = int(st.secrets.get("METRICS_PORT", 0))
+    if metrics_port:
+        recorder.serve(metrics_port)
+    return recorder
+
+warmup = get_warmup()
+recorder = get_recorder()
+if st.secrets.get("STARTUP_MODE", "background") == "eager":
+    # the old behaviour: nothing renders until every resource is built
+    warmup.wait_all()
 
 if "history" not in st.session_state:
-    st.session_state["history"] = []
-for history in st.session_state["history"]:
+    st.session_state["history"] = ChatHistory(max_turns=int(st.secrets.get("HISTORY_MAX_TURNS", MAX_TURNS)),
+                                              full_turns=int(st.secrets.get("HISTORY_FULL_TURNS", FULL_TURNS)))
+history = st.session_state["history"]
+past_turns = list(history)
+# only the latest turns are drawn on every rerun; the rest wait behind a toggle
+render_turns = int(st.secrets.get("HISTORY_RENDER_TURNS", 5))
+if len(past_turns) > render_turns and not st.toggle(f"Show {len(past_turns) - render_turns} earlier questions",
+                                                    key="history-earlier"):
+    past_turns = past_turns[-render_turns:]
+for turn in past_turns:
     with st.chat_message("User Question"):
-        st.markdown(history['question'])
+        st.markdown(turn['question'])
 
     col1, col2 = st.columns(2)
+    # contexts are rebuilt / decompressed only while their toggle is on
     with col1:
         st.info("HYBRID (Vector+BM25) RAG")
-        st.markdown(history['hybrid_answer'])
-        with st.expander("Context"):
-            st.markdown(history['hybrid_context'])
+        st.markdown(history.answer(turn, "hybrid"))
+        if st.toggle("Context", key=f"hybrid-context-{turn['id']}"):
+            if warmup.ready("hybrid"):
+                st.markdown(history.hybrid_context(turn, warmup.result("hybrid")[2]))
+            else:
+                st.caption("Context store is still loading")
     with col2:
         st.success("Graph RAG")
-        st.markdown(history['graph_answer'])
-        with st.expander("Context"):
-            st.markdown(history['graph_context'])
-
-
-
-
+        st.markdown(history.answer(turn, "graph"))
+        if st.toggle("Context", key=f"graph-context-{turn['id']}"):
+            st.markdown(history.graph_context(turn))
+
+
+
+
+
+
+
+
+concurrent_mode = st.sidebar.toggle("Run both pipelines concurrently", value=True)
+for resource, state in warmup.status().items():
+    if state.startswith("failed"):
+        st.sidebar.error(f"{resource}: {state}")
+    elif state == "loading":
+        st.sidebar.caption(f"{resource}: loading...")
+if warmup.ready("embeddings"):
+    cache_stats = warmup.result("embeddings").client.cache.stats()
+    st.sidebar.caption(f"Embedding cache: {cache_stats['size']} entries | "
+                       f"{cache_stats['hits']} hits / {cache_stats['misses']} misses")
+if warmup.ready("answer_cache"):
+    answer_stats = warmup.result("answer_cache").stats()
+    st.sidebar.caption(f"Answer cache: {answer_stats['size']} entries | "
+                       f"{answer_stats['hits']} hits / {answer_stats['misses']} misses")
+if warmup.ready("graph") and hasattr(warmup.result("graph")["graph"], "stats"):
+    for query_name, query_stats in warmup.result("graph")["graph"].stats().items():
+        st.sidebar.caption(f"Neo4j {query_name}: {query_stats['count']} queries | "
+                           f"p50 {query_stats['p50_ms']:.0f} / p95 {query_stats['p95_ms']:.0f} / "
+                           f"p99 {query_stats['p99_ms']:.0f} ms | {query_stats['retries']} retries, "
+                           f"{query_stats['failures']} failed")
+if warmup.ready("scheduler") and warmup.result("scheduler") is not None:
+    for batcher_name, batcher_stats in warmup.result("scheduler").stats().items():
+        st.sidebar.caption(f"Batched {batcher_name}: queue {batcher_stats['queue_depth']} "
+                           f"(max {batcher_stats['max_queue_depth']}) | "
+                           f"batch mean {batcher_stats['mean_batch']:.1f} / max {batcher_stats['max_batch']} | "
+                           f"wait {batcher_stats['mean_wait_ms']:.1f}ms")
+if st.secrets.get("ADMIN_PANEL", "off") == "on":
+    with st.sidebar.expander("Pipeline metrics"):
+        rolling = recorder.rolling()
+        if not rolling:
+            st.caption("No questions answered yet")
+        else:
+            st.caption(f"Last {len(recorder.recent)} runs")
+            st.dataframe([{"pipeline": pipeline, "stage": stage, **histogram.stats()}
+                          for (pipeline, stage), histogram in sorted(rolling.items())], hide_index=True)
+            chosen = st.selectbox("Latency histogram", sorted(rolling), format_func=lambda key: f"{key[0]} / {key[1]}")
+            buckets, _, _ = rolling[chosen].cumulative()
+            previous = 0
+            bars = []
+            for i, (bound, seen) in enumerate(buckets):
+                bars.append({"bucket": f"{i:02d} <= {bound:g}ms", "runs": seen - previous})
+                previous = seen
+            st.bar_chart(bars, x="bucket", y="runs")
+        for cache, rate in recorder.cache_hit_rates().items():
+            st.caption(f"{cache} cache: {rate['hit_rate']:.0%} hit rate ({rate['hits']} / {rate['hits'] + rate['misses']})")
+        for pipeline, tokens in recorder.tokens().items():
+            if tokens["runs"]:
+                st.caption(f"{pipeline}: ~{tokens['prompt'] / tokens['runs']:.0f} prompt / "
+                           f"~{tokens['completion'] / tokens['runs']:.0f} completion tokens per run")
+PROFILE.mark("first render")
+with st.sidebar.expander("Startup profile"):
+    for stage in PROFILE.report():
+        st.caption(f"+{stage['start_ms']:.0f}ms {stage['stage']}: {stage['duration_ms']:.0f}ms ({stage['thread']})")
 
 if prompt:=st.chat_input("Ask a question about Indian consumer protection law"):
     st.chat_message("user").markdown(prompt)
     col1, col2 = st.columns(2)
-    hybrid_answer=""
-    hybrid_retrieved_context=""
-    graph_answer=""
-    graph_retrieved_context=""
     with col1:
         st.subheader("Vector BM25")
         status_vector_bm25 = st.status("Running hybrid (Vector+BM25) search", expanded=True)
-        try:
-            ensemble_retriever, vector_llm, parent_store= get_vector_rag_resources()
-            status_vector_bm25.write("Retrieving relevant context")
-            docs=ensemble_retriever.invoke(prompt)
-            hybrid_context_list=[]
-            seen_ids=set()
-            for doc in docs:
-                p_id=doc.metadata.get("parent_section_id")
-                if p_id and p_id not in seen_ids:
-                    hybrid_context_list.append(parent_store[p_id])
-                    seen_ids.add(p_id)
-            hybrid_context_test= "\n\n".join(hybrid_context_list)
-            with st.expander("Read context"):
-                st.markdown(hybrid_context_test)
-
-            status_vector_bm25.write("Generating answer from the retrieved context")
-            template = '''
-            You are an expert Legal Assistant for Indian Consumer Law.
-            Answer the user's question STRICTLY based on the provided context below.
-            Rules:
-            1. If the answer is not in the context, state "I cannot find the answer in the provided legal documents."
-            2. Use the "Relevant Sections" to support your legal arguments.
-            Context: {context}
-    
-            My question is {question}
-            
-            '''
-            prompt_template = ChatPromptTemplate.from_template(template)
-            chain = prompt_template | vector_llm | StrOutputParser()
-            hybrid_answer=chain.invoke({"context": hybrid_context_test,"question": prompt})
-            status_vector_bm25.update(label="Hybrid RAG(vector+bm25) complete", state="complete", expanded=False)
-            st.markdown(hybrid_answer)
-
-
-        except Exception as e:
-            status_vector_bm25.write("An error occured")
-
-
+        with st.expander("Read context"):
+            hybrid_context_placeholder = st.empty()
+        hybrid_answer_placeholder = st.empty()
     with col2:
         st.subheader("Graph RAG")
         status_graph_rag = st.status("Traversing the graph", expanded=True)
-
-        try:
-            graph, embeddings, groq_llm= resources()
-            status_graph_rag.write("Querying Neo4j graph on vector embedding index")
-            user_query_vector = embeddings.embed_query(prompt)
-            result = graph.query(ret_query, params={'embedding': user_query_vector})
-            if not result:
-                context = None
-            else:
-                context = result[0]['context']
-            graph_context_text = llm_context(context)
-            if not graph_context_text:
-                graph_context_text = "No relevant context from the graph was found"
-            status_graph_rag.write("graph context retrieved")
-            with st.expander("Read context while waiting(avoiding token limit/min"):
-                st.markdown(graph_context_text)
-
-
-            
-            status_graph_rag.write(f"Generating the answer")
-
-            system_prompt = """
-            You are an expert Legal Assistant for Indian Consumer Law.
-            Answer the user's question STRICTLY based on the provided context below.
-    
-            Rules:
-            1. Use the "Relevant Definitions" to clarify terms.
-            2. Use the "Relevant Sections" to support your legal arguments.
-            3. Pay special attention to "Connected Entities" to understand who is responsible (e.g., Authorities vs Stakeholders).
-            4. If the answer is not in the context, state "I cannot find the answer in the provided legal documents."
-    
-            Context:
-            {llm_query}
-            """
-            prompt_template = ChatPromptTemplate.from_messages([('system', system_prompt), ('user', "{question}")])
-            chain = prompt_template | groq_llm | StrOutputParser()
-            response=''
-            message_placeholder=st.empty()
-
-            for chunk in chain.stream({'llm_query': graph_context_text, 'question': prompt}):
-                response+=chunk
-                message_placeholder.markdown(response)
-            status_graph_rag.update(label="Graph RAG Complete!", state="complete", expanded=False)
-
-
-
-
-        except Exception as e:
-            st.error(e)
-
-    st.session_state["history"].append({
-        "question": prompt,
-        "hybrid_answer": hybrid_answer,
-        "hybrid_context": hybrid_context_test,
-        "graph_answer": response,
-        "graph_context": graph_context_text
-    })
-
-
-
-
+        with st.expander("Read context while waiting(avoiding token limit/min"):
+            graph_context_placeholder = st.empty()
+        graph_answer_placeholder = st.empty()
+
+    ui = {
+        "hybrid": {"status": status_vector_bm25, "context": hybrid_context_placeholder,
+                   "answer": hybrid_answer_placeholder, "label": "Hybrid RAG(vector+bm25)"},
+        "graph": {"status": status_graph_rag, "context": graph_context_placeholder,
+                  "answer": graph_answer_placeholder, "label": "Graph RAG"},
+    }
+    answers = {"hybrid": "", "graph": ""}
+    contexts = {"hybrid": "", "graph": ""}
+    hybrid_units = None
+    hybrid_expand = True
+    timings = {}
+    first_tokens = {}
+    failed = set()
+
+    from pipelines import hybrid_pipeline, graph_pipeline, run_pipelines
+
+    # a cache that is still loading is skipped rather than waited for
+    answer_cache = warmup.result("answer_cache") if warmup.ready("answer_cache") else None
+    citations = warmup.result("citations") if warmup.ready("citations") else None
+    # each pipeline waits only for its own resources
+    pipelines = {
+        "hybrid": gated(warmup, "hybrid", lambda hybrid: hybrid_pipeline(prompt, *hybrid, answer_cache, citations)),
+        "graph": gated(warmup, "graph", lambda graph_rag: graph_pipeline(
+            prompt, graph_rag["graph"], graph_rag["embeddings"], graph_rag["llm"], answer_cache,
+            graph_rag["act_router"], graph_rag["graph_search"], graph_rag["graph_params"], citations)),
+    }
+    # every stage is timed; the last status line of each column shows where the time went
+    pipelines = {name: traced(recorder, name, prompt, pipeline) for name, pipeline in pipelines.items()}
+    run_started = time.perf_counter()
+    # if Streamlit stops this run (a new question, a rerun), leaving the with block
+    # cancels the pipelines still generating instead of letting them run on
+    with closing(run_pipelines(pipelines, concurrent=concurrent_mode)) as events:
+        for name, kind, payload in events:
+            column = ui[name]
+            if kind == "status":
+                column["status"].write(payload)
+            elif kind == "context":
+                contexts[name] = payload
+                column["context"].markdown(payload)
+            elif kind == "sources":
+                hybrid_units, hybrid_expand = payload
+            elif kind == "token":
+                if name not in first_tokens:
+                    first_tokens[name] = time.perf_counter() - run_started
+                answers[name] += payload
+                column["answer"].markdown(answers[name])
+            elif kind == "error":
+                failed.add(name)
+                column["status"].write("An error occured")
+                column["status"].update(label=f"{column['label']} failed", state="error", expanded=True)
+                column["answer"].error(payload)
+            elif kind == "done":
+                timings[name] = payload
+                if name not in failed:
+                    first_token = f", first words after {first_tokens[name]:.2f}s" if name in first_tokens else ""
+                    column["status"].update(label=f"{column['label']} complete in {payload:.2f}s{first_token}",
+                                            state="complete", expanded=False)
+
+    mode = "concurrent" if concurrent_mode else "sequential"
+    st.caption(f"Hybrid: {timings.get('hybrid', 0):.2f}s (first token {first_tokens.get('hybrid', 0):.2f}s) | "
+               f"Graph: {timings.get('graph', 0):.2f}s (first token {first_tokens.get('graph', 0):.2f}s) | "
+               f"Total ({mode}): {time.perf_counter() - run_started:.2f}s")
+
+    # the hybrid context is stored as the units it was packed from, not as text
+    history.add(prompt, answers, hybrid_units, contexts["graph"], hybrid_expand)
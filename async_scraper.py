@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+import httpx
+
+from scrapconsumeract2019 import (BASE_URL, CENTRAL_ABV, CENTRAL_STATEHANDLE, HEADERS, parse_chapter_links,
+                                  parse_section_links, section_api_url, section_text)
+
+
+# Acts to scrape: the handle path under BASE_URL, and the abv / statehandle India Code files the Act under
+ACTS = [{"handle": "/handle/123456789/15256", "abv": CENTRAL_ABV, "statehandle": CENTRAL_STATEHANDLE}]
+
+
+def parse_act(arg):
+    """An Act given on the command line as handle[,abv,statehandle]; a bare handle is a central Act."""
+    handle, _, rest = arg.partition(",")
+    abv, _, statehandle = rest.partition(",")
+    return {"handle": handle, "abv": abv or CENTRAL_ABV, "statehandle": statehandle or CENTRAL_STATEHANDLE}
+
+
+class TokenBucket:
+    """Politeness limit: on average `rate` requests per second, bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HttpCache:
+    """
+    On-disk cache of GET responses, one JSON file per URL. Stored validators
+    (ETag / Last-Modified) are sent back as a conditional request, and a
+    content hash tells whether a 200 response actually changed the body.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url):
+        path = self._path(url)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def put(self, url, response, body):
+        entry = {
+            "url": url,
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "content_hash": hashlib.sha256(body.encode("utf-8")).hexdigest(),
+            "body": body,
+        }
+        tmp = self._path(url) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, self._path(url))
+        return entry
+
+
+class AsyncScraper:
+    """
+    Scrapes Acts from indiacode.nic.in (or any server laid out like it, such as
+    the fixture server in scraper_fixtures.py) over one pooled connection set,
+    with bounded concurrency and a token-bucket rate limit.
+    """
+
+    def __init__(self, base_url=BASE_URL, cache_dir="./http_cache", concurrency=8, rate=4.0, retries=3,
+                 timeout=30.0):
+        self.base_url = base_url.rstrip("/")
+        self.cache = HttpCache(cache_dir)
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate, capacity=concurrency)
+        self.retries = retries
+        self.timeout = timeout
+        self.stats = {"requests": 0, "not_modified": 0, "unchanged": 0, "changed": 0, "failed": 0}
+        self._semaphore = None
+        self._client = None
+
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._client = httpx.AsyncClient(
+            headers=HEADERS, timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._client.aclose()
+
+    async def fetch(self, url):
+        """Body of url, served from the cache on 304. Returns None after repeated failures."""
+        cached = self.cache.get(url)
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        error = f"no attempt made (retries={self.retries})"
+        for attempt in range(self.retries):
+            await self.bucket.acquire()
+            async with self._semaphore:
+                try:
+                    self.stats["requests"] += 1
+                    response = await self._client.get(url, headers=headers)
+                except httpx.TransportError as e:
+                    error = e
+                else:
+                    if response.status_code == 304 and cached:
+                        self.stats["not_modified"] += 1
+                        return cached["body"]
+                    if response.status_code == 200:
+                        entry = self.cache.put(url, response, response.text)
+                        changed = not cached or cached["content_hash"] != entry["content_hash"]
+                        self.stats["changed" if changed else "unchanged"] += 1
+                        return entry["body"]
+                    error = f"HTTP {response.status_code}"
+                    if response.status_code < 500 and response.status_code != 429:
+                        break
+            if attempt < self.retries - 1:
+                await asyncio.sleep(0.5 * 2 ** attempt)
+
+        self.stats["failed"] += 1
+        print(f"Failed to fetch {url}: {error}")
+        return None
+
+    async def scrape_section(self, title, full_url):
+        api_url = section_api_url(full_url, self.base_url)
+        if not api_url:
+            return None
+        body = await self.fetch(api_url)
+        if body is None:
+            return None
+        try:
+            content = section_text(json.loads(body))
+        except (ValueError, KeyError):
+            return None
+        return {"title": title, "content": content, "url": full_url}
+
+    async def scrape_chapter(self, chapter):
+        body = await self.fetch(chapter["url"])
+        if body is None:
+            return {"chapter_name": chapter["title"], "sections": []}
+        section_links = parse_section_links(body, self.base_url)
+        sections = await asyncio.gather(*(self.scrape_section(title, url) for title, url in section_links))
+        print(f"   {chapter['title']}: {len(section_links)} sections")
+        return {"chapter_name": chapter["title"], "sections": [s for s in sections if s]}
+
+    async def scrape_act(self, act):
+        """
+        Same structure scrapconsumeract2019.scrape_entire_act writes: chapters with their sections.
+        act: {"handle", "abv", "statehandle"}, as in ACTS.
+        """
+        body = await self.fetch(self.base_url + act["handle"])
+        if body is None:
+            return []
+        chapters = parse_chapter_links(body, self.base_url, act.get("abv", CENTRAL_ABV),
+                                       act.get("statehandle", CENTRAL_STATEHANDLE))
+        print(f"{act['handle']}: {len(chapters)} chapters")
+        return list(await asyncio.gather(*(self.scrape_chapter(chapter) for chapter in chapters)))
+
+
+async def scrape_acts(acts, output_dir=".", **scraper_kwargs):
+    """Scrapes every Act (see ACTS) concurrently and writes one act_<handle id>.json per Act to output_dir."""
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+    async with AsyncScraper(**scraper_kwargs) as scraper:
+        scraped = await asyncio.gather(*(scraper.scrape_act(act) for act in acts))
+    outputs = []
+    for act, chapters in zip(acts, scraped):
+        filename = os.path.join(output_dir, f"act_{act['handle'].rstrip('/').rsplit('/', 1)[-1]}.json")
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(chapters, f, indent=4, ensure_ascii=False)
+        outputs.append(filename)
+    print(f"Scraped {len(acts)} acts in {time.perf_counter() - started:.1f}s: {scraper.stats}")
+    return outputs
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python async_scraper.py /handle/123456789/15256 "<state act handle>,<abv>,<statehandle>"
+    asyncio.run(scrape_acts([parse_act(arg) for arg in sys.argv[1:]] or ACTS))
@@ -1,149 +1,159 @@
 import json
 import re
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 
-def parse_atomic_units(text):
-
-    clean_text = text.replace("\r\n", " ").replace("\n", " ").strip()
+NEWLINES = re.compile(r"\r\n|\n")
+# A new atomic unit starts at a clause marker like (1), (a), (iv) or at a proviso
+UNIT_MARKER = re.compile(r'\(\w+\)|Provided that')
+# Matches (1) "advertisement"
+DEFINITION_HEADER = re.compile(r'\(\d+\)\s*".+?"')
+QUOTED_TERM = re.compile(r'"(.+?)"')
 
-    pattern = r'(\(\w+\)|Provided that)'
 
-    parts = re.split(pattern, clean_text)
-    chunks = []
-    current_chunk = ""
+def clean(text):
+    return NEWLINES.sub(" ", text).strip()
 
-    for part in parts:
-        part = part.strip()
-        if not part:
-            continue
-
-        if re.match(pattern, part):
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-            current_chunk = part
-        else:
-            current_chunk += " " + part
 
+def iter_atomic_units(text):
+    """Single scan over the section text; every marker closes the running unit and opens the next."""
+    clean_text = clean(text)
+    current_chunk = ""
+    position = 0
+    for marker in UNIT_MARKER.finditer(clean_text):
+        fragment = clean_text[position:marker.start()].strip()
+        if fragment:
+            current_chunk += " " + fragment
+        if current_chunk:
+            yield current_chunk.strip()
+        current_chunk = marker.group()
+        position = marker.end()
+
+    fragment = clean_text[position:].strip()
+    if fragment:
+        current_chunk += " " + fragment
     if current_chunk:
-        chunks.append(current_chunk.strip())
+        yield current_chunk.strip()
 
-    return chunks
 
+def parse_atomic_units(text):
+    return list(iter_atomic_units(text))
 
-def parse_definitions_by_quotes(text):
 
-    clean_text = text.replace("\r\n", " ").replace("\n", " ").strip()
+def iter_definitions_by_quotes(text):
+    """A definition is a (n) "term" header plus the text up to the next header; text without a header is dropped."""
+    clean_text = clean(text)
+    current_header = ""
+    position = 0
+    for header in DEFINITION_HEADER.finditer(clean_text):
+        fragment = clean_text[position:header.start()].strip()
+        if fragment and current_header:
+            yield f"{current_header} {fragment}"
+        current_header = header.group()
+        position = header.end()
 
-    # Matches (1) "advertisement"
-    pattern = r'(\(\d+\)\s*".+?")'
+    fragment = clean_text[position:].strip()
+    if fragment and current_header:
+        yield f"{current_header} {fragment}"
 
-    parts = re.split(pattern, clean_text)
 
-    definitions = []
-    current_header = ""
+def parse_definitions_by_quotes(text):
+    return list(iter_definitions_by_quotes(text))
+
+
+def iter_section_units(chapter_name, sec_id, title, raw_content):
+    # --- BRANCHING LOGIC ---
+    if str(sec_id) == "2":
+        # STRATEGY FOR DEFINITIONS
+        for i, unit_text in enumerate(iter_definitions_by_quotes(raw_content)):
+            # Finds the first text inside double quotes, e.g., "consumer"
+            term_match = QUOTED_TERM.search(unit_text)
+            term_value = term_match.group(1) if term_match else "Unknown"
+
+            context_str = (
+                f"Chapter: {chapter_name} | "
+                f"Section: {sec_id} {title} | "
+                f"Definition: {unit_text}"
+            )
+
+            yield {
+                "chunk_index": i,
+                "unit_type": "definition",
+                "term": term_value,
+                "text": unit_text,
+                "enriched_context": context_str,
+                "parent_section_id": sec_id
+            }
+        return
 
-    for part in parts:
-        part = part.strip()
-        if not part:
-            continue
+    # STRATEGY FOR STANDARD SECTIONS
+    prev_text = None
+    for i, unit_text in enumerate(iter_atomic_units(raw_content)):
+        is_proviso = unit_text.startswith("Provided")
+        unit_type = "proviso" if is_proviso else "clause"
+
+        anchor_text = ""
+        if is_proviso and prev_text is not None:
+            anchor_text = f"[Context from Preceding Clause: {prev_text[:200]}...] "
+
+        context_str = (
+            f"Chapter: {chapter_name} | "
+            f"Section: {sec_id} {title} | "
+            f"Content: {anchor_text}{unit_text}"
+        )
+
+        yield {
+            "chunk_index": i,
+            "unit_type": unit_type,
+            "text": unit_text,
+            "enriched_context": context_str,
+            "parent_section_id": sec_id
+        }
+        prev_text = unit_text
+
+
+def iter_sections(data):
+    """Yields (chapter_name, section_id, title, raw_content) for every section of a cleaned Act."""
+    if isinstance(data, dict):
+        data = [data]
+    for chapter in data:
+        chapter_name = chapter.get("chapter_name", "Unknown Chapter")
+        for section in chapter.get("sections", []):
+            yield chapter_name, section.get("section", ""), section.get("title", ""), section.get("content", "")
 
-        if re.match(pattern, part):
-            current_header = part
-        elif current_header:
-            full_definition = f"{current_header} {part}"
-            definitions.append(full_definition)
-            current_header = ""
-        else:
-            pass
 
-    return definitions
+def load_act(input_filename):
+    if not os.path.exists(input_filename):
+        print(f"Error: {input_filename} not found.")
+        return None
+    with open(input_filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
 
 
 def process_file(input_filename, output_filename):
-    if not os.path.exists(input_filename):
-        print(f"Error: {input_filename} not found.")
+    """Writes the nested chapter -> section -> atomic_units JSON the indexers and app.py read."""
+    data = load_act(input_filename)
+    if data is None:
         return
 
-    with open(input_filename, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
     if isinstance(data, dict):
         data = [data]
 
     processed_data = []
-
     for chapter in data:
         chapter_name = chapter.get("chapter_name", "Unknown Chapter")
         processed_sections = []
-
         for section in chapter.get("sections", []):
-            title = section.get("title", "")
             sec_id = section.get("section", "")
+            title = section.get("title", "")
             raw_content = section.get("content", "")
-
-            atomic_units_objects = []
-
-            # --- BRANCHING LOGIC ---
-            if str(sec_id) == "2":
-                # STRATEGY FOR DEFINITIONS
-                raw_chunks = parse_definitions_by_quotes(raw_content)
-
-                for i, unit_text in enumerate(raw_chunks):
-                    # --- NEW LOGIC: Extract the Term ---
-                    # Finds the first text inside double quotes, e.g., "consumer"
-                    term_match = re.search(r'"(.+?)"', unit_text)
-                    term_value = term_match.group(1) if term_match else "Unknown"
-
-                    context_str = (
-                        f"Chapter: {chapter_name} | "
-                        f"Section: {sec_id} {title} | "
-                        f"Definition: {unit_text}"
-                    )
-
-                    atomic_units_objects.append({
-                        "chunk_index": i,
-                        "unit_type": "definition",
-                        "term": term_value,  # <--- NEW KEY ADDED HERE
-                        "text": unit_text,
-                        "enriched_context": context_str,
-                        "parent_section_id": sec_id
-                    })
-
-            else:
-                # STRATEGY FOR STANDARD SECTIONS
-                raw_chunks = parse_atomic_units(raw_content)
-
-                for i, unit_text in enumerate(raw_chunks):
-                    is_proviso = unit_text.startswith("Provided")
-                    unit_type = "proviso" if is_proviso else "clause"
-
-                    anchor_text = ""
-                    if is_proviso and i > 0:
-                        prev_text = raw_chunks[i - 1]
-                        anchor_text = f"[Context from Preceding Clause: {prev_text[:200]}...] "
-
-                    context_str = (
-                        f"Chapter: {chapter_name} | "
-                        f"Section: {sec_id} {title} | "
-                        f"Content: {anchor_text}{unit_text}"
-                    )
-
-                    atomic_units_objects.append({
-                        "chunk_index": i,
-                        "unit_type": unit_type,
-                        "text": unit_text,
-                        "enriched_context": context_str,
-                        "parent_section_id": sec_id
-                    })
-
             processed_sections.append({
                 "section_id": sec_id,
                 "title": title,
                 "original_content": raw_content,
-                "atomic_units": atomic_units_objects
+                "atomic_units": list(iter_section_units(chapter_name, sec_id, title, raw_content))
             })
-
         processed_data.append({
             "chapter_name": chapter_name,
             "sections": processed_sections
@@ -155,7 +165,55 @@ def process_file(input_filename, output_filename):
     print(f"Success! Processed data saved to: {output_filename}")
 
 
+def process_file_jsonl(input_filename, output_filename, act_id=None):
+    """
+    Streams one JSON object per atomic unit to output_filename, each tagged with
+    its act, chapter and section title. Only the output is streamed: the Act is
+    read whole (one Act is a few MB), but no units are held beyond the current section.
+    """
+    data = load_act(input_filename)
+    if data is None:
+        return 0
+    if act_id is None:
+        act_id = os.path.splitext(os.path.basename(input_filename))[0]
+
+    count = 0
+    with open(output_filename, 'w', encoding='utf-8') as f:
+        for chapter_name, sec_id, title, raw_content in iter_sections(data):
+            for unit in iter_section_units(chapter_name, sec_id, title, raw_content):
+                unit["act_id"] = act_id
+                unit["chapter_name"] = chapter_name
+                unit["section_title"] = title
+                f.write(json.dumps(unit, ensure_ascii=False))
+                f.write("\n")
+                count += 1
+    return count
+
+
+def _process_act(job):
+    input_filename, output_filename = job
+    return input_filename, process_file_jsonl(input_filename, output_filename)
+
+
+def process_acts(input_filenames, output_dir, max_workers=None):
+    """Chunks many cleaned Acts in parallel, one <act>.jsonl per input file in output_dir."""
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [
+        (name, os.path.join(output_dir, os.path.splitext(os.path.basename(name))[0] + ".jsonl"))
+        for name in input_filenames
+    ]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for input_filename, count in pool.map(_process_act, jobs):
+            print(f"{input_filename}: {count} atomic units")
+
+
 # --- Execution Block ---
 if __name__ == "__main__":
-    input = "clean_data.json"
-    process_file(input, "cpa_anchored_refined_v2.json")
\ No newline at end of file
+    import sys
+
+    if len(sys.argv) > 2:
+        # python atomic_chunking.py <output_dir> <act1.json> <act2.json> ...
+        process_acts(sys.argv[2:], sys.argv[1])
+    else:
+        input = "clean_data.json"
+        process_file(input, "cpa_anchored_refined_v2.json")
@@ -0,0 +1,81 @@
+"""
+Chroma retriever vs the in-process DenseIndex: search latency and recall@5.
+
+Both backends are queried with the same precomputed query vectors, so only
+the search itself is timed. Exact float32 search over the vectors stored in
+Chroma is the ground truth, which shows what HNSW and quantization give up.
+
+    python -m benchmarks.dense_vs_chroma
+"""
+import os
+import statistics
+import tempfile
+import time
+
+from dotenv import load_dotenv
+
+from benchmarks.golden import QUESTIONS
+from dense_index import DenseIndex, export_chroma_collection
+
+CHROMA_PATH = "./chroma_db_store_new"
+COLLECTION = "cpa_legal_index"
+K = 5
+REPEATS = 20
+
+
+def row_key(doc):
+    return doc.metadata.get("parent_section_id"), doc.metadata.get("chunk_index")
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))]
+
+
+def time_search(search, query_vectors):
+    samples = []
+    results = []
+    for vector in query_vectors:
+        for _ in range(REPEATS):
+            started = time.perf_counter()
+            result = search(vector)
+            samples.append((time.perf_counter() - started) * 1000)
+        results.append(result)
+    return samples, results
+
+
+def main():
+    load_dotenv()
+    from langchain_community.vectorstores import Chroma
+    from langchain_huggingface import HuggingFaceEndpointEmbeddings
+
+    embeddings = HuggingFaceEndpointEmbeddings(model="BAAI/bge-m3", task="feature-extraction",
+                                               huggingfacehub_api_token=os.environ.get("HF_TOKEN"))
+    query_vectors = embeddings.embed_documents(QUESTIONS)
+
+    vector_db = Chroma(persist_directory=CHROMA_PATH, embedding_function=embeddings, collection_name=COLLECTION)
+    backends = {
+        "chroma": lambda v: [row_key(doc) for doc in vector_db.similarity_search_by_vector(v, k=K)],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for dtype in ("float32", "float16", "int8"):
+            index_dir = os.path.join(tmp, dtype)
+            export_chroma_collection(CHROMA_PATH, COLLECTION, index_dir, dtype)
+            index = DenseIndex(index_dir)
+            backends[f"numpy-{dtype}"] = (
+                lambda v, index=index: [row_key(index.document(int(i))) for i in index.search(v, K)[0]]
+            )
+
+        reports = {name: time_search(search, query_vectors) for name, search in backends.items()}
+
+    truth = reports["numpy-float32"][1]
+    print(f"{len(QUESTIONS)} queries x {REPEATS} repeats, k={K}")
+    print(f"{'backend':<16}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}{'recall@5':>10}")
+    for name, (samples, results) in reports.items():
+        recall = statistics.mean(len(set(r) & set(t)) / K for r, t in zip(results, truth))
+        print(f"{name:<16}{percentile(samples, 50):>10.3f}{percentile(samples, 95):>10.3f}"
+              f"{statistics.mean(samples):>10.3f}{recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+EnsembleRetriever (BM25 + dense, RRF) vs FusedHybridRetriever on the same indexes.
+
+Query vectors are computed once up front and served from memory, so the
+timings cover retrieval and fusion only. Needs ./bm25_index and
+./dense_index (python dense_index.py).
+
+    python -m benchmarks.fused_hybrid
+"""
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+from langchain_classic.retrievers import EnsembleRetriever
+from langchain_core.embeddings import Embeddings
+
+from benchmarks.dense_vs_chroma import QUESTIONS, percentile
+from bm25_index import BM25Index, BM25IndexRetriever
+from dense_index import DenseIndex, DenseIndexRetriever
+from hybrid_retriever import FusedHybridRetriever
+from pipelines import retrieve_parent_ids
+
+REPEATS = 200
+
+
+class PrecomputedEmbeddings(Embeddings):
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_query(self, text):
+        return self.vectors[text]
+
+    def embed_documents(self, texts):
+        return [self.vectors[text] for text in texts]
+
+
+def time_retriever(retriever):
+    samples = []
+    for question in QUESTIONS:
+        for _ in range(REPEATS):
+            started = time.perf_counter()
+            retrieve_parent_ids(retriever, question)
+            samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main():
+    load_dotenv()
+    from langchain_huggingface import HuggingFaceEndpointEmbeddings
+
+    client = HuggingFaceEndpointEmbeddings(model="BAAI/bge-m3", task="feature-extraction",
+                                           huggingfacehub_api_token=os.environ.get("HF_TOKEN"))
+    embeddings = PrecomputedEmbeddings(dict(zip(QUESTIONS, client.embed_documents(QUESTIONS))))
+
+    bm25_index = BM25Index("./bm25_index")
+    dense_index = DenseIndex("./dense_index")
+    retrievers = {
+        "ensemble": EnsembleRetriever(
+            retrievers=[BM25IndexRetriever(index=bm25_index, k=5),
+                        DenseIndexRetriever(index=dense_index, embeddings=embeddings, k=5)],
+            weights=[0.5, 0.5]),
+        "fused-rrf-depth5": FusedHybridRetriever(bm25_index=bm25_index, dense_index=dense_index,
+                                                 embeddings=embeddings, candidate_depth=5),
+        "fused-rrf-depth30": FusedHybridRetriever(bm25_index=bm25_index, dense_index=dense_index,
+                                                  embeddings=embeddings, candidate_depth=30),
+        "fused-weighted": FusedHybridRetriever(bm25_index=bm25_index, dense_index=dense_index,
+                                               embeddings=embeddings, fusion="weighted"),
+    }
+
+    baseline = {q: retrieve_parent_ids(retrievers["ensemble"], q) for q in QUESTIONS}
+    print(f"{len(QUESTIONS)} queries x {REPEATS} repeats")
+    print(f"{'retriever':<20}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}{'same parents':>14}")
+    for name, retriever in retrievers.items():
+        samples = time_retriever(retriever)
+        same = statistics.mean(retrieve_parent_ids(retriever, q) == baseline[q] for q in QUESTIONS)
+        print(f"{name:<20}{percentile(samples, 50):>10.3f}{percentile(samples, 95):>10.3f}"
+              f"{statistics.mean(samples):>10.3f}{same:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
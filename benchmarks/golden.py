@@ -0,0 +1,33 @@
+"""
+Golden query set: CPA 2019 questions labelled with the parent_section_ids that answer them.
+
+The ids are the Act's section numbers, as stored in every child unit's
+parent_section_id. The first id is the section a lawyer would cite first;
+definitions asked about by name are labelled with section 2 alone.
+"""
+
+GOLDEN = [
+    ("what is unfair trade practice", ["2"]),
+    ("how to file a complaint", ["35"]),
+    ("who is a consumer", ["2"]),
+    ("what is the pecuniary jurisdiction of the District Commission", ["34"]),
+    ("penalty for false or misleading advertisement", ["21", "89"]),
+    ("what is product liability", ["2", "83"]),
+    ("can an e-commerce entity be held liable", ["94", "86"]),
+    ("time limit for filing a complaint", ["69"]),
+    ("how to appeal against an order of the State Commission", ["51"]),
+    ("what are the powers of the Central Consumer Protection Authority", ["18"]),
+    ("what is a defect in goods", ["2"]),
+    ("what is deficiency in service", ["2"]),
+    ("who can file a class action", ["35"]),
+    ("what is mediation under the Act", ["37", "74", "79"]),
+    ("punishment for manufacturing adulterated products", ["90"]),
+    ("what are the rights of consumers", ["2"]),
+    ("who is a product seller", ["2"]),
+    ("what happens if an order of the District Commission is not complied with", ["71", "72"]),
+    ("what is an unfair contract", ["2"]),
+    ("composition of the National Commission", ["54"]),
+]
+
+QUESTIONS = [question for question, _ in GOLDEN]
+EXPECTED = dict(GOLDEN)
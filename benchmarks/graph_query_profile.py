@@ -0,0 +1,107 @@
+"""
+Legacy vs lean graph retrieval Cypher: PROFILE db hits and latency.
+
+Runs against any Neo4j holding the ingested graph, e.g. a local container:
+
+    docker run -d -p 7687:7687 -e NEO4J_AUTH=neo4j/password neo4j:5
+    NEO4J_URI=bolt://localhost:7687 NEO4J_USERNAME=neo4j NEO4J_PASSWORD=password python graph_ingest.py
+    NEO4J_URI=bolt://localhost:7687 NEO4J_USERNAME=neo4j NEO4J_PASSWORD=password python -m benchmarks.graph_query_profile
+
+Question vectors are computed once up front (EMBEDDING_BACKEND picks the
+model, as for the index builds), so only the Cypher is measured. "batched"
+is the lean query over all questions in one call, reported per question.
+"""
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+from benchmarks.dense_vs_chroma import QUESTIONS, percentile
+from graph_queries import (BATCHED_RETRIEVAL_QUERY, DEFAULT_PARAMS, LEGACY_RETRIEVAL_QUERY, RETRIEVAL_QUERY,
+                           profile_db_hits, retrieval_params)
+from local_embeddings import build_embeddings
+
+REPEATS = 20
+
+
+def run(driver, query, params, database):
+    records, summary, _ = driver.execute_query(query, parameters_=params, database_=database)
+    return [record.data() for record in records], summary
+
+
+def db_hits(driver, query, params, database):
+    _, summary = run(driver, "PROFILE " + query, params, database)
+    return profile_db_hits(summary.profile)
+
+
+def timed(driver, query, params, database):
+    samples = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        run(driver, query, params, database)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def section_titles(rows):
+    if not rows:
+        return []
+    return [item["title"] for item in rows[0]["context"]["sections"]]
+
+
+def mentions_per_section(rows):
+    if not rows or not rows[0]["context"]["sections"]:
+        return 0.0
+    return statistics.mean(len(item["mentions"]) for item in rows[0]["context"]["sections"])
+
+
+def main():
+    from neo4j import GraphDatabase
+
+    load_dotenv()
+    database = os.environ.get("NEO4J_DATABASE")
+    vectors = build_embeddings().embed_documents(QUESTIONS)
+    driver = GraphDatabase.driver(os.environ.get("NEO4J_URI", "bolt://localhost:7687"),
+                                  auth=(os.environ.get("NEO4J_USERNAME", "neo4j"),
+                                        os.environ.get("NEO4J_PASSWORD", "password")))
+    try:
+        driver.verify_connectivity()
+        # warm the plan cache and page cache before anything is measured
+        for vector in vectors:
+            run(driver, LEGACY_RETRIEVAL_QUERY, {"embedding": vector}, database)
+            run(driver, RETRIEVAL_QUERY, retrieval_params(vector), database)
+
+        results = {"legacy": {"hits": [], "ms": [], "mentions": [], "same": []},
+                   "lean": {"hits": [], "ms": [], "mentions": [], "same": []}}
+        for vector in vectors:
+            legacy_params = {"embedding": vector}
+            lean_params = retrieval_params(vector)
+            legacy_rows, _ = run(driver, LEGACY_RETRIEVAL_QUERY, legacy_params, database)
+            lean_rows, _ = run(driver, RETRIEVAL_QUERY, lean_params, database)
+            for name, query, params, rows in (("legacy", LEGACY_RETRIEVAL_QUERY, legacy_params, legacy_rows),
+                                              ("lean", RETRIEVAL_QUERY, lean_params, lean_rows)):
+                results[name]["hits"].append(db_hits(driver, query, params, database))
+                results[name]["ms"].extend(timed(driver, query, params, database))
+                results[name]["mentions"].append(mentions_per_section(rows))
+                results[name]["same"].append(section_titles(rows) == section_titles(legacy_rows))
+
+        batched_params = dict(DEFAULT_PARAMS, embeddings=vectors)
+        batched_hits = db_hits(driver, BATCHED_RETRIEVAL_QUERY, batched_params, database) / len(vectors)
+        batched_ms = [ms / len(vectors) for ms in timed(driver, BATCHED_RETRIEVAL_QUERY, batched_params, database)]
+    finally:
+        driver.close()
+
+    print(f"{len(QUESTIONS)} questions, k={DEFAULT_PARAMS['k']}, threshold={DEFAULT_PARAMS['threshold']}, "
+          f"{REPEATS} timed runs each")
+    print(f"{'query':<10}{'db hits':>10}{'p50 ms':>10}{'p95 ms':>10}{'mentions':>10}{'same sections':>15}")
+    for name, result in results.items():
+        print(f"{name:<10}{statistics.mean(result['hits']):>10.0f}{percentile(result['ms'], 50):>10.2f}"
+              f"{percentile(result['ms'], 95):>10.2f}{statistics.mean(result['mentions']):>10.1f}"
+              f"{statistics.mean(result['same']):>15.2f}")
+    print(f"{'batched':<10}{batched_hits:>10.0f}{percentile(batched_ms, 50):>10.2f}"
+          f"{percentile(batched_ms, 95):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Cross-encoder re-ranking latency on CPU, per backend and candidate depth.
+
+Candidates come from the local BM25 index, so no embedding endpoint is
+needed; only the re-ranking forward pass is timed. The first call of each
+model is a warm-up and is not counted.
+
+    python -m benchmarks.reranker_cpu
+"""
+import statistics
+import time
+
+from benchmarks.dense_vs_chroma import QUESTIONS, percentile
+from bm25_index import BM25Index, BM25IndexRetriever
+from reranker import CrossEncoderReranker
+
+DEPTHS = (10, 20, 30)
+BACKENDS = ("onnx", "torch")
+TOP_PARENTS = 3
+REPEATS = 5
+
+
+def top_parents(docs, n=TOP_PARENTS):
+    parent_ids = []
+    for doc in docs:
+        p_id = doc.metadata.get("parent_section_id")
+        if p_id not in parent_ids:
+            parent_ids.append(p_id)
+    return parent_ids[:n]
+
+
+def main():
+    retriever = BM25IndexRetriever(index=BM25Index("./bm25_index"), k=max(DEPTHS))
+    candidates = {q: retriever.invoke(q) for q in QUESTIONS}
+
+    print(f"{len(QUESTIONS)} queries x {REPEATS} repeats, top {TOP_PARENTS} parents kept")
+    print(f"{'backend':<8}{'depth':>6}{'p50 ms':>10}{'p95 ms':>10}{'ms/pair':>10}{'same parents':>14}")
+    for backend in BACKENDS:
+        reranker = CrossEncoderReranker(backend=backend)
+        if reranker.backend != backend:
+            print(f'{backend:<8}unavailable, install the onnx extra: pip install -e ".[onnx]"')
+            continue
+        reranker.score(QUESTIONS[0], [doc.page_content for doc in candidates[QUESTIONS[0]]])
+        for depth in DEPTHS:
+            samples = []
+            same = []
+            for question in QUESTIONS:
+                docs = candidates[question][:depth]
+                for _ in range(REPEATS):
+                    started = time.perf_counter()
+                    reranked = reranker.rerank(question, docs)
+                    samples.append((time.perf_counter() - started) * 1000)
+                same.append(top_parents(reranked) == top_parents(docs))
+            print(f"{backend:<8}{depth:>6}{percentile(samples, 50):>10.2f}{percentile(samples, 95):>10.2f}"
+                  f"{statistics.mean(samples) / depth:>10.3f}{statistics.mean(same):>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Deterministic local stand-ins for the services the pipelines call: the bge-m3
+endpoint, Gemini and Neo4j. They give the same output for the same input on
+every machine, so benchmark runs can be diffed between builds, and each can
+add a fixed delay in place of its network round trip.
+"""
+import hashlib
+import json
+import re
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from atomic_chunking import QUOTED_TERM, iter_definitions_by_quotes
+from context_store import CONTEXT_STORE_PATH
+from graph_queries import BATCHED_RETRIEVAL_QUERY, RETRIEVAL_QUERY
+from graph_snapshot import GraphSnapshot, write_snapshot
+
+WORD = re.compile(r"\w+")
+DIMENSIONS = 1024  # bge-m3's
+
+
+def _bucket(feature):
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    return value % DIMENSIONS, 1.0 if value >> 63 else -1.0
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Stands in for the bge-m3 endpoint: words and word bigrams hashed into a
+    1024-dim vector, L2-normalized. Lexical, not semantic, but stable across
+    processes (blake2b, not the salted hash()) and cheap enough not to
+    dominate what is being timed.
+    """
+
+    def __init__(self, latency_ms=0.0):
+        self.latency_ms = latency_ms
+
+    def _vector(self, text):
+        words = WORD.findall(text.lower())
+        vector = np.zeros(DIMENSIONS, dtype=np.float32)
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            i, sign = _bucket(feature)
+            vector[i] += sign
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class EchoChatModel(BaseChatModel):
+    """
+    Stands in for Gemini: answers with the first `words` words of the prompt it
+    was given, streamed one word per chunk, `token_delay_ms` apart.
+    """
+
+    words: int = 60
+    token_delay_ms: float = 0.0
+
+    @property
+    def _llm_type(self):
+        return "echo"
+
+    def _answer(self, messages):
+        return WORD.findall(" ".join(str(message.content) for message in messages))[:self.words]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        text = " ".join(self._answer(messages))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for i, word in enumerate(self._answer(messages)):
+            if self.token_delay_ms:
+                time.sleep(self.token_delay_ms / 1000)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+
+
+def build_snapshot(snapshot_dir, embeddings, store_path=CONTEXT_STORE_PATH):
+    """
+    A GraphSnapshot of the Act built without Neo4j or an LLM: every section,
+    the section 2 definitions as concepts, and each section CONTAINS the
+    defined terms its text uses. Returns the number of sections.
+    """
+    with open(store_path, encoding="utf-8") as f:
+        store = json.load(f)
+    section_ids = list(store)
+    section_vectors = embeddings.embed_documents(
+        [f"{store[s_id]['title']} {store[s_id]['text']}" for s_id in section_ids])
+    sections = [{"id": s_id, "title": store[s_id]["title"], "text": store[s_id]["text"], "embedding": vector}
+                for s_id, vector in zip(section_ids, section_vectors)]
+
+    definitions = list(iter_definitions_by_quotes(store["2"]["text"])) if "2" in store else []
+    terms = [QUOTED_TERM.search(definition).group(1) for definition in definitions]
+    concepts = [{"id": term, "definition": definition, "source": store["2"]["title"], "embedding": vector}
+                for term, definition, vector in zip(terms, definitions, embeddings.embed_documents(definitions))]
+
+    edges = [{"source": section["id"], "source_label": "Section", "type": "CONTAINS", "id": term,
+              "label": "LegalConcept"}
+             for section in sections for term in terms if term.lower() in section["text"].lower()]
+    write_snapshot(sections, concepts, edges, snapshot_dir, source="stand-in")
+    return len(sections)
+
+
+class SnapshotGraph:
+    """
+    Stands in for Neo4j: answers the retrieval queries of graph_queries from a
+    GraphSnapshot, in the row shape Neo4jGraph.query / ManagedGraph.query return.
+    """
+
+    def __init__(self, snapshot, latency_ms=0.0):
+        self.snapshot = snapshot if isinstance(snapshot, GraphSnapshot) else GraphSnapshot(snapshot)
+        self.latency_ms = latency_ms
+
+    def _context(self, embedding, params):
+        return self.snapshot.context(embedding, k=params["k"], threshold=params["threshold"],
+                                     max_entities=params["max_entities"])
+
+    def query(self, query, params=None, database=None, name=None):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        params = params or {}
+        if query == RETRIEVAL_QUERY:
+            return [{"context": self._context(params["embedding"], params)}]
+        if query == BATCHED_RETRIEVAL_QUERY:
+            return [{"i": i, "context": self._context(embedding, params)}
+                    for i, embedding in enumerate(params["embeddings"])]
+        raise ValueError("SnapshotGraph only answers graph_queries.RETRIEVAL_QUERY and BATCHED_RETRIEVAL_QUERY")
+
+    def close(self):
+        pass
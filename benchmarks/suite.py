@@ -0,0 +1,354 @@
+"""
+Benchmark suite on the golden set: latency percentiles, throughput and retrieval quality.
+
+Retrieval runs rank the parent_section_ids each retriever returns (BM25,
+Chroma, the app's EnsembleRetriever, FusedHybridRetriever and the graph
+retrieval query) and score them against benchmarks.golden with recall@k and
+MRR. End-to-end runs drive hybrid_pipeline and graph_pipeline to their last
+token and add time to first token.
+
+By default the bge-m3 endpoint, Gemini and Neo4j are the deterministic
+stand-ins of benchmarks.stand_ins, and the dense indexes and graph snapshot
+are built from the repo's corpus with them, so the numbers change only when
+the code or the corpus does. --live uses the real services (HF_TOKEN,
+GOOGLE_API_KEY and NEO4J_* from .env), the persisted Chroma store and
+./dense_index.
+
+    python -m benchmarks.suite [--out benchmarks/results.json] [--repeats 20] [--k 5] [--live]
+                               [--network-ms 0] [--token-ms 0]
+    python -m benchmarks.suite compare old.json new.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from benchmarks.dense_vs_chroma import CHROMA_PATH, COLLECTION, percentile
+from benchmarks.golden import EXPECTED, QUESTIONS
+from benchmarks.stand_ins import EchoChatModel, HashingEmbeddings, SnapshotGraph, build_snapshot
+from bm25_index import BM25Index, BM25IndexRetriever
+from context_store import CONTEXT_STORE_PATH, ContextStore
+from graph_queries import DEFAULT_PARAMS, RETRIEVAL_QUERY, retrieval_params
+from pipelines import graph_pipeline, hybrid_pipeline, retrieve_parent_ids
+
+BM25_PATH = "./bm25_index"
+DENSE_PATH = "./dense_index"
+RESULTS_PATH = "./benchmarks/results.json"
+# hashed bag-of-words vectors sit closer together than bge-m3's, so the
+# stand-in graph needs a lower cut-off to return anything
+STAND_IN_GRAPH_PARAMS = dict(DEFAULT_PARAMS, threshold=0.5)
+# lower is better for these; everything else in a report is higher-is-better
+LATENCY_KEYS = ("p50_ms", "p95_ms", "p99_ms", "mean_ms", "ttft_p50_ms", "ttft_p95_ms")
+
+
+def time_calls(fn, repeats):
+    """Runs fn on every question `repeats` times: latency samples in ms, wall seconds, first result per question."""
+    samples = []
+    results = {}
+    started = time.perf_counter()
+    for question in QUESTIONS:
+        for _ in range(repeats):
+            call_started = time.perf_counter()
+            result = fn(question)
+            samples.append((time.perf_counter() - call_started) * 1000)
+        results[question] = result
+    return samples, time.perf_counter() - started, results
+
+
+def latency_stats(samples, seconds):
+    return {
+        "p50_ms": percentile(samples, 50),
+        "p95_ms": percentile(samples, 95),
+        "p99_ms": percentile(samples, 99),
+        "mean_ms": statistics.mean(samples),
+        "throughput_qps": len(samples) / seconds,
+    }
+
+
+def ranking_stats(rankings, k):
+    """recall@k and MRR@k of ranked parent ids against the golden labels."""
+    recalls = []
+    reciprocal_ranks = []
+    for question, ranked in rankings.items():
+        expected = set(EXPECTED[question])
+        top = ranked[:k]
+        recalls.append(len(expected & set(top)) / len(expected))
+        reciprocal_ranks.append(next((1 / (rank + 1) for rank, p_id in enumerate(top) if p_id in expected), 0.0))
+    return {"recall_at_k": statistics.mean(recalls), "mrr": statistics.mean(reciprocal_ranks)}
+
+
+def title_key(title):
+    # Neo4j keeps titles lower-cased (graph_ingest.clean_id), the snapshot and the context store as written
+    return title.strip().lower()
+
+
+def section_ids_by_title(store_path=CONTEXT_STORE_PATH):
+    # titles are not unique (every Commission has a "Transitional provision."), so a title maps to all its ids
+    with open(store_path, encoding="utf-8") as f:
+        store = json.load(f)
+    ids = defaultdict(list)
+    for s_id, section in store.items():
+        ids[title_key(section["title"])].append(s_id)
+    return ids
+
+
+def graph_parent_ids(context, title_ids):
+    """Section ids behind a graph context, best score first; a definition counts as the section defining it."""
+    if not context:
+        return []
+    items = [(item["score"], item["title"]) for item in context["sections"]]
+    items += [(item["score"], item["source"]) for item in context["definitions"]]
+    parent_ids = []
+    for _, title in sorted(items, key=lambda item: -item[0]):
+        for p_id in title_ids.get(title_key(title), []):
+            if p_id not in parent_ids:
+                parent_ids.append(p_id)
+    return parent_ids
+
+
+def load_documents(bm25_path=BM25_PATH):
+    from langchain_core.documents import Document
+
+    with open(os.path.join(bm25_path, "docs.json"), encoding="utf-8") as f:
+        return [Document(page_content=doc["page_content"], metadata=doc["metadata"]) for doc in json.load(f)]
+
+
+def stand_in_services(workdir, network_ms, token_ms):
+    from dense_index import DenseIndex, build_dense_index
+
+    embeddings = HashingEmbeddings(latency_ms=network_ms)
+    # indexes are built without the simulated round trip; only queries pay it
+    builder = HashingEmbeddings()
+    docs = load_documents()
+    build_dense_index(docs, builder, os.path.join(workdir, "dense"))
+    build_snapshot(os.path.join(workdir, "graph"), builder)
+
+    def chroma():
+        from langchain_community.vectorstores import Chroma
+
+        return Chroma.from_documents(docs, builder, collection_name=COLLECTION)
+
+    return {
+        "embeddings": embeddings,
+        "llm": EchoChatModel(token_delay_ms=token_ms),
+        "graph": SnapshotGraph(os.path.join(workdir, "graph"), latency_ms=network_ms),
+        "graph_params": STAND_IN_GRAPH_PARAMS,
+        "dense_index": lambda: DenseIndex(os.path.join(workdir, "dense")),
+        "chroma": chroma,
+    }
+
+
+def live_services():
+    from dotenv import load_dotenv
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from langchain_huggingface import HuggingFaceEndpointEmbeddings
+
+    from dense_index import DenseIndex
+    from graph_client import ManagedGraph
+
+    load_dotenv()
+    embeddings = HuggingFaceEndpointEmbeddings(model="BAAI/bge-m3", task="feature-extraction",
+                                               huggingfacehub_api_token=os.environ.get("HF_TOKEN"))
+
+    def chroma():
+        from langchain_community.vectorstores import Chroma
+
+        return Chroma(persist_directory=CHROMA_PATH, embedding_function=embeddings, collection_name=COLLECTION)
+
+    return {
+        "embeddings": embeddings,
+        "llm": ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0),
+        "graph": ManagedGraph(os.environ["NEO4J_URI"], os.environ["NEO4J_USERNAME"], os.environ["NEO4J_PASSWORD"],
+                              database=os.environ.get("NEO4J_DATABASE")),
+        "graph_params": DEFAULT_PARAMS,
+        "dense_index": lambda: DenseIndex(DENSE_PATH),
+        "chroma": chroma,
+    }
+
+
+def build_retrievers(services, k):
+    """name -> retriever, and name -> why it was skipped (a missing optional dependency or index)."""
+    from langchain_classic.retrievers import EnsembleRetriever
+
+    from dense_index import DenseIndexRetriever
+    from hybrid_retriever import FusedHybridRetriever
+
+    embeddings = services["embeddings"]
+    bm25_index = BM25Index(BM25_PATH)
+    retrievers = {"bm25": BM25IndexRetriever(index=bm25_index, k=k)}
+    skipped = {}
+    try:
+        retrievers["chroma"] = services["chroma"]().as_retriever(search_kwargs={"k": k})
+    except Exception as e:
+        skipped["chroma"] = f"{type(e).__name__}: {e}"
+    try:
+        dense_index = services["dense_index"]()
+        retrievers["dense"] = DenseIndexRetriever(index=dense_index, embeddings=embeddings, k=k)
+        retrievers["fused"] = FusedHybridRetriever(bm25_index=bm25_index, dense_index=dense_index,
+                                                   embeddings=embeddings, k=k)
+    except Exception as e:
+        skipped["dense"] = skipped["fused"] = f"{type(e).__name__}: {e}"
+
+    # the app's default hybrid: BM25 + Chroma; the numpy dense index stands in when Chroma is unavailable
+    dense_retriever = retrievers.get("chroma") or retrievers.get("dense")
+    if dense_retriever is not None:
+        retrievers["ensemble"] = EnsembleRetriever(retrievers=[retrievers["bm25"], dense_retriever],
+                                                   weights=[0.5, 0.5])
+    return retrievers, skipped
+
+
+def run_retrieval(services, retrievers, k, repeats):
+    report = {}
+    for name, retriever in retrievers.items():
+        samples, seconds, rankings = time_calls(lambda q, retriever=retriever: retrieve_parent_ids(retriever, q),
+                                                repeats)
+        report[name] = dict(latency_stats(samples, seconds), **ranking_stats(rankings, k), rankings=rankings)
+
+    graph, embeddings, graph_params = services["graph"], services["embeddings"], services["graph_params"]
+    title_ids = section_ids_by_title()
+
+    def graph_search(question):
+        rows = graph.query(RETRIEVAL_QUERY, params=retrieval_params(embeddings.embed_query(question), **graph_params))
+        return graph_parent_ids(rows[0]["context"] if rows else None, title_ids)
+
+    samples, seconds, rankings = time_calls(graph_search, repeats)
+    report["graph"] = dict(latency_stats(samples, seconds), **ranking_stats(rankings, k), rankings=rankings)
+    return report
+
+
+def drain(pipeline):
+    """Runs a pipeline generator to the end: ms to the first answer token, or None if it produced none."""
+    started = time.perf_counter()
+    first_token_ms = None
+    for kind, payload in pipeline:
+        if kind == "token" and payload and first_token_ms is None:
+            first_token_ms = (time.perf_counter() - started) * 1000
+    return first_token_ms
+
+
+def run_end_to_end(services, retrievers, repeats):
+    context_store = ContextStore.load(budget=3000, neighbours=1)
+    pipelines = {
+        "graph": lambda q: graph_pipeline(q, services["graph"], services["embeddings"], services["llm"],
+                                          graph_params=services["graph_params"]),
+    }
+    if "ensemble" in retrievers:
+        pipelines["hybrid"] = lambda q: hybrid_pipeline(q, retrievers["ensemble"], services["llm"], context_store)
+
+    report = {}
+    for name, make_pipeline in pipelines.items():
+        samples, seconds, first_tokens = time_calls(lambda q: drain(make_pipeline(q)), repeats)
+        stats = latency_stats(samples, seconds)
+        ttft = [ms for ms in first_tokens.values() if ms is not None]
+        if ttft:
+            stats.update(ttft_p50_ms=percentile(ttft, 50), ttft_p95_ms=percentile(ttft, 95))
+        report[name] = stats
+    return report
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(live=False, k=5, repeats=20, network_ms=0.0, token_ms=0.0):
+    with tempfile.TemporaryDirectory() as workdir:
+        services = live_services() if live else stand_in_services(workdir, network_ms, token_ms)
+        try:
+            retrievers, skipped = build_retrievers(services, k)
+            retrieval = run_retrieval(services, retrievers, k, repeats)
+            end_to_end = run_end_to_end(services, retrievers, repeats)
+        finally:
+            services["graph"].close()
+    return {
+        "meta": {
+            "mode": "live" if live else "stand-in",
+            "revision": git_revision(),
+            "created": time.time(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "questions": len(QUESTIONS),
+            "k": k,
+            "repeats": repeats,
+            "network_ms": network_ms,
+            "token_ms": token_ms,
+            "graph_params": services["graph_params"],
+        },
+        "retrieval": retrieval,
+        "end_to_end": end_to_end,
+        "skipped": skipped,
+    }
+
+
+def print_report(results):
+    meta = results["meta"]
+    print(f"{meta['mode']} run at {meta['revision']}: {meta['questions']} questions x {meta['repeats']} repeats, "
+          f"k={meta['k']}")
+    print(f"{'retriever':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'qps':>10}{'recall@k':>10}{'MRR':>8}")
+    for name, stats in results["retrieval"].items():
+        print(f"{name:<12}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+              f"{stats['throughput_qps']:>10.1f}{stats['recall_at_k']:>10.3f}{stats['mrr']:>8.3f}")
+    print(f"{'pipeline':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'qps':>10}{'TTFT p50':>10}")
+    for name, stats in results["end_to_end"].items():
+        print(f"{name:<12}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+              f"{stats['throughput_qps']:>10.1f}{stats.get('ttft_p50_ms', float('nan')):>10.3f}")
+    for name, reason in results["skipped"].items():
+        print(f"skipped {name}: {reason}")
+
+
+def compare(old, new):
+    """Rows of (section, name, metric, old, new, change %, worse?) for every metric present in both runs."""
+    rows = []
+    for section in ("retrieval", "end_to_end"):
+        for name in old.get(section, {}).keys() & new.get(section, {}).keys():
+            for metric, old_value in old[section][name].items():
+                new_value = new[section][name].get(metric)
+                if not isinstance(old_value, (int, float)) or not isinstance(new_value, (int, float)):
+                    continue
+                change = (new_value - old_value) / old_value * 100 if old_value else 0.0
+                worse = new_value > old_value if metric in LATENCY_KEYS else new_value < old_value
+                rows.append((section, name, metric, old_value, new_value, change, worse))
+    return sorted(rows)
+
+
+def main():
+    if sys.argv[1:2] == ["compare"]:
+        if len(sys.argv) != 4:
+            sys.exit("usage: python -m benchmarks.suite compare old.json new.json")
+        with open(sys.argv[2], encoding="utf-8") as f:
+            old = json.load(f)
+        with open(sys.argv[3], encoding="utf-8") as f:
+            new = json.load(f)
+        for section, name, metric, old_value, new_value, change, worse in compare(old, new):
+            print(f"{section:<12}{name:<10}{metric:<16}{old_value:>12.3f}{new_value:>12.3f}{change:>+9.1f}%"
+                  f"{'  worse' if worse and abs(change) >= 1 else ''}")
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--out", default=RESULTS_PATH)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--live", action="store_true")
+    parser.add_argument("--network-ms", type=float, default=0.0, help="stand-in embedding / graph round trip")
+    parser.add_argument("--token-ms", type=float, default=0.0, help="stand-in LLM delay per streamed token")
+    args = parser.parse_args()
+
+    results = run_suite(live=args.live, k=args.k, repeats=args.repeats, network_ms=args.network_ms,
+                        token_ms=args.token_ms)
+    print_report(results)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import json
+import math
+import os
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from instrumentation import span
+
+
+# Files that make up an index directory:
+#   vocab.json      term -> row in the postings arrays
+#   indptr.npy      CSR row pointers, postings of term t are [indptr[t], indptr[t + 1])
+#   doc_ids.npy     int32 document number of every posting
+#   weights.npy     float32 precomputed BM25 term weight of every posting
+#   idf.npy         float32 idf per term
+#   doc_norms.npy   float32 k1 * (1 - b + b * len(d) / avgdl) per document
+#   docs.json       page_content and metadata of every document, in document order
+#   meta.json       k1, b, epsilon, counts
+
+
+def tokenize(text):
+    # Same as langchain's BM25Retriever default_preprocessing_func, so scores match the old pickle
+    return text.split()
+
+
+def build_bm25_index(docs, index_dir, k1=1.5, b=0.75, epsilon=0.25):
+    """Builds an Okapi BM25 index over the documents and writes it to index_dir."""
+    os.makedirs(index_dir, exist_ok=True)
+    doc_tokens = [tokenize(doc.page_content) for doc in docs]
+    doc_lens = np.array([len(tokens) for tokens in doc_tokens], dtype=np.float32)
+    avgdl = float(doc_lens.mean()) if len(docs) else 0.0
+
+    postings = {}
+    for doc_id, tokens in enumerate(doc_tokens):
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, tf in counts.items():
+            postings.setdefault(token, []).append((doc_id, tf))
+
+    vocab = {term: i for i, term in enumerate(sorted(postings))}
+    n_docs = len(docs)
+
+    # rank_bm25's BM25Okapi idf, including the epsilon floor for very common terms
+    idf = np.empty(len(vocab), dtype=np.float32)
+    for term, i in vocab.items():
+        df = len(postings[term])
+        idf[i] = math.log(n_docs - df + 0.5) - math.log(df + 0.5)
+    floor = epsilon * float(idf.mean()) if len(idf) else 0.0
+    idf[idf < 0] = floor
+
+    doc_norms = (k1 * (1 - b + b * doc_lens / avgdl)).astype(np.float32)
+
+    indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+    doc_ids = []
+    tfs = []
+    for term, i in vocab.items():
+        for doc_id, tf in postings[term]:
+            doc_ids.append(doc_id)
+            tfs.append(tf)
+        indptr[i + 1] = len(doc_ids)
+    doc_ids = np.array(doc_ids, dtype=np.int32)
+    tfs = np.array(tfs, dtype=np.float32)
+    term_of_posting = np.repeat(np.arange(len(vocab)), np.diff(indptr))
+    weights = (idf[term_of_posting] * tfs * (k1 + 1) / (tfs + doc_norms[doc_ids])).astype(np.float32)
+
+    np.save(os.path.join(index_dir, "indptr.npy"), indptr)
+    np.save(os.path.join(index_dir, "doc_ids.npy"), doc_ids)
+    np.save(os.path.join(index_dir, "weights.npy"), weights)
+    np.save(os.path.join(index_dir, "idf.npy"), idf)
+    np.save(os.path.join(index_dir, "doc_norms.npy"), doc_norms)
+    with open(os.path.join(index_dir, "vocab.json"), "w", encoding="utf-8") as f:
+        json.dump(vocab, f, ensure_ascii=False)
+    with open(os.path.join(index_dir, "docs.json"), "w", encoding="utf-8") as f:
+        json.dump([{"page_content": doc.page_content, "metadata": doc.metadata} for doc in docs], f,
+                  ensure_ascii=False)
+    with open(os.path.join(index_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"k1": k1, "b": b, "epsilon": epsilon, "n_docs": n_docs, "n_terms": len(vocab),
+                   "avgdl": avgdl}, f)
+
+
+def _load_mmap(index_dir, filename):
+    # a plain ndarray view over the mapping skips np.memmap's per-slice bookkeeping on the hot path
+    return np.load(os.path.join(index_dir, filename), mmap_mode="r").view(np.ndarray)
+
+
+class BM25Index:
+    """
+    Read-only BM25 index. The numeric arrays are opened with mmap_mode="r",
+    so loading is near instant and processes that open the same index share
+    the pages through the OS cache instead of each holding a copy.
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(index_dir, "vocab.json"), encoding="utf-8") as f:
+            self.vocab = json.load(f)
+        self.indptr = _load_mmap(index_dir, "indptr.npy")
+        self.doc_ids = _load_mmap(index_dir, "doc_ids.npy")
+        self.weights = _load_mmap(index_dir, "weights.npy")
+        self.idf = _load_mmap(index_dir, "idf.npy")
+        self.doc_norms = _load_mmap(index_dir, "doc_norms.npy")
+        self._docs = None
+
+    @property
+    def n_docs(self):
+        return self.meta["n_docs"]
+
+    @property
+    def docs(self):
+        # Document payloads are only needed when results are materialized
+        if self._docs is None:
+            with open(os.path.join(self.index_dir, "docs.json"), encoding="utf-8") as f:
+                self._docs = json.load(f)
+        return self._docs
+
+    def scores(self, query):
+        with span("bm25"):
+            scores = np.zeros(self.n_docs, dtype=np.float32)
+            for token in tokenize(query):
+                term = self.vocab.get(token)
+                if term is None:
+                    continue
+                start, end = self.indptr[term], self.indptr[term + 1]
+                # a document appears at most once per term, so plain fancy-index add is safe
+                scores[self.doc_ids[start:end]] += self.weights[start:end]
+            return scores
+
+    def top_k(self, query, k):
+        scores = self.scores(query)
+        k = min(k, len(scores))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return top, scores[top]
+
+    def document(self, i):
+        doc = self.docs[i]
+        return Document(page_content=doc["page_content"], metadata=doc["metadata"])
+
+
+class BM25IndexRetriever(BaseRetriever):
+    """Drop-in replacement for the pickled BM25Retriever, backed by a BM25Index."""
+
+    index: BM25Index
+    k: int = 5
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        top, _ = self.index.top_k(query, self.k)
+        return [self.index.document(int(i)) for i in top]
+
+
+if __name__ == "__main__":
+    from parent_child import parent_child
+
+    parents, children = parent_child("cpa_anchored_refined_v2.json")
+    build_bm25_index(children, "./bm25_index")
+    print(f"BM25 index written to ./bm25_index ({len(children)} documents)")
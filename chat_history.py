@@ -0,0 +1,78 @@
+"""
+Per-session chat history whose memory stays flat however long the conversation runs.
+
+A turn keeps the question and both answers. The hybrid context is kept as the
+(section_id, chunk_index) units it was packed from, and its text is rebuilt
+from the ContextStore only when someone asks to see it. The graph context
+came from the graph and cannot be rebuilt, so it is kept zlib-compressed.
+Only the newest max_turns turns are kept. The answers of turns older than
+the newest full_turns are compressed too, since they are rarely shown again.
+"""
+import zlib
+from collections import deque
+
+MAX_TURNS = 50
+FULL_TURNS = 10
+
+
+def _compress(text):
+    return zlib.compress(text.encode("utf-8"))
+
+
+def _decompress(blob):
+    return zlib.decompress(blob).decode("utf-8")
+
+
+class ChatHistory:
+    def __init__(self, max_turns=MAX_TURNS, full_turns=FULL_TURNS):
+        self.turns = deque(maxlen=max_turns)
+        self.full_turns = full_turns
+        self.next_id = 0
+
+    def __len__(self):
+        return len(self.turns)
+
+    def __iter__(self):
+        return iter(list(self.turns))
+
+    def add(self, question, answers, hybrid_units, graph_context, hybrid_expand=True):
+        """
+        answers: pipeline name -> answer text; hybrid_units: None when the hybrid column produced
+        no context; hybrid_expand: the expand flag ContextStore.pack was given for those units.
+        """
+        self.turns.append({
+            "id": self.next_id,
+            "question": question,
+            "answers": dict(answers),
+            "compressed": False,
+            "hybrid_units": None if hybrid_units is None else [tuple(unit) for unit in hybrid_units],
+            "hybrid_expand": hybrid_expand,
+            "graph_context": _compress(graph_context),
+        })
+        self.next_id += 1
+        if len(self.turns) > self.full_turns:
+            older = self.turns[-self.full_turns - 1]
+            if not older["compressed"]:
+                older["answers"] = {name: _compress(answer) for name, answer in older["answers"].items()}
+                older["compressed"] = True
+
+    def answer(self, turn, name):
+        answer = turn["answers"].get(name, "")
+        return _decompress(answer) if turn["compressed"] else answer
+
+    def hybrid_context(self, turn, context_store):
+        if not turn["hybrid_units"]:
+            return ""
+        text, _ = context_store.pack(turn["hybrid_units"], expand=turn["hybrid_expand"])
+        return text
+
+    def graph_context(self, turn):
+        return _decompress(turn["graph_context"])
+
+    def stored_bytes(self):
+        """Rough size of what the history holds: text and compressed payloads, not Python object overhead."""
+        total = 0
+        for turn in self.turns:
+            total += len(turn["question"]) + len(turn["graph_context"]) + 16 * len(turn["hybrid_units"] or ())
+            total += sum(len(answer) for answer in turn["answers"].values())
+        return total
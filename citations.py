@@ -0,0 +1,241 @@
+"""
+Exact-citation fast path: "section 35", "s. 2(9)", "section 35(1)(c)" or
+"clause (c) of sub-section (1) of section 35" resolve straight to the cited
+units of the ContextStore, with no embedding, index or graph lookup.
+
+The index maps each section's clause paths, ("1",), ("1", "c"), ("9",) for
+the definition 2(9), to the chunk_index of the units under them. It is read
+off the leading markers parse_atomic_units already split the units on, so a
+citation packs the same (section_id, chunk_index) units a retriever returns.
+
+A question that is nothing but a citation ("What does section 35 say?") skips
+retrieval altogether. When it also asks something else ("Who can file a
+complaint under section 35?") the cited units go first and retrieval adds the rest.
+
+    python citations.py "What does section 2(9) say?"
+"""
+import re
+import sys
+
+from atomic_chunking import UNIT_MARKER
+
+MARKER = re.compile(r"\(\s*(\w+)\s*\)")
+SECTION_KEYWORD = r"(?P<keyword>\b(?:sections?|secs?\.?|ss?\.)|§§?)"
+PLURAL_KEYWORDS = ("sections", "secs", "secs.", "ss.", "§§")
+# "clause (c) of sub-section (1) of " before the section number, innermost first
+DESCRIPTORS = r"(?P<descriptors>(?:(?:sub-?\s?clause|clause|sub-?\s?section|item)s?\s*\(\s*\w+\s*\)\s*(?:of|in|under)\s+(?:the\s+)?)*)"
+CLAUSES = r"(?:\s*\(\s*\w+\s*\))*"
+CITATION = re.compile(
+    DESCRIPTORS + SECTION_KEYWORD + r"\s*(?P<section>\d+[A-Z]?)(?P<clauses>" + CLAUSES + r")"
+    r"(?P<more>(?:\s*(?:,|and|or|&)\s*\d+[A-Z]?" + CLAUSES + r")*)",
+    re.IGNORECASE,
+)
+LISTED = re.compile(r"(\d+[A-Z]?)(" + CLAUSES + r")", re.IGNORECASE)
+# "section 2 of the Indian Contract Act" is not a section of this Act
+OTHER_ACT = re.compile(r"\s*,?\s*of\s+the\s+((?:[A-Z][\w()]*\s+){1,6}Act)")
+# a marker right after these words is a cross-reference inside the running unit, not a new unit
+REFERENCE_WORDS = ("section", "sub-section", "sub-sections", "clause", "clauses", "sub-clause", "sub-clauses",
+                   "item", "items")
+LIST_WORDS = ("or", "and", ",")
+# words that leave a question a pure lookup once its citations are taken out
+LOOKUP_WORDS = {
+    "what", "whats", "does", "do", "is", "are", "the", "a", "an", "of", "in", "under", "to", "me", "it", "this",
+    "say", "says", "said", "state", "states", "provide", "provides", "mean", "means", "meaning", "define",
+    "defines", "definition", "explain", "show", "tell", "read", "quote", "text", "full", "content", "contents",
+    "give", "summarise", "summarize", "please", "can", "you", "act", "consumer", "protection", "cpa", "2019",
+    "provision", "provisions", "and", "or", "about",
+}
+WORD = re.compile(r"[\w']+")
+
+ROMAN = []
+for tens in ("", "x", "xx", "xxx"):
+    for ones in ("", "i", "ii", "iii", "iv", "v", "vi", "vii", "viii", "ix"):
+        if tens or ones:
+            ROMAN.append(tens + ones)
+ROMAN_INDEX = {numeral: i for i, numeral in enumerate(ROMAN)}
+
+
+def _leading_marker(text):
+    match = UNIT_MARKER.match(text)
+    if match is None or match.group() == "Provided that":
+        return None
+    return match.group()[1:-1]
+
+
+def _is_cross_reference(previous_text, previous_was_reference):
+    words = previous_text.split()
+    if not words:
+        return False
+    last = words[-1].lower()
+    if last in REFERENCE_WORDS:
+        return True
+    # "sub-clause (i) or" | "(ii) of clause" | "(a) ...", but not "...; or" closing a clause of its own
+    listing = last in LIST_WORDS or last.endswith(",")
+    return previous_was_reference and listing and not (len(words) > 1 and words[-2].endswith((";", ":")))
+
+
+def _level(marker, state, next_marker):
+    """Nesting level of a clause marker: 0 sub-section, 1 clause, 2 sub-clause, 3 item."""
+    if marker.isdigit():
+        return 0
+    if marker.isupper():
+        return 3
+    next_alpha = chr(ord(state[1][-1]) + 1) if state[1] else "a"
+    next_roman = ROMAN[ROMAN_INDEX[state[2]] + 1] if state[2] in ROMAN_INDEX else "i"
+    marker = marker.lower()
+    if marker == next_roman and marker == next_alpha:
+        # (i) after (h): a sub-clause only if (ii) follows it
+        return 2 if next_marker == "ii" else 1
+    if marker == next_roman:
+        return 2
+    if marker == next_alpha or marker not in ROMAN_INDEX:
+        return 1
+    return 2
+
+
+def clause_paths(units):
+    """The clause path of each unit. Provisos belong to their sub-section; split-off cross-references to the unit they were cut from."""
+    markers = [_leading_marker(unit["text"]) for unit in units]
+    state = [None, None, None, None]
+    paths = []
+    previous_was_reference = False
+    for i, unit in enumerate(units):
+        marker = markers[i]
+        reference = bool(i) and marker is not None and _is_cross_reference(units[i - 1]["text"], previous_was_reference)
+        previous_was_reference = reference
+        if reference:
+            paths.append(paths[-1])
+            continue
+        if marker is None:
+            # "Provided that ...", or text with no marker at all
+            paths.append(tuple(state[:1]) if state[0] else ())
+            continue
+        next_marker = next((m for m in markers[i + 1:] if m is not None), None)
+        level = _level(marker, state, next_marker)
+        state[level] = marker.lower()
+        state[level + 1:] = [None] * (len(state) - level - 1)
+        paths.append(tuple(part for part in state if part))
+    return paths
+
+
+def clause_index(units):
+    """{clause path: [chunk_index, ...]}; every unit also counts for each enclosing path, () being the whole section."""
+    index = {}
+    for chunk_index, path in enumerate(clause_paths(units)):
+        for depth in range(len(path) + 1):
+            index.setdefault(path[:depth], []).append(chunk_index)
+    return index
+
+
+def _markers(text):
+    return tuple(marker.lower() for marker in MARKER.findall(text))
+
+
+def label(ref):
+    section_id, path = ref
+    return section_id + "".join(f"({part})" for part in path)
+
+
+class CitationIndex:
+    """Section and clause references in a question, resolved against a ContextStore's units."""
+
+    def __init__(self, context_store):
+        self.context_store = context_store
+        self.clauses = {section_id: clause_index(section["units"])
+                        for section_id, section in context_store.sections.items()}
+
+    def _resolve(self, section_id, path):
+        """
+        The cited path itself, for "section 35(c)" the outermost (c) inside section 35,
+        or else the nearest enclosing path that was split into units; None for an unknown section.
+        """
+        clauses = self.clauses.get(section_id.upper())
+        if clauses is None:
+            return None
+        if path in clauses:
+            return section_id.upper(), path
+        nested = sorted((key for key in clauses if len(key) > len(path) and key[-len(path):] == path), key=len)
+        if nested:
+            return section_id.upper(), nested[0]
+        # "2(7)(i)": the sub-clause is inline in the 2(7) unit
+        for depth in range(len(path) - 1, -1, -1):
+            if path[:depth] in clauses:
+                return section_id.upper(), path[:depth]
+        return None
+
+    def parse(self, text):
+        """
+        Returns the resolved references as (section_id, clause path) pairs in the
+        order they appear, and whether the question is nothing but those references.
+        """
+        refs = []
+        residual = []
+        position = 0
+        for match in CITATION.finditer(text):
+            residual.append(text[position:match.start()])
+            position = match.end()
+            other_act = OTHER_ACT.match(text, match.end())
+            if other_act and "consumer protection" not in other_act.group(1).lower():
+                residual.append(match.group())
+                continue
+            # descriptors read innermost first: clause (c) of sub-section (1) -> (1)(c)
+            outer = tuple(reversed(_markers(match.group("descriptors"))))
+            cited = [(match.group("section"), _markers(match.group("clauses")) + outer)]
+            if match.group("keyword").lower() in PLURAL_KEYWORDS:
+                cited += [(section_id, _markers(clauses)) for section_id, clauses in LISTED.findall(match.group("more"))]
+            else:
+                # "section 35 and 2 others": only "sections" starts a list
+                position = match.end("clauses")
+            for section_id, path in cited:
+                ref = self._resolve(section_id, path)
+                if ref is not None and ref not in refs:
+                    refs.append(ref)
+        residual.append(text[position:])
+        words = WORD.findall(" ".join(residual).lower())
+        return refs, bool(refs) and all(word in LOOKUP_WORDS for word in words)
+
+    def units(self, refs):
+        """(section_id, chunk_index) of the cited units, in citation order."""
+        units = []
+        for section_id, path in refs:
+            for chunk_index in self.clauses[section_id][path]:
+                if (section_id, chunk_index) not in units:
+                    units.append((section_id, chunk_index))
+        return units
+
+    def graph_context(self, refs):
+        """The cited units in the {"sections", "definitions"} shape the graph retrieval query returns."""
+        sections = []
+        for ref in refs:
+            section_id, path = ref
+            title = self.context_store.sections[section_id]["title"]
+            sections.append({
+                "title": f"Section {label(ref)}. {title}",
+                "text": self.context_store.render(section_id, self.clauses[section_id][path]),
+                "score": 1.0,
+                "mentions": [],
+            })
+        return {"sections": sections, "definitions": []}
+
+    def merge_graph_context(self, context, refs):
+        """The cited units first, then the graph's definitions and its sections other than the cited ones."""
+        cited = self.graph_context(refs)
+        if not context:
+            return cited
+        # Neo4j keeps titles lower-cased, the GraphSnapshot as written
+        titles = {self.context_store.sections[section_id]["title"].strip().lower() for section_id, _ in refs}
+        cited["sections"] += [item for item in context["sections"] if item["title"].strip().lower() not in titles]
+        cited["definitions"] = context["definitions"]
+        return cited
+
+
+if __name__ == "__main__":
+    from context_store import ContextStore
+
+    index = CitationIndex(ContextStore.load())
+    for question in sys.argv[1:]:
+        refs, lookup_only = index.parse(question)
+        print(f"{question!r}: {', '.join(label(ref) for ref in refs) or 'no citation'}"
+              f"{' (lookup only)' if lookup_only else ''}")
+        for section_id, chunk_index in index.units(refs):
+            print(f"  {section_id}[{chunk_index}] {index.context_store.sections[section_id]['units'][chunk_index]['text'][:80]}")
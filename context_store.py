@@ -0,0 +1,138 @@
+import json
+import os
+import re
+
+
+CONTEXT_STORE_PATH = "./context_store.json"
+
+# Words and punctuation marks; tracks Gemini's token counts closely enough to budget with, with no tokenizer to load
+TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text):
+    return len(TOKEN.findall(text))
+
+
+def section_entry(chapter_name, section):
+    units = sorted(section["atomic_units"], key=lambda unit: unit["chunk_index"])
+    return {
+        "title": section["title"],
+        "chapter": chapter_name,
+        "text": section["original_content"],
+        "tokens": count_tokens(section["original_content"]),
+        "units": [{"text": unit["text"], "tokens": count_tokens(unit["text"])} for unit in units],
+    }
+
+
+def build_context_sections(anchored_path):
+    """{section_id: section entry} with token counts for the section and each of its atomic units."""
+    with open(anchored_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {
+        section["section_id"]: section_entry(chapter["chapter_name"], section)
+        for chapter in data
+        for section in chapter["sections"]
+    }
+
+
+def build_context_store(anchored_path, store_path=CONTEXT_STORE_PATH):
+    sections = build_context_sections(anchored_path)
+    tmp = store_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(sections, f, ensure_ascii=False)
+    os.replace(tmp, store_path)
+    return sections
+
+
+class ContextStore:
+    """
+    Parent sections split back into their atomic units, with token counts
+    precomputed at index time, so the hybrid prompt can be packed to a token
+    budget instead of pasting whole sections (Section 2 alone is ~5k tokens).
+    """
+
+    def __init__(self, sections, budget=None, neighbours=1):
+        self.sections = sections
+        self.budget = budget
+        self.neighbours = neighbours
+
+    @classmethod
+    def load(cls, store_path=CONTEXT_STORE_PATH, anchored_path=None, **kwargs):
+        """Reads the precomputed store, or builds it in memory from the anchored JSON when it is missing."""
+        if os.path.exists(store_path) or anchored_path is None:
+            with open(store_path, "r", encoding="utf-8") as f:
+                return cls(json.load(f), **kwargs)
+        return cls(build_context_sections(anchored_path), **kwargs)
+
+    def header(self, section_id):
+        return f"Section {section_id}. {self.sections[section_id]['title']}"
+
+    def pack(self, matches, expand=True):
+        """
+        Packs the context for the retrieved units, given as (section_id, chunk_index)
+        pairs best first: the matched units, then their neighbours by chunk_index,
+        then the rest of each section, until the budget runs out. With expand=False
+        only the matched units go in. Returns the context text and the ids of the
+        sections it draws on.
+        """
+        ranked = []
+        order = []
+        for section_id, chunk_index in matches:
+            if section_id not in self.sections or (section_id, chunk_index) in ranked:
+                continue
+            if section_id not in order:
+                order.append(section_id)
+            if chunk_index is not None:
+                ranked.append((section_id, chunk_index))
+
+        selected = {section_id: set() for section_id in order}
+        used = 0
+
+        def take(section_id, chunk_index, force=False):
+            nonlocal used
+            units = self.sections[section_id]["units"]
+            if not 0 <= chunk_index < len(units) or chunk_index in selected[section_id]:
+                return
+            cost = units[chunk_index]["tokens"]
+            if not selected[section_id]:
+                cost += count_tokens(self.header(section_id))
+            if force or self.budget is None or used + cost <= self.budget:
+                selected[section_id].add(chunk_index)
+                used += cost
+
+        # the best unit always goes in, even when it alone is over budget
+        for rank, (section_id, chunk_index) in enumerate(ranked):
+            take(section_id, chunk_index, force=rank == 0)
+        for distance in range(1, self.neighbours + 1 if expand else 1):
+            for section_id, chunk_index in ranked:
+                take(section_id, chunk_index - distance)
+                take(section_id, chunk_index + distance)
+        for section_id in order if expand else ():
+            for chunk_index in range(len(self.sections[section_id]["units"])):
+                take(section_id, chunk_index)
+
+        blocks = []
+        for section_id in order:
+            if selected[section_id]:
+                blocks.append(f"{self.header(section_id)}\n{self.render(section_id, selected[section_id])}")
+        return "\n\n".join(blocks), [section_id for section_id in order if selected[section_id]]
+
+    def render(self, section_id, chunk_indexes):
+        section = self.sections[section_id]
+        if len(chunk_indexes) == len(section["units"]):
+            return section["text"]
+        parts = []
+        previous = -1
+        for chunk_index in sorted(chunk_indexes):
+            if chunk_index != previous + 1:
+                parts.append("...")
+            parts.append(section["units"][chunk_index]["text"])
+            previous = chunk_index
+        if previous != len(section["units"]) - 1:
+            parts.append("...")
+        return " ".join(parts)
+
+
+if __name__ == "__main__":
+    sections = build_context_store("cpa_anchored_refined_v2.json")
+    print(f"Context store: {len(sections)} sections, {sum(s['tokens'] for s in sections.values())} tokens")
@@ -0,0 +1,144 @@
+import json
+import os
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.embeddings import Embeddings
+
+from instrumentation import span
+
+
+# Files that make up an index directory:
+#   vectors.npy   (n_docs, dim) L2-normalized vectors, float32, float16 or int8
+#   scales.npy    float32 per-row dequantization scale, int8 only
+#   docs.json     page_content and metadata of every row, in row order
+#   meta.json     dtype, counts
+#
+# ./dense_index is not committed. Build it with `python incremental_index.py dense`,
+# which embeds every unit with bge-m3 (EMBEDDING_BACKEND=local for the int8 ONNX
+# model), or copy the vectors out of a built Chroma store with `python dense_index.py`.
+DTYPES = ("float32", "float16", "int8")
+BUILD_HINT = ("build ./dense_index with `python incremental_index.py dense`, "
+              "or a shard's with `python sharding.py build`")
+
+
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def write_dense_index(vectors, docs, index_dir, dtype="float32"):
+    """Writes already computed document vectors (one row per doc) as a dense index."""
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {DTYPES}, got {dtype!r}")
+    os.makedirs(index_dir, exist_ok=True)
+    vectors = normalize_rows(vectors)
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+        np.save(os.path.join(index_dir, "vectors.npy"), quantized)
+        np.save(os.path.join(index_dir, "scales.npy"), scales.astype(np.float32))
+    else:
+        np.save(os.path.join(index_dir, "vectors.npy"), vectors.astype(dtype))
+    with open(os.path.join(index_dir, "docs.json"), "w", encoding="utf-8") as f:
+        json.dump([{"page_content": doc.page_content, "metadata": doc.metadata} for doc in docs], f,
+                  ensure_ascii=False)
+    with open(os.path.join(index_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"dtype": dtype, "n_docs": len(docs), "dim": int(vectors.shape[1])}, f)
+
+
+def build_dense_index(docs, embeddings, index_dir, dtype="float32"):
+    vectors = embeddings.embed_documents([doc.page_content for doc in docs])
+    write_dense_index(vectors, docs, index_dir, dtype)
+
+
+def export_chroma_collection(persist_directory, collection_name, index_dir, dtype="float32"):
+    """Copies the vectors already stored in a Chroma collection, so switching backends needs no re-embedding."""
+    import chromadb
+
+    if not os.path.exists(os.path.join(persist_directory, "chroma.sqlite3")):
+        raise FileNotFoundError(f"No Chroma store in {persist_directory} to export: {BUILD_HINT}")
+    client = chromadb.PersistentClient(path=persist_directory)
+    collection = client.get_collection(collection_name)
+    data = collection.get(include=["embeddings", "documents", "metadatas"])
+    docs = [Document(page_content=text, metadata=metadata or {})
+            for text, metadata in zip(data["documents"], data["metadatas"])]
+    write_dense_index(data["embeddings"], docs, index_dir, dtype)
+    return len(docs)
+
+
+class DenseIndex:
+    """Exact cosine search over a small corpus: one matrix-vector product and argpartition."""
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        if not os.path.exists(os.path.join(index_dir, "meta.json")):
+            raise FileNotFoundError(f"No dense index in {index_dir}: {BUILD_HINT}")
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.vectors = np.load(os.path.join(index_dir, "vectors.npy"), mmap_mode="r").view(np.ndarray)
+        if self.meta["dtype"] == "float16":
+            # float16 halves the file, but numpy has no BLAS path for it; upcast once at load
+            self.vectors = self.vectors.astype(np.float32)
+        self.scales = None
+        if self.meta["dtype"] == "int8":
+            self.scales = np.load(os.path.join(index_dir, "scales.npy"))
+        with open(os.path.join(index_dir, "docs.json"), encoding="utf-8") as f:
+            self.docs = json.load(f)
+
+    def scores(self, query_vector):
+        with span("dense"):
+            query = normalize_rows(query_vector)
+            if self.scales is not None:
+                return (self.vectors @ query.astype(np.float32)) * self.scales
+            return self.vectors @ query
+
+    def search(self, query_vector, k):
+        scores = self.scores(query_vector)
+        k = min(k, len(scores))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return top, scores[top]
+
+    def document(self, i):
+        doc = self.docs[i]
+        return Document(page_content=doc["page_content"], metadata=doc["metadata"])
+
+
+class DenseIndexRetriever(BaseRetriever):
+    """Takes the Chroma retriever's place in the EnsembleRetriever."""
+
+    index: DenseIndex
+    embeddings: Embeddings
+    k: int = 5
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        top, _ = self.index.search(self.embeddings.embed_query(query), self.k)
+        return [self.index.document(int(i)) for i in top]
+
+
+class TimedRetriever(BaseRetriever):
+    """Times another retriever's searches (Chroma's) as one stage of the active instrumentation trace."""
+
+    retriever: BaseRetriever
+    stage: str
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        with span(self.stage):
+            return self.retriever.invoke(query)
+
+
+if __name__ == "__main__":
+    import sys
+
+    dtype = sys.argv[1] if len(sys.argv) > 1 else "float32"
+    count = export_chroma_collection("./chroma_db_store_new", "cpa_legal_index", "./dense_index", dtype)
+    print(f"Dense index ({dtype}) written to ./dense_index ({count} documents)")
@@ -0,0 +1,147 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from array import array
+
+from langchain_core.embeddings import Embeddings
+
+from instrumentation import cache_outcome
+
+
+def normalize_query(text):
+    # "What is unfair trade practice?" and "what is  unfair trade practice" share an entry
+    text = re.sub(r"\s+", " ", text.strip().lower())
+    return text.rstrip("?.! ")
+
+
+class EmbeddingCache:
+    """
+    Disk-backed embedding cache keyed by sha256(model name + normalized text).
+    Vectors are stored as float32 blobs in SQLite, so the cache survives
+    restarts and can be shared by several Streamlit processes. Once it holds
+    more than max_entries rows the least recently used ones are evicted.
+
+    A hit only records its last_used time in memory. The times are written in
+    one batch on the next put, once flush_every hits or flush_seconds have
+    gone by, and on close. A put keeps the row count in memory. The count is
+    only read back from SQLite before an eviction and in stats(), to take in
+    rows that other processes added. Until then, their rows can push the table
+    past max_entries.
+    """
+
+    def __init__(self, path, model_name, max_entries=50000, flush_every=256, flush_seconds=30.0):
+        self.path = path
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> last_used of hits not yet written
+        self._touched = {}
+        self._flushed = time.monotonic()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        (self._size,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+
+    def key(self, text):
+        raw = f"{self.model_name}\0{normalize_query(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, text):
+        key = self.key(text)
+        with self._lock:
+            row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = time.time()
+            if (len(self._touched) >= self.flush_every
+                    or time.monotonic() - self._flushed >= self.flush_seconds):
+                self._flush()
+                self._conn.commit()
+        return array("f", row[0]).tolist()
+
+    def put(self, text, vector):
+        key = self.key(text)
+        blob = array("f", vector).tobytes()
+        with self._lock:
+            self._flush()
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                (key, self.model_name, blob, time.time()),
+            ).rowcount
+            if inserted:
+                self._size += 1
+            else:
+                # another process embedded the same text first
+                self._conn.execute("UPDATE embeddings SET vector = ?, last_used = ? WHERE key = ?",
+                                   (blob, time.time(), key))
+            self._evict()
+            self._conn.commit()
+
+    def _flush(self):
+        if self._touched:
+            self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                   [(last_used, key) for key, last_used in self._touched.items()])
+            self._touched.clear()
+        self._flushed = time.monotonic()
+
+    def _evict(self):
+        if self._size <= self.max_entries:
+            return
+        (self._size,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if self._size > self.max_entries:
+            self._size -= self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (self._size - self.max_entries,),
+            ).rowcount
+
+    def stats(self):
+        with self._lock:
+            (self._size,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        total = self.hits + self.misses
+        return {
+            "size": self._size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._conn.commit()
+        self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """Puts an EmbeddingCache in front of an embeddings client."""
+
+    def __init__(self, client, cache):
+        self.client = client
+        self.cache = cache
+
+    def embed_query(self, text):
+        vector = self.cache.get(text)
+        cache_outcome("embedding", vector is not None)
+        if vector is None:
+            vector = self.client.embed_query(text)
+            self.cache.put(text, vector)
+        return vector
+
+    def embed_documents(self, texts):
+        # Only queries are normalized and cached; document text goes through untouched
+        return self.client.embed_documents(texts)
@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from langchain_core.embeddings import Embeddings
+
+from instrumentation import span
+
+
+class SharedEmbeddings(Embeddings):
+    """
+    One embeddings client shared by the Chroma retriever and the graph query.
+    embed_query is memoized per query text, and a call that arrives while the
+    same text is already being embedded waits for that result instead of
+    making a second request to the endpoint.
+    """
+
+    def __init__(self, client, max_entries=256):
+        self.client = client
+        self.max_entries = max_entries
+        self._memo = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        return self.client.embed_documents(texts)
+
+    def embed_query(self, text):
+        with span("embedding"):
+            return self._embed_query(text)
+
+    def _embed_query(self, text):
+        with self._lock:
+            if text in self._memo:
+                self._memo.move_to_end(text)
+                return self._memo[text]
+            future = self._inflight.get(text)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[text] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            vector = self.client.embed_query(text)
+        except Exception as e:
+            with self._lock:
+                del self._inflight[text]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._inflight[text]
+            self._memo[text] = vector
+            while len(self._memo) > self.max_entries:
+                self._memo.popitem(last=False)
+        future.set_result(vector)
+        return vector
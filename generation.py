@@ -0,0 +1,47 @@
+"""
+Answer generation shared by the hybrid and graph pipelines.
+
+The answer is streamed chunk by chunk. Time to first token, prompt tokens and
+completion tokens go on the active instrumentation trace. Closing the
+generator closes the LLM stream, so an answer nobody is waiting for any more
+(a new question, a rerun, a closed tab) stops consuming quota at its next chunk.
+
+The chain stops at the chat model: a StrOutputParser at the end of a
+RunnableSequence reads the rest of the stream when it is closed, which is
+exactly what cancelling must not do.
+"""
+import time
+from contextlib import closing
+
+from context_store import count_tokens
+from instrumentation import count, record
+
+
+def stream_answer(llm, prompt_template, inputs):
+    """Yields the answer's text chunks as the LLM produces them."""
+    chain = prompt_template | llm
+    started = time.perf_counter()
+    chunks = []
+    usage = {}
+    try:
+        with closing(chain.stream(inputs)) as stream:
+            for message in stream:
+                # providers that report token usage spread it over the chunks; the parts add up
+                for key, value in (getattr(message, "usage_metadata", None) or {}).items():
+                    if isinstance(value, int):
+                        usage[key] = usage.get(key, 0) + value
+                chunk = message.text
+                if not chunk:
+                    continue
+                if not chunks:
+                    record("llm_first_token", started)
+                chunks.append(chunk)
+                yield chunk
+    finally:
+        record("llm", started)
+        if usage:
+            count("prompt_tokens", usage.get("input_tokens", 0))
+            count("completion_tokens", usage.get("output_tokens", 0))
+        else:
+            count("prompt_tokens", count_tokens(prompt_template.format(**inputs)))
+            count("completion_tokens", count_tokens("".join(chunks)))
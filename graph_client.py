@@ -0,0 +1,125 @@
+import asyncio
+import random
+import threading
+import time
+from collections import defaultdict
+
+from graph_queries import QUERY_NAMES
+from metrics import LatencyHistogram
+
+
+class ManagedGraph:
+    """
+    Neo4j access for the app, in place of one bare Neo4jGraph shared by every session:
+    a sized connection pool with acquisition and connect timeouts, read
+    transactions with a server-side timeout, retry with jittered exponential
+    backoff on transient errors, and a latency histogram per query.
+    query() has Neo4jGraph.query's shape, so pipelines can take either.
+    """
+
+    def __init__(self, uri, username, password, database=None, max_pool_size=20, acquire_timeout=5.0,
+                 connect_timeout=5.0, query_timeout=10.0, max_retries=3, backoff=0.2, query_names=QUERY_NAMES):
+        from neo4j import GraphDatabase
+
+        self.uri = uri
+        self.auth = (username, password)
+        self.database = database
+        self.query_timeout = query_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.query_names = query_names
+        self.driver_config = {
+            "max_connection_pool_size": max_pool_size,
+            "connection_acquisition_timeout": acquire_timeout,
+            "connection_timeout": connect_timeout,
+            "keep_alive": True,
+        }
+        self.driver = GraphDatabase.driver(uri, auth=self.auth, **self.driver_config)
+        self.histograms = defaultdict(LatencyHistogram)
+        self.retries = defaultdict(int)
+        self.failures = defaultdict(int)
+        self._async_driver = None
+        self._lock = threading.Lock()
+
+    def name_of(self, query, name=None):
+        return name or self.query_names.get(query, "adhoc")
+
+    def _retry_delay(self, attempt):
+        return self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+
+    @staticmethod
+    def _retryable(error):
+        from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+
+        return isinstance(error, (ServiceUnavailable, SessionExpired, TransientError))
+
+    def query(self, query, params=None, database=None, name=None):
+        """Rows of a read query as dicts, like Neo4jGraph.query."""
+        from neo4j import READ_ACCESS
+
+        name = self.name_of(query, name)
+        started = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.driver.session(database=database or self.database,
+                                         default_access_mode=READ_ACCESS) as session:
+                    with session.begin_transaction(timeout=self.query_timeout) as tx:
+                        rows = [record.data() for record in tx.run(query, params or {})]
+                        tx.commit()
+                break
+            except Exception as e:
+                if attempt == self.max_retries or not self._retryable(e):
+                    with self._lock:
+                        self.failures[name] += 1
+                    raise
+                with self._lock:
+                    self.retries[name] += 1
+                time.sleep(self._retry_delay(attempt))
+        with self._lock:
+            histogram = self.histograms[name]
+        histogram.observe((time.perf_counter() - started) * 1000)
+        return rows
+
+    async def aquery(self, query, params=None, database=None, name=None):
+        """query() on the async driver, for callers that already run an event loop."""
+        from neo4j import READ_ACCESS, AsyncGraphDatabase
+
+        if self._async_driver is None:
+            self._async_driver = AsyncGraphDatabase.driver(self.uri, auth=self.auth, **self.driver_config)
+        name = self.name_of(query, name)
+        started = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._async_driver.session(database=database or self.database,
+                                                      default_access_mode=READ_ACCESS) as session:
+                    tx = await session.begin_transaction(timeout=self.query_timeout)
+                    async with tx:
+                        result = await tx.run(query, params or {})
+                        rows = [record.data() async for record in result]
+                        await tx.commit()
+                break
+            except Exception as e:
+                if attempt == self.max_retries or not self._retryable(e):
+                    with self._lock:
+                        self.failures[name] += 1
+                    raise
+                with self._lock:
+                    self.retries[name] += 1
+                await asyncio.sleep(self._retry_delay(attempt))
+        with self._lock:
+            histogram = self.histograms[name]
+        histogram.observe((time.perf_counter() - started) * 1000)
+        return rows
+
+    def stats(self):
+        return {
+            name: dict(histogram.stats(), retries=self.retries[name], failures=self.failures[name])
+            for name, histogram in self.histograms.items()
+        }
+
+    def close(self):
+        self.driver.close()
+
+    async def aclose(self):
+        if self._async_driver is not None:
+            await self._async_driver.close()
@@ -0,0 +1,264 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.documents import Document
+
+
+ALLOWED_NODES = ["Provision", "Actor", "Category", "Violation", "Condition", "Remedy", "Penalty", "Authority"]
+ALLOWED_RELS = ["DEFINES", "QUALIFIES_AS", "INCLUDES", "EXCLUDES", "CONSTITUTES", "PROHIBITS", "ESTABLISHES",
+                "FILED_BEFORE", "APPEALS_TO", "ALLOWS_RELIEF", "CARRIES_PENALTY", "LIABLE_FOR", "GRANTS_RIGHT"]
+
+SCHEMA = [
+    "CREATE VECTOR INDEX section_embedding IF NOT EXISTS FOR (s:Section) ON (s.embedding) OPTIONS {indexConfig: {`vector.dimensions`: 1024,`vector.similarity_function`: 'cosine'}}",
+    "CREATE VECTOR INDEX concept_embedding IF NOT EXISTS FOR (lc:LegalConcept) ON (lc.embedding) OPTIONS {indexConfig: {`vector.dimensions`: 1024,`vector.similarity_function`: 'cosine'}}",
+    "CREATE CONSTRAINT unique_chapter_id IF NOT EXISTS FOR (c:Chapter) REQUIRE c.id IS UNIQUE",
+    "CREATE CONSTRAINT unique_section_id IF NOT EXISTS FOR (s:Section) REQUIRE s.id IS UNIQUE",
+    "CREATE CONSTRAINT unique_legalconcept_id IF NOT EXISTS FOR (lc:LegalConcept) REQUIRE lc.id IS UNIQUE",
+] + [
+    f"CREATE CONSTRAINT unique_{label.lower()}_id IF NOT EXISTS FOR (n:{label}) REQUIRE n.id IS UNIQUE"
+    for label in ALLOWED_NODES
+]
+
+WRITE_SECTIONS = '''
+UNWIND $rows AS row
+MERGE (c:Chapter {id: row.cid})
+MERGE (s:Section {id: row.sid})
+SET s.title = row.title, s.text = row.text, s.embedding = row.embedding
+MERGE (c)-[:CONTAINS]->(s)
+'''
+
+WRITE_DEFINITIONS = '''
+UNWIND $rows AS row
+MATCH (s:Section {id: row.sid})
+MERGE (lc:LegalConcept {id: row.term})
+SET lc.definition = row.definition, lc.source = "Section 2", lc.embedding = row.embedding
+MERGE (s)-[:DEFINES]->(lc)
+'''
+
+
+def clean_id(n):
+    return n.strip().lower()
+
+
+def clean_rel_type(rel_type):
+    # as Neo4jGraph.add_graph_documents writes them, so "Liable for" merges into LIABLE_FOR
+    return rel_type.replace("`", "").replace(" ", "_").upper()
+
+
+def quote(name):
+    # labels and relationship types cannot be query parameters
+    return "`" + name.replace("`", "``") + "`"
+
+
+def batched(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+class RateLimiter:
+    """Token bucket shared by the extraction workers: at most `per_minute` calls, bursts up to `burst`."""
+
+    def __init__(self, per_minute, burst=1):
+        self.interval = 60.0 / per_minute
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) * self.interval
+            time.sleep(wait)
+
+
+def load_units(path):
+    """Flattens the anchored Act JSON into section rows and Section 2 definition rows."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    sections = []
+    definitions = []
+    for chapter in data:
+        chapter_name = clean_id(chapter["chapter_name"])
+        for section in chapter["sections"]:
+            section_id = clean_id(str(section["section_id"]))
+            sections.append({
+                "cid": chapter_name,
+                "sid": section_id,
+                "title": clean_id(section["title"]),
+                "text": section["title"] + section["original_content"],
+                "is_definitions": section["section_id"] == "2",
+            })
+            if section["section_id"] == "2":
+                for unit in section["atomic_units"]:
+                    definitions.append({
+                        "sid": section_id,
+                        "term": clean_id(unit["term"]),
+                        "definition": unit["text"],
+                    })
+    return sections, definitions
+
+
+def embed_in_batches(embeddings, texts, batch_size=32):
+    vectors = []
+    for batch in batched(texts, batch_size):
+        vectors.extend(embeddings.embed_documents(batch))
+    return vectors
+
+
+def extract_graphs(llm_transformer, texts, max_workers=4, requests_per_minute=60):
+    """
+    Runs LLM graph extraction on each text with a bounded worker pool.
+    Returns one GraphDocument (or None when extraction failed) per text, in input order.
+    """
+    limiter = RateLimiter(requests_per_minute, burst=max_workers)
+
+    def extract(text):
+        limiter.acquire()
+        try:
+            extracted = llm_transformer.convert_to_graph_documents([Document(page_content=text)])
+        except Exception as e:
+            print(f"Extraction failed for {text[:60]!r}: {e}")
+            return None
+        return extracted[0] if extracted else None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(extract, texts))
+
+
+def anchor_key(anchor_label, anchor_id):
+    return f"{anchor_label}:{anchor_id}"
+
+
+def graph_rows(graph_doc, anchor_label, anchor_id, anchor_rel, skip_id=None):
+    """
+    Node, relationship and anchor-edge rows for one extracted graph, grouped by label/type.
+    Each relationship row carries the key of its anchor, so a later incremental update can
+    drop the relationships that one section or definition wrote.
+    """
+    nodes = defaultdict(dict)
+    rels = defaultdict(list)
+    anchors = defaultdict(list)
+    for node in graph_doc.nodes:
+        node_id = clean_id(node.id)
+        nodes[node.type][node_id] = {"id": node_id, "properties": node.properties or {}}
+        if node_id != skip_id:
+            anchors[(anchor_label, anchor_rel, node.type)].append({"anchor": anchor_id, "id": node_id})
+    for rel in graph_doc.relationships:
+        # relationship endpoints are separate Node objects, so their ids need the same cleaning
+        source, target = clean_id(rel.source.id), clean_id(rel.target.id)
+        nodes[rel.source.type].setdefault(source, {"id": source, "properties": {}})
+        nodes[rel.target.type].setdefault(target, {"id": target, "properties": {}})
+        rels[(rel.source.type, clean_rel_type(rel.type), rel.target.type)].append(
+            {"source": source, "target": target, "properties": rel.properties or {},
+             "anchor": anchor_key(anchor_label, anchor_id)})
+    return nodes, rels, anchors
+
+
+def write_rows(tx, query, rows, batch_size):
+    for batch in batched(rows, batch_size):
+        tx.run(query, rows=batch).consume()
+
+
+def write_extracted(tx, extracted, batch_size=500):
+    """extracted: (graph_doc, anchor_label, anchor_id, anchor_rel, skip_id) tuples. Returns the {label, id} of every node written."""
+    nodes = defaultdict(dict)
+    rels = defaultdict(list)
+    anchors = defaultdict(list)
+    for graph_doc, *anchor in extracted:
+        doc_nodes, doc_rels, doc_anchors = graph_rows(graph_doc, *anchor)
+        for label, by_id in doc_nodes.items():
+            for node_id, row in by_id.items():
+                if node_id not in nodes[label] or row["properties"]:
+                    nodes[label][node_id] = row
+        for key, rows in doc_rels.items():
+            rels[key].extend(rows)
+        for key, rows in doc_anchors.items():
+            anchors[key].extend(rows)
+
+    for label, by_id in nodes.items():
+        write_rows(tx, f"UNWIND $rows AS row MERGE (n:{quote(label)} {{id: row.id}}) SET n += row.properties",
+                   list(by_id.values()), batch_size)
+    for (source_label, rel_type, target_label), rows in rels.items():
+        write_rows(tx, f'''UNWIND $rows AS row
+MATCH (a:{quote(source_label)} {{id: row.source}})
+MATCH (b:{quote(target_label)} {{id: row.target}})
+MERGE (a)-[r:{quote(rel_type)}]->(b)
+SET r += row.properties,
+    r.anchors = CASE WHEN row.anchor IN coalesce(r.anchors, []) THEN r.anchors
+                     ELSE coalesce(r.anchors, []) + row.anchor END''', rows, batch_size)
+    for (anchor_label, anchor_rel, label), rows in anchors.items():
+        write_rows(tx, f'''UNWIND $rows AS row
+MATCH (a:{quote(anchor_label)} {{id: row.anchor}})
+MATCH (n:{quote(label)} {{id: row.id}})
+MERGE (a)-[:{quote(anchor_rel)}]->(n)''', rows, batch_size)
+    return [{"label": label, "id": node_id} for label, by_id in nodes.items() for node_id in by_id]
+
+
+def ingest(path, driver, embeddings, llm_transformer, database=None, embed_batch_size=32,
+           write_batch_size=500, max_workers=4, requests_per_minute=60):
+    started = time.perf_counter()
+    sections, definitions = load_units(path)
+
+    with driver.session(database=database) as session:
+        for statement in SCHEMA:
+            session.run(statement).consume()
+
+    section_vectors = embed_in_batches(embeddings, [s["text"] for s in sections], embed_batch_size)
+    definition_vectors = embed_in_batches(embeddings, [d["definition"] for d in definitions], embed_batch_size)
+    print(f"Embedded {len(sections)} sections and {len(definitions)} definitions "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    section_rows = [
+        {"cid": s["cid"], "sid": s["sid"], "title": s["title"], "text": s["text"], "embedding": vector}
+        for s, vector in zip(sections, section_vectors)
+    ]
+    definition_rows = [dict(d, embedding=vector) for d, vector in zip(definitions, definition_vectors)]
+    with driver.session(database=database) as session:
+        session.execute_write(write_rows, WRITE_SECTIONS, section_rows, write_batch_size)
+        session.execute_write(write_rows, WRITE_DEFINITIONS, definition_rows, write_batch_size)
+
+    # Section 2 is extracted per definition, every other section as a whole
+    jobs = [(s["text"], "Section", s["sid"], "CONTAINS", None) for s in sections if not s["is_definitions"]]
+    jobs += [(d["definition"], "LegalConcept", d["term"], "MENTIONS", d["term"]) for d in definitions]
+    graph_docs = extract_graphs(llm_transformer, [job[0] for job in jobs], max_workers, requests_per_minute)
+    extracted = [(graph_doc, *job[1:]) for graph_doc, job in zip(graph_docs, jobs) if graph_doc is not None]
+    print(f"Extracted {len(extracted)}/{len(jobs)} graphs in {time.perf_counter() - started:.1f}s")
+
+    with driver.session(database=database) as session:
+        session.execute_write(write_extracted, extracted, write_batch_size)
+    print(f"Graph build finished in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    import os
+
+    from dotenv import load_dotenv
+    from langchain_experimental.graph_transformers import LLMGraphTransformer
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from neo4j import GraphDatabase
+
+    from local_embeddings import build_embeddings
+
+    load_dotenv()
+    llm = ChatGoogleGenerativeAI(model='gemini-2.5-flash', temperature=0)
+    llm_transformer = LLMGraphTransformer(llm=llm, allowed_nodes=ALLOWED_NODES, allowed_relationships=ALLOWED_RELS)
+    embeddings = build_embeddings()
+    driver = GraphDatabase.driver(os.environ["NEO4J_URI"],
+                                  auth=(os.environ["NEO4J_USERNAME"], os.environ["NEO4J_PASSWORD"]))
+    try:
+        ingest("cpa_anchored_refined_v2.json", driver, embeddings, llm_transformer,
+               database=os.environ.get("NEO4J_DATABASE"),
+               max_workers=int(os.environ.get("GRAPH_INGEST_WORKERS", 4)),
+               requests_per_minute=int(os.environ.get("GRAPH_INGEST_RPM", 60)))
+    finally:
+        driver.close()
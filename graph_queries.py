@@ -0,0 +1,122 @@
+"""
+Cypher for graph retrieval.
+
+The query body reads its vector from the `embedding` variable, so the same
+text serves a single question ($embedding) and a micro-batch ($embeddings,
+one row per vector). Each half runs in its own aggregating subquery, which
+always returns one row, so a miss on sections no longer hides definitions.
+"""
+
+# k, threshold and max_entities are query parameters, so changing them does not invalidate the cached plan
+DEFAULT_PARAMS = {"k": 5, "threshold": 0.7, "max_entities": 10}
+
+RETRIEVAL_BODY = '''
+CALL {
+  WITH embedding
+  CALL db.index.vector.queryNodes('section_embedding', $k, embedding)
+  YIELD node AS s, score
+  WHERE score > $threshold
+  CALL {
+    WITH s
+    OPTIONAL MATCH (s)-[:CONTAINS]->(entity)
+    WITH entity LIMIT $max_entities
+    RETURN collect(entity.id + ' (' + head(labels(entity)) + ')') AS mentions
+  }
+  RETURN collect({type: 'Section', title: s.title, text: s.text, score: score, mentions: mentions}) AS sections
+}
+CALL {
+  WITH embedding
+  CALL db.index.vector.queryNodes('concept_embedding', $k, embedding)
+  YIELD node AS lc, score
+  WHERE score > $threshold
+  OPTIONAL MATCH (source:Section)-[:DEFINES]->(lc)
+  RETURN collect({type: 'definition', term: lc.id, definition: lc.definition, score: score,
+                  source: source.title}) AS definitions
+}
+RETURN {sections: sections, definitions: definitions} AS context
+'''
+
+RETRIEVAL_QUERY = "WITH $embedding AS embedding" + RETRIEVAL_BODY
+
+BATCHED_RETRIEVAL_QUERY = (
+    "UNWIND range(0, size($embeddings) - 1) AS i\n"
+    "WITH i, $embeddings[i] AS embedding\n"
+    "CALL {\n"
+    "WITH embedding" + RETRIEVAL_BODY + "}\n"
+    "RETURN i, context"
+)
+
+# The query app.py shipped with, kept as the baseline for benchmarks/graph_query_profile.py.
+# It re-matches every Section it already holds, labels entities through a CASE ladder,
+# and follows Section-[:MENTIONS]->, which ingestion never creates (sections get CONTAINS).
+LEGACY_RETRIEVAL_QUERY = '''
+CALL db.index.vector.queryNodes('section_embedding',5,$embedding)
+YIELD node as s, score
+WHERE score>0.7
+WITH collect(
+{ type: 'Section',
+    title: s.title,
+    text: s.text,
+    score: score,
+    id: s.id
+}
+) as section_results
+
+CALL db.index.vector.queryNodes('concept_embedding',5,$embedding)
+YIELD node as lc, score
+WHERE score>0.7
+MATCH (section2:Section)-[:DEFINES]->(lc)
+WITH section_results, collect(
+{ type: 'definition',
+
+    term: lc.id,
+    definition: lc.definition,
+
+    score: score,
+    source: section2.title}) as concept_results
+
+UNWIND section_results as sec_res
+MATCH (s:Section {id: sec_res.id})
+OPTIONAL MATCH (s)-[:MENTIONS]->(entity)
+WITH section_results, concept_results, sec_res, labels(entity) as tags, entity
+WITH section_results, concept_results, sec_res, tags, entity,
+CASE
+    WHEN 'Authority' IN tags THEN 'Authority'
+    WHEN 'Offense' IN tags THEN 'Offense'
+    WHEN 'Penalty' IN tags THEN 'Penalty'
+    WHEN 'Remedy' IN tags THEN 'Remedy'
+    WHEN 'Stakeholder' IN tags THEN 'Stakeholder'
+    ELSE head(tags) END AS label
+
+WITH section_results, concept_results, sec_res, collect(DISTINCT entity.id + ' (' +label+ ')') as entities
+
+WITH
+collect({ type: 'Section',
+    title: sec_res.title,
+    text: sec_res.text,
+    score: sec_res.score,
+    mentions: entities
+}) as updated_section, concept_results
+
+RETURN {
+sections: updated_section,
+definitions: concept_results} as context
+
+'''
+
+QUERY_NAMES = {
+    RETRIEVAL_QUERY: "retrieval",
+    BATCHED_RETRIEVAL_QUERY: "retrieval_batched",
+    LEGACY_RETRIEVAL_QUERY: "retrieval_legacy",
+}
+
+
+def retrieval_params(embedding, **overrides):
+    params = dict(DEFAULT_PARAMS, **overrides)
+    params["embedding"] = embedding
+    return params
+
+
+def profile_db_hits(plan):
+    """Total db hits of a PROFILE plan (the driver's summary.profile dict), summed over its operator tree."""
+    return plan.get("dbHits", 0) + sum(profile_db_hits(child) for child in plan.get("children", []))
@@ -0,0 +1,186 @@
+"""
+Local snapshot of the retrieval graph, for answering graph queries without Neo4j.
+
+Layout of a snapshot directory:
+    meta.json                   counts and where the snapshot came from
+    sections.json               [{id, title, text}], row i of section_embeddings.npy
+    concepts.json               [{id, definition, source}], row i of concept_embeddings.npy
+    entities.json               [[id, label]]
+    section_embeddings.npy      float32, L2-normalized rows
+    concept_embeddings.npy      float32, L2-normalized rows
+    contains_indptr.npy         CSR of Section-[:CONTAINS]->entity
+    contains_indices.npy
+    mentions_indptr.npy         CSR of LegalConcept-[:MENTIONS]->entity
+    mentions_indices.npy
+
+    python graph_snapshot.py export [snapshot_dir]   # reads NEO4J_URI / NEO4J_USERNAME / NEO4J_PASSWORD
+"""
+import json
+import os
+import time
+
+import numpy as np
+
+from dense_index import normalize_rows
+from graph_queries import DEFAULT_PARAMS
+
+GRAPH_SNAPSHOT_PATH = "./graph_snapshot"
+
+EXPORT_SECTIONS = "MATCH (s:Section) RETURN s.id AS id, s.title AS title, s.text AS text, s.embedding AS embedding"
+EXPORT_CONCEPTS = '''
+MATCH (lc:LegalConcept)
+OPTIONAL MATCH (source:Section)-[:DEFINES]->(lc)
+RETURN lc.id AS id, lc.definition AS definition, head(collect(source.title)) AS source, lc.embedding AS embedding
+'''
+EXPORT_EDGES = '''
+MATCH (a)-[r:CONTAINS|MENTIONS]->(e)
+WHERE (a:Section OR a:LegalConcept) AND NOT e:Section AND NOT e:Chapter
+RETURN a.id AS source, head(labels(a)) AS source_label, type(r) AS type, e.id AS id, head(labels(e)) AS label
+'''
+
+
+def csr(pairs, n_rows):
+    """indptr/indices over (row, column) pairs; columns keep their order within a row."""
+    pairs = sorted(pairs, key=lambda pair: pair[0])
+    counts = np.bincount(np.array([row for row, _ in pairs], dtype=np.int64), minlength=n_rows)
+    indptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    indices = np.array([column for _, column in pairs], dtype=np.int64)
+    return indptr, indices
+
+
+def write_snapshot(sections, concepts, edges, snapshot_dir, source=None):
+    """
+    sections: [{id, title, text, embedding}], concepts: [{id, definition, source, embedding}],
+    edges: [{source, source_label, type, id, label}] for CONTAINS / MENTIONS edges.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    section_row = {section["id"]: i for i, section in enumerate(sections)}
+    concept_row = {concept["id"]: i for i, concept in enumerate(concepts)}
+    entity_row = {}
+    contains = []
+    mentions = []
+    for edge in edges:
+        entity = (edge["id"], edge["label"])
+        if entity not in entity_row:
+            entity_row[entity] = len(entity_row)
+        if edge["type"] == "CONTAINS" and edge["source"] in section_row:
+            contains.append((section_row[edge["source"]], entity_row[entity]))
+        elif edge["type"] == "MENTIONS" and edge["source"] in concept_row:
+            mentions.append((concept_row[edge["source"]], entity_row[entity]))
+
+    np.save(os.path.join(snapshot_dir, "section_embeddings.npy"),
+            normalize_rows(np.array([s["embedding"] for s in sections], dtype=np.float32)))
+    np.save(os.path.join(snapshot_dir, "concept_embeddings.npy"),
+            normalize_rows(np.array([c["embedding"] for c in concepts], dtype=np.float32)))
+    for name, pairs, n_rows in (("contains", contains, len(sections)), ("mentions", mentions, len(concepts))):
+        indptr, indices = csr(pairs, n_rows)
+        np.save(os.path.join(snapshot_dir, f"{name}_indptr.npy"), indptr)
+        np.save(os.path.join(snapshot_dir, f"{name}_indices.npy"), indices)
+
+    tables = {
+        "sections.json": [{"id": s["id"], "title": s["title"], "text": s["text"]} for s in sections],
+        "concepts.json": [{"id": c["id"], "definition": c["definition"], "source": c["source"]} for c in concepts],
+        "entities.json": [list(entity) for entity in entity_row],
+        "meta.json": {"sections": len(sections), "concepts": len(concepts), "entities": len(entity_row),
+                      "contains": len(contains), "mentions": len(mentions), "source": source,
+                      "created": time.time()},
+    }
+    for name, table in tables.items():
+        with open(os.path.join(snapshot_dir, name), "w", encoding="utf-8") as f:
+            json.dump(table, f, ensure_ascii=False)
+
+
+def export_snapshot(driver, snapshot_dir=GRAPH_SNAPSHOT_PATH, database=None):
+    rows = {}
+    for name, query in (("sections", EXPORT_SECTIONS), ("concepts", EXPORT_CONCEPTS), ("edges", EXPORT_EDGES)):
+        records, _, _ = driver.execute_query(query, database_=database)
+        rows[name] = [record.data() for record in records]
+    # nodes ingested before their embedding was written cannot be searched in Neo4j either
+    sections = [s for s in rows["sections"] if s["embedding"]]
+    concepts = [c for c in rows["concepts"] if c["embedding"]]
+    write_snapshot(sections, concepts, rows["edges"], snapshot_dir, source=database or "default")
+    return len(sections), len(concepts), len(rows["edges"])
+
+
+def _load_mmap(path):
+    return np.load(path, mmap_mode="r").view(np.ndarray)
+
+
+class GraphSnapshot:
+    """
+    The retrieval graph held in process: exact cosine search over the section
+    and concept embedding matrices, and entity lookups through CSR adjacency.
+    context() returns the same {sections, definitions} shape as
+    graph_queries.RETRIEVAL_QUERY, with scores on Neo4j's (1 + cosine) / 2 scale
+    so the same threshold applies.
+    """
+
+    def __init__(self, snapshot_dir=GRAPH_SNAPSHOT_PATH):
+        self.snapshot_dir = snapshot_dir
+        with open(os.path.join(snapshot_dir, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(snapshot_dir, "sections.json"), encoding="utf-8") as f:
+            self.sections = json.load(f)
+        with open(os.path.join(snapshot_dir, "concepts.json"), encoding="utf-8") as f:
+            self.concepts = json.load(f)
+        with open(os.path.join(snapshot_dir, "entities.json"), encoding="utf-8") as f:
+            self.mention_labels = [f"{entity_id} ({label})" for entity_id, label in json.load(f)]
+        self.section_embeddings = _load_mmap(os.path.join(snapshot_dir, "section_embeddings.npy"))
+        self.concept_embeddings = _load_mmap(os.path.join(snapshot_dir, "concept_embeddings.npy"))
+        self.contains = (_load_mmap(os.path.join(snapshot_dir, "contains_indptr.npy")),
+                         _load_mmap(os.path.join(snapshot_dir, "contains_indices.npy")))
+        self.mentions = (_load_mmap(os.path.join(snapshot_dir, "mentions_indptr.npy")),
+                         _load_mmap(os.path.join(snapshot_dir, "mentions_indices.npy")))
+
+    @staticmethod
+    def _search(matrix, query, k, threshold):
+        if len(matrix) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores = (1 + matrix @ query) / 2
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        top = top[scores[top] > threshold]
+        return top, scores[top]
+
+    def neighbours(self, adjacency, row, limit=None):
+        indptr, indices = adjacency
+        start, end = indptr[row], indptr[row + 1]
+        if limit is not None:
+            end = min(end, start + limit)
+        return [self.mention_labels[i] for i in indices[start:end]]
+
+    def context(self, query_vector, k=DEFAULT_PARAMS["k"], threshold=DEFAULT_PARAMS["threshold"],
+                max_entities=DEFAULT_PARAMS["max_entities"]):
+        query = normalize_rows(np.asarray(query_vector, dtype=np.float32))
+        sections = []
+        for row, score in zip(*self._search(self.section_embeddings, query, k, threshold)):
+            section = self.sections[row]
+            sections.append({"type": "Section", "title": section["title"], "text": section["text"],
+                             "score": float(score), "mentions": self.neighbours(self.contains, row, max_entities)})
+        definitions = []
+        for row, score in zip(*self._search(self.concept_embeddings, query, k, threshold)):
+            concept = self.concepts[row]
+            definitions.append({"type": "definition", "term": concept["id"], "definition": concept["definition"],
+                                "score": float(score), "source": concept["source"]})
+        return {"sections": sections, "definitions": definitions}
+
+
+if __name__ == "__main__":
+    import sys
+
+    from dotenv import load_dotenv
+    from neo4j import GraphDatabase
+
+    load_dotenv()
+    if sys.argv[1:2] != ["export"]:
+        sys.exit("usage: python graph_snapshot.py export [snapshot_dir]")
+    snapshot_dir = sys.argv[2] if len(sys.argv) > 2 else GRAPH_SNAPSHOT_PATH
+    driver = GraphDatabase.driver(os.environ["NEO4J_URI"],
+                                  auth=(os.environ["NEO4J_USERNAME"], os.environ["NEO4J_PASSWORD"]))
+    try:
+        n_sections, n_concepts, n_edges = export_snapshot(driver, snapshot_dir,
+                                                          database=os.environ.get("NEO4J_DATABASE"))
+    finally:
+        driver.close()
+    print(f"Snapshot {snapshot_dir}: {n_sections} sections, {n_concepts} concepts, {n_edges} entity edges")
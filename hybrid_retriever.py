@@ -0,0 +1,127 @@
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from pydantic import PrivateAttr
+
+from bm25_index import BM25Index
+from dense_index import DenseIndex
+
+FUSIONS = ("rrf", "weighted")
+
+
+def unit_key(metadata):
+    return metadata.get("parent_section_id"), metadata.get("chunk_index")
+
+
+def _top(scores, depth):
+    depth = min(depth, len(scores))
+    top = np.argpartition(-scores, depth - 1)[:depth]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def _minmax(scores):
+    low, high = scores.min(), scores.max()
+    if high == low:
+        return np.zeros_like(scores)
+    return (scores - low) / (high - low)
+
+
+def fuse(bm25, dense, fusion="rrf", weights=(0.5, 0.5), candidate_depth=30, rrf_c=60):
+    """
+    Fused score per row of the aligned BM25 and dense scores, plus a tie-break
+    rank (lower wins) like EnsembleRetriever's first-seen order.
+    """
+    bm25_weight, dense_weight = weights
+    if fusion == "weighted":
+        fused = bm25_weight * _minmax(bm25) + dense_weight * _minmax(dense)
+        return fused, np.arange(len(fused))
+
+    # float64, like the ensemble's Python floats: in float32, rank (2, 3) and rank (3, 2) stop tying
+    fused = np.zeros(len(bm25), dtype=np.float64)
+    first_seen = np.full(len(bm25), len(bm25) * 2, dtype=np.int64)
+    bm25_top = _top(bm25, candidate_depth)
+    bm25_top = bm25_top[bm25[bm25_top] > 0]
+    fused[bm25_top] += bm25_weight / (rrf_c + np.arange(1, len(bm25_top) + 1))
+    first_seen[bm25_top] = np.arange(len(bm25_top))
+    dense_top = _top(dense, candidate_depth)
+    fused[dense_top] += dense_weight / (rrf_c + np.arange(1, len(dense_top) + 1))
+    first_seen[dense_top] = np.minimum(first_seen[dense_top], len(bm25_top) + np.arange(len(dense_top)))
+    return fused, first_seen
+
+
+def top_fused(fused, first_seen, k):
+    """Rows with a positive fused score, best k first."""
+    candidates = np.flatnonzero(fused > 0)
+    order = np.lexsort((first_seen[candidates], -fused[candidates]))
+    return candidates[order[:k]]
+
+
+class FusedHybridRetriever(BaseRetriever):
+    """
+    BM25 and dense similarity scored over the same rows in one vectorized pass.
+
+    fusion="rrf" reproduces EnsembleRetriever's weighted reciprocal rank
+    fusion over the top `candidate_depth` rows of each scorer (BM25 rows
+    with a zero score are not candidates). fusion="weighted" adds the
+    min-max normalized scores instead. Both scorers already score every
+    row, so a deeper candidate pool costs nothing extra.
+    """
+
+    bm25_index: BM25Index
+    dense_index: DenseIndex
+    embeddings: Embeddings
+    k: int = 10
+    candidate_depth: int = 30
+    fusion: str = "rrf"
+    weights: tuple = (0.5, 0.5)
+    rrf_c: int = 60
+
+    _dense_rows: np.ndarray = PrivateAttr()
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def model_post_init(self, __context):
+        if self.fusion not in FUSIONS:
+            raise ValueError(f"fusion must be one of {FUSIONS}, got {self.fusion!r}")
+        # Chroma exports rows in its own order; line the dense rows up with the BM25 documents
+        dense_row_of = {unit_key(doc["metadata"]): i for i, doc in enumerate(self.dense_index.docs)}
+        try:
+            rows = [dense_row_of[unit_key(doc["metadata"])] for doc in self.bm25_index.docs]
+        except KeyError as e:
+            raise ValueError(f"BM25 and dense indexes were built from different documents: {e}") from None
+        self._dense_rows = np.array(rows, dtype=np.int64)
+
+    def raw_scores(self, query, query_vector=None):
+        """BM25 and dense similarity of every row, dense lined up with the BM25 rows."""
+        if query_vector is None:
+            query_vector = self.embeddings.embed_query(query)
+        bm25 = self.bm25_index.scores(query)
+        dense = self.dense_index.scores(query_vector)[self._dense_rows]
+        return bm25, dense
+
+    def fused_scores(self, query, query_vector=None):
+        """Fused score per row, plus a tie-break rank (lower wins) like EnsembleRetriever's first-seen order."""
+        bm25, dense = self.raw_scores(query, query_vector)
+        return fuse(bm25, dense, self.fusion, self.weights, self.candidate_depth, self.rrf_c)
+
+    def search(self, query, query_vector=None):
+        fused, first_seen = self.fused_scores(query, query_vector)
+        top = top_fused(fused, first_seen, self.k)
+        return top, fused[top]
+
+    def matched_units(self, query, query_vector=None):
+        """unit_key (parent_section_id, chunk_index) of the best k units, best first."""
+        top, _ = self.search(query, query_vector)
+        return [unit_key(self.bm25_index.docs[int(i)]["metadata"]) for i in top]
+
+    def parent_section_ids(self, query, query_vector=None):
+        """Parent ids of the best k units, best first, without materializing Documents."""
+        parent_ids = []
+        for p_id, _ in self.matched_units(query, query_vector):
+            if p_id and p_id not in parent_ids:
+                parent_ids.append(p_id)
+        return parent_ids
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        top, _ = self.search(query)
+        return [self.bm25_index.document(int(i)) for i in top]
@@ -0,0 +1,310 @@
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from bm25_index import build_bm25_index
+from context_store import CONTEXT_STORE_PATH, build_context_store
+from dense_index import DenseIndex, write_dense_index
+from graph_ingest import (WRITE_DEFINITIONS, WRITE_SECTIONS, anchor_key, embed_in_batches, extract_graphs,
+                          load_units, write_extracted, write_rows)
+from parent_child import parent_child
+
+
+SOURCE = "cpa_anchored_refined_v2.json"
+MANIFEST_PATH = "./index_manifest.json"
+CHROMA_PATH = "./chroma_db_store_new"
+COLLECTION = "cpa_legal_index"
+BM25_PATH = "./bm25_index"
+DENSE_PATH = "./dense_index"
+
+
+def content_hash(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(json.dumps(part, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def unit_id(metadata):
+    # deterministic Chroma id, so a changed unit is upserted in place instead of duplicated
+    return f"{metadata['parent_section_id']}:{metadata['chunk_index']}"
+
+
+def diff(old, new):
+    """Keys that were added or changed, and keys that were removed, between two {key: hash} maps."""
+    changed = [key for key, digest in new.items() if old.get(key) != digest]
+    removed = [key for key in old if key not in new]
+    return changed, removed
+
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def child_hashes(children):
+    return {unit_id(doc.metadata): content_hash(doc.page_content, doc.metadata) for doc in children}
+
+
+def update_chroma(children, old, embeddings):
+    from langchain_community.vectorstores import Chroma
+
+    new = child_hashes(children)
+    changed, removed = diff(old, new)
+    vector_db = Chroma(persist_directory=CHROMA_PATH, embedding_function=embeddings, collection_name=COLLECTION)
+    if not old:
+        # first incremental run: the collection was built by Chroma.from_documents with random ids
+        vector_db._collection.delete(where={"doc_type": "child"})
+    if removed:
+        vector_db.delete(ids=removed)
+    if changed:
+        by_id = {unit_id(doc.metadata): doc for doc in children}
+        vector_db.add_documents([by_id[key] for key in changed], ids=changed)
+    return new, len(changed), len(removed)
+
+
+def update_dense(children, old, embeddings):
+    new = child_hashes(children)
+    changed, removed = diff(old, new)
+    reusable = {}
+    if old and os.path.exists(os.path.join(DENSE_PATH, "meta.json")):
+        index = DenseIndex(DENSE_PATH)
+        vectors = np.asarray(index.vectors, dtype=np.float32)
+        if index.scales is not None:
+            vectors = vectors * index.scales[:, None]
+        reusable = {unit_id(doc["metadata"]): vectors[i] for i, doc in enumerate(index.docs)}
+        dtype = index.meta["dtype"]
+    else:
+        dtype = "float32"
+        changed = list(new)
+    changed = set(changed)
+    to_embed = [doc for doc in children if unit_id(doc.metadata) in changed or unit_id(doc.metadata) not in reusable]
+    fresh = embed_in_batches(embeddings, [doc.page_content for doc in to_embed])
+    reusable.update({unit_id(doc.metadata): vector for doc, vector in zip(to_embed, fresh)})
+    write_dense_index([reusable[unit_id(doc.metadata)] for doc in children], children, DENSE_PATH, dtype)
+    return new, len(to_embed), len(removed)
+
+
+def update_context(children, old):
+    # token counts are per section and cheap to recount, so like BM25 the store is rebuilt whole
+    new = child_hashes(children)
+    changed, removed = diff(old, new)
+    if changed or removed or not os.path.exists(CONTEXT_STORE_PATH):
+        build_context_store(SOURCE, CONTEXT_STORE_PATH)
+    return new, len(changed), len(removed)
+
+
+def update_bm25(children, old):
+    # idf and avgdl depend on the whole corpus, and a rebuild takes milliseconds, so it is never patched
+    new = child_hashes(children)
+    changed, removed = diff(old, new)
+    if changed or removed or not os.path.exists(os.path.join(BM25_PATH, "meta.json")):
+        build_bm25_index(children, BM25_PATH)
+    return new, len(changed), len(removed)
+
+
+# the detach and delete queries return the extracted nodes they cut loose, the only ones that can be orphaned
+DETACH_SECTION_ENTITIES = '''
+UNWIND $ids AS sid
+MATCH (s:Section {id: sid})-[r:CONTAINS]->(n)
+DELETE r
+RETURN elementId(n) AS node
+'''
+
+DETACH_CONCEPT_ENTITIES = '''
+UNWIND $ids AS term
+MATCH (:LegalConcept {id: term})-[r:MENTIONS]->(n)
+DELETE r
+RETURN elementId(n) AS node
+'''
+
+DELETE_SECTIONS = '''
+UNWIND $ids AS sid
+MATCH (s:Section {id: sid})
+OPTIONAL MATCH (s)-[:CONTAINS]->(n)
+WITH s, collect(elementId(n)) AS nodes
+DETACH DELETE s
+WITH nodes
+UNWIND nodes AS node
+RETURN node
+'''
+
+DELETE_CONCEPTS = '''
+UNWIND $ids AS term
+MATCH (lc:LegalConcept {id: term})
+OPTIONAL MATCH (lc)-[:MENTIONS]->(n)
+WITH lc, collect(elementId(n)) AS nodes
+DETACH DELETE lc
+WITH nodes
+UNWIND nodes AS node
+RETURN node
+'''
+
+# relationships between extracted entities, which write_extracted tags with the anchors that wrote them:
+# the detached anchors are taken off, and a relationship no remaining anchor wrote is deleted
+DETACH_EXTRACTED_RELS = '''
+UNWIND $nodes AS node
+MATCH (n)-[r]-()
+WHERE elementId(n) = node AND any(anchor IN coalesce(r.anchors, []) WHERE anchor IN $anchors)
+WITH DISTINCT r
+SET r.anchors = [anchor IN r.anchors WHERE NOT anchor IN $anchors]
+WITH r
+WHERE size(r.anchors) = 0
+DELETE r
+'''
+
+# relationships written before they were tagged: deleted when neither end is still contained in or
+# mentioned by anything, i.e. both were reached only through the detached anchors
+DELETE_UNTAGGED_RELS = '''
+UNWIND $nodes AS node
+MATCH (n)-[r]-(m)
+WHERE elementId(n) = node AND r.anchors IS NULL
+  AND NOT m:Chapter AND NOT m:Section AND NOT m:LegalConcept
+  AND NOT ()-[:CONTAINS|MENTIONS]->(n) AND NOT ()-[:CONTAINS|MENTIONS]->(m)
+WITH DISTINCT r
+DELETE r
+'''
+
+# detached entities left with no relationship at all, unless this run wrote them again (a full
+# ingest keeps the nodes it writes, even a definition's own term whose MENTIONS edge it skips)
+DELETE_ORPHANS = '''
+UNWIND $nodes AS node
+MATCH (n)
+WHERE elementId(n) = node
+  AND NOT n:Chapter AND NOT n:Section AND NOT n:LegalConcept
+  AND NOT (n)--()
+  AND NOT any(written IN $written WHERE written.id = n.id AND written.label IN labels(n))
+DETACH DELETE n
+'''
+
+
+def run_ids(tx, query, ids):
+    """Runs an UNWIND $ids query and returns the element ids of the nodes it detached."""
+    return [record["node"] for record in tx.run(query, ids=ids)]
+
+
+def update_neo4j(old, driver, embeddings, llm_transformer, database=None, max_workers=4, requests_per_minute=60):
+    sections, definitions = load_units(SOURCE)
+    new_sections = {s["sid"]: content_hash(s) for s in sections}
+    new_definitions = {d["term"]: content_hash(d) for d in definitions}
+    changed_sections, removed_sections = diff(old.get("sections", {}), new_sections)
+    changed_definitions, removed_definitions = diff(old.get("definitions", {}), new_definitions)
+
+    changed_sections_set, changed_definitions_set = set(changed_sections), set(changed_definitions)
+    sections = [s for s in sections if s["sid"] in changed_sections_set]
+    definitions = [d for d in definitions if d["term"] in changed_definitions_set]
+    section_rows = [
+        {"cid": s["cid"], "sid": s["sid"], "title": s["title"], "text": s["text"], "embedding": vector}
+        for s, vector in zip(sections, embed_in_batches(embeddings, [s["text"] for s in sections]))
+    ]
+    definition_rows = [
+        dict(d, embedding=vector)
+        for d, vector in zip(definitions, embed_in_batches(embeddings, [d["definition"] for d in definitions]))
+    ]
+
+    jobs = [(s["text"], "Section", s["sid"], "CONTAINS", None) for s in sections if not s["is_definitions"]]
+    jobs += [(d["definition"], "LegalConcept", d["term"], "MENTIONS", d["term"]) for d in definitions]
+    graph_docs = extract_graphs(llm_transformer, [job[0] for job in jobs], max_workers, requests_per_minute)
+    extracted = [(graph_doc, *job[1:]) for graph_doc, job in zip(graph_docs, jobs) if graph_doc is not None]
+
+    # a failed extraction keeps its old entities and its old hash (or none, if it is new), so the next run retries it
+    failed = [job for graph_doc, job in zip(graph_docs, jobs) if graph_doc is None]
+    for _, label, anchor_id, _, _ in failed:
+        hashes, old_hashes = ((new_sections, old.get("sections", {})) if label == "Section"
+                              else (new_definitions, old.get("definitions", {})))
+        if anchor_id in old_hashes:
+            hashes[anchor_id] = old_hashes[anchor_id]
+        else:
+            del hashes[anchor_id]
+    if failed:
+        print(f"neo4j: {len(failed)} extractions failed and will be retried on the next run")
+    reextracted_sections = [anchor_id for _, label, anchor_id, _, _ in extracted if label == "Section"]
+    reextracted_definitions = [anchor_id for _, label, anchor_id, _, _ in extracted if label == "LegalConcept"]
+    anchors = ([anchor_key("Section", sid) for sid in removed_sections + reextracted_sections]
+               + [anchor_key("LegalConcept", term) for term in removed_definitions + reextracted_definitions])
+
+    with driver.session(database=database) as session:
+        def apply(tx):
+            detached = run_ids(tx, DELETE_CONCEPTS, removed_definitions)
+            detached += run_ids(tx, DELETE_SECTIONS, removed_sections)
+            detached += run_ids(tx, DETACH_SECTION_ENTITIES, reextracted_sections)
+            detached += run_ids(tx, DETACH_CONCEPT_ENTITIES, reextracted_definitions)
+            detached = list(set(detached))
+            if detached:
+                tx.run(DETACH_EXTRACTED_RELS, nodes=detached, anchors=anchors).consume()
+                tx.run(DELETE_UNTAGGED_RELS, nodes=detached).consume()
+            write_rows(tx, WRITE_SECTIONS, section_rows, 500)
+            write_rows(tx, WRITE_DEFINITIONS, definition_rows, 500)
+            written = write_extracted(tx, extracted)
+            if detached:
+                tx.run(DELETE_ORPHANS, nodes=detached, written=written).consume()
+
+        session.execute_write(apply)
+
+    new = {"sections": new_sections, "definitions": new_definitions}
+    return new, len(changed_sections) + len(changed_definitions), len(removed_sections) + len(removed_definitions)
+
+
+def main(targets):
+    from dotenv import load_dotenv
+
+    from local_embeddings import build_embeddings
+
+    load_dotenv()
+    manifest = load_manifest()
+    parents, children = parent_child(SOURCE)
+    # EMBEDDING_BACKEND=local embeds with the int8 ONNX model, matching an app running EMBEDDING_BACKEND = "local"
+    embeddings = build_embeddings()
+
+    for target in targets:
+        started = time.perf_counter()
+        old = manifest.get(target, {})
+        if target == "chroma":
+            new, changed, removed = update_chroma(children, old, embeddings)
+        elif target == "dense":
+            new, changed, removed = update_dense(children, old, embeddings)
+        elif target == "bm25":
+            new, changed, removed = update_bm25(children, old)
+        elif target == "context":
+            new, changed, removed = update_context(children, old)
+        elif target == "neo4j":
+            from langchain_experimental.graph_transformers import LLMGraphTransformer
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            from neo4j import GraphDatabase
+
+            from graph_ingest import ALLOWED_NODES, ALLOWED_RELS
+
+            llm = ChatGoogleGenerativeAI(model='gemini-2.5-flash', temperature=0)
+            llm_transformer = LLMGraphTransformer(llm=llm, allowed_nodes=ALLOWED_NODES,
+                                                  allowed_relationships=ALLOWED_RELS)
+            driver = GraphDatabase.driver(os.environ["NEO4J_URI"],
+                                          auth=(os.environ["NEO4J_USERNAME"], os.environ["NEO4J_PASSWORD"]))
+            try:
+                new, changed, removed = update_neo4j(old, driver, embeddings, llm_transformer,
+                                                     database=os.environ.get("NEO4J_DATABASE"))
+            finally:
+                driver.close()
+        else:
+            raise ValueError(f"Unknown target {target!r}")
+        # the manifest only moves forward for targets that were updated successfully
+        manifest[target] = new
+        save_manifest(manifest)
+        print(f"{target}: {changed} added/changed, {removed} removed in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or ["bm25", "context", "dense", "chroma", "neo4j"])
@@ -0,0 +1,255 @@
+"""
+Per-stage latency, token counts and cache outcomes for the RAG pipelines, with no LangSmith needed.
+
+A Trace covers one pipeline run for one question. traced() makes it the
+active trace while the pipeline generator runs. The stages (embedding, bm25,
+dense, rerank, graph query, prompt assembly, LLM, and Chroma's searches
+through dense_index.TimedRetriever) open spans through the module-level
+span(), which finds the active trace through a context variable. Retrievers
+and clients therefore need no extra arguments, and span() is a no-op outside
+a traced run. Spans nest: "chroma" includes the query embedding Chroma makes
+inside it.
+
+Finished traces go to a Recorder. It keeps cumulative histograms and counters
+for the Prometheus endpoint, a rolling window of recent traces for the admin
+panel and, optionally, one JSON line per trace.
+"""
+import json
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from metrics import LatencyHistogram
+
+_active = ContextVar("trace", default=None)
+
+
+class Trace:
+    def __init__(self, pipeline, question):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.pipeline = pipeline
+        self.question = question
+        self.created = time.time()
+        self.started = time.perf_counter()
+        self.spans = []
+        self.counters = defaultdict(int)
+        self.caches = {}
+        self.total_ms = None
+        self.error = None
+        self.cancelled = False
+
+    def record(self, stage, started, finished=None):
+        finished = time.perf_counter() if finished is None else finished
+        self.spans.append({"stage": stage, "start_ms": (started - self.started) * 1000,
+                           "ms": (finished - started) * 1000})
+
+    def stage_ms(self):
+        """Total ms per stage, in the order the stages first ran."""
+        totals = {}
+        for item in sorted(self.spans, key=lambda item: item["start_ms"]):
+            totals[item["stage"]] = totals.get(item["stage"], 0.0) + item["ms"]
+        return totals
+
+    def to_dict(self):
+        return {"trace_id": self.trace_id, "pipeline": self.pipeline, "question": self.question,
+                "created": self.created, "total_ms": self.total_ms, "error": self.error,
+                "cancelled": self.cancelled, "spans": self.spans,
+                "counters": dict(self.counters), "caches": self.caches}
+
+
+@contextmanager
+def span(stage):
+    """Times the enclosed block as `stage` of the active trace; does nothing when no trace is active."""
+    trace = _active.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.record(stage, started)
+
+
+def record(stage, started):
+    """A span that began at perf_counter() value `started` and ends now, e.g. time to first token."""
+    trace = _active.get()
+    if trace is not None:
+        trace.record(stage, started)
+
+
+def count(name, value=1):
+    trace = _active.get()
+    if trace is not None:
+        trace.counters[name] += value
+
+
+def cache_outcome(cache, hit):
+    """Whether `cache` answered this run's lookup; the last lookup per cache wins."""
+    trace = _active.get()
+    if trace is not None:
+        trace.caches[cache] = "hit" if hit else "miss"
+
+
+def traced(recorder, pipeline, question, events):
+    """
+    Runs the pipeline generator `events` with a Trace active, then hands the
+    trace to the recorder and emits one last status event with the time per stage.
+    Closing it early closes `events` too, and the run is recorded as cancelled.
+    """
+    trace = Trace(pipeline, question)
+    try:
+        while True:
+            token = _active.set(trace)
+            try:
+                event = next(events)
+            except StopIteration:
+                break
+            finally:
+                _active.reset(token)
+            yield event
+    except GeneratorExit:
+        trace.cancelled = True
+        raise
+    except Exception as e:
+        trace.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        # the pipeline's own cleanup (the LLM span of a cancelled answer) still belongs to this trace
+        token = _active.set(trace)
+        try:
+            events.close()
+        finally:
+            _active.reset(token)
+        trace.total_ms = (time.perf_counter() - trace.started) * 1000
+        recorder.record(trace)
+    yield "status", "Timings: " + " | ".join(f"{stage} {ms:.0f}ms" for stage, ms in trace.stage_ms().items())
+
+
+def _labels(**labels):
+    return ",".join(f'{key}="{value}"' for key, value in labels.items())
+
+
+class Recorder:
+    """
+    Where finished traces go: cumulative histograms per (pipeline, stage) and
+    counters for Prometheus, the last `window` traces for the admin panel, and
+    a JSONL trace file when trace_path is set.
+    """
+
+    def __init__(self, trace_path=None, window=200):
+        self.trace_path = trace_path
+        self.histograms = defaultdict(LatencyHistogram)
+        self.counters = defaultdict(int)
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def record(self, trace):
+        item = trace.to_dict()
+        with self._lock:
+            observations = [((trace.pipeline, "total"), trace.total_ms)]
+            observations += [((trace.pipeline, stage), ms) for stage, ms in trace.stage_ms().items()]
+            histograms = [(self.histograms[key], ms) for key, ms in observations]
+            outcome = "error" if trace.error else "cancelled" if trace.cancelled else "ok"
+            self.counters[("traces", trace.pipeline, outcome)] += 1
+            for name, value in trace.counters.items():
+                self.counters[(name, trace.pipeline, None)] += value
+            for cache, outcome in trace.caches.items():
+                self.counters[("cache", cache, outcome)] += 1
+            self.recent.append(item)
+            if self.trace_path:
+                with open(self.trace_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        for histogram, ms in histograms:
+            histogram.observe(ms)
+
+    def cache_hit_rates(self):
+        with self._lock:
+            caches = {key[1] for key in self.counters if key[0] == "cache"}
+            rates = {}
+            for cache in sorted(caches):
+                hits, misses = self.counters[("cache", cache, "hit")], self.counters[("cache", cache, "miss")]
+                rates[cache] = {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses)}
+            return rates
+
+    def tokens(self):
+        """pipeline -> estimated prompt / completion tokens and successful runs, since start."""
+        with self._lock:
+            totals = defaultdict(lambda: {"prompt": 0, "completion": 0, "runs": 0})
+            for (name, pipeline, outcome), value in self.counters.items():
+                if name.endswith("_tokens"):
+                    totals[pipeline][name.removesuffix("_tokens")] += value
+                elif name == "traces" and outcome == "ok":
+                    totals[pipeline]["runs"] += value
+            return dict(totals)
+
+    def rolling(self):
+        """(pipeline, stage) -> latency stats over the recent traces only, for the admin panel."""
+        with self._lock:
+            recent = list(self.recent)
+        histograms = defaultdict(LatencyHistogram)
+        for item in recent:
+            histograms[(item["pipeline"], "total")].observe(item["total_ms"])
+            totals = defaultdict(float)
+            for stage_span in item["spans"]:
+                totals[stage_span["stage"]] += stage_span["ms"]
+            for stage, ms in totals.items():
+                histograms[(item["pipeline"], stage)].observe(ms)
+        return dict(histograms)
+
+    def prometheus(self):
+        """Everything recorded so far, in the Prometheus text exposition format."""
+        lines = ["# HELP rag_stage_latency_ms Time spent per pipeline stage, per run.",
+                 "# TYPE rag_stage_latency_ms histogram"]
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items(), key=lambda item: tuple(str(part) for part in item[0]))
+        for (pipeline, stage), histogram in histograms:
+            buckets, n, total_ms = histogram.cumulative()
+            for bound, seen in buckets:
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"rag_stage_latency_ms_bucket{{{_labels(pipeline=pipeline, stage=stage, le=le)}}} {seen}")
+            lines.append(f"rag_stage_latency_ms_sum{{{_labels(pipeline=pipeline, stage=stage)}}} {total_ms:.3f}")
+            lines.append(f"rag_stage_latency_ms_count{{{_labels(pipeline=pipeline, stage=stage)}}} {n}")
+
+        lines += ["# HELP rag_runs_total Pipeline runs by outcome.", "# TYPE rag_runs_total counter"]
+        lines += [f"rag_runs_total{{{_labels(pipeline=a, outcome=b)}}} {value}"
+                  for (name, a, b), value in counters if name == "traces"]
+        lines += ["# HELP rag_cache_lookups_total Cache lookups by outcome.", "# TYPE rag_cache_lookups_total counter"]
+        lines += [f"rag_cache_lookups_total{{{_labels(cache=a, outcome=b)}}} {value}"
+                  for (name, a, b), value in counters if name == "cache"]
+        lines += ["# HELP rag_tokens_total Estimated prompt and completion tokens.", "# TYPE rag_tokens_total counter"]
+        lines += [f"rag_tokens_total{{{_labels(pipeline=a, kind=name.removesuffix('_tokens'))}}} {value}"
+                  for (name, a, b), value in counters if name.endswith("_tokens")]
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="0.0.0.0"):
+        """Serves prometheus() at http://host:port/metrics on a daemon thread; idempotent."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        if self._server is not None:
+            return self._server
+        recorder = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = recorder.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+        return self._server
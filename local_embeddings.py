@@ -0,0 +1,133 @@
+"""
+bge-m3 on the local CPU: an int8 dynamically quantized ONNX export run through
+sentence-transformers' ONNX backend, which needs the onnx extra
+(pip install -e ".[onnx]", or pip install -r requirements-onnx.txt).
+
+    python local_embeddings.py export   # writes ./models/bge-m3-onnx
+    python local_embeddings.py parity   # int8 vs the fp32 vectors in ./dense_index
+"""
+import os
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from micro_batch import MicroBatcher
+
+MODEL_NAME = "BAAI/bge-m3"
+LOCAL_MODEL_DIR = "./models/bge-m3-onnx"
+# avx512_vnni on recent Xeons, arm64 on ARM servers
+QUANTIZATION = "avx2"
+# how far the int8 model may drift from fp32: 1st-percentile document cosine, mean top-5 query overlap
+MIN_COSINE_P01 = 0.98
+MIN_TOP5_OVERLAP = 0.9
+
+
+def quantized_file(config=QUANTIZATION):
+    return f"onnx/model_qint8_{config}.onnx"
+
+
+def export_quantized(model_name=MODEL_NAME, output_dir=LOCAL_MODEL_DIR, config=QUANTIZATION):
+    """Exports model_name to ONNX and writes its int8 dynamically quantized variant next to it."""
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    model = SentenceTransformer(model_name, backend="onnx", device="cpu")
+    model.save_pretrained(output_dir)
+    export_dynamic_quantized_onnx_model(model, config, output_dir)
+    return os.path.join(output_dir, quantized_file(config))
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    Normalized bge-m3 vectors from the local ONNX model. embed_query goes
+    through a MicroBatcher, so queries arriving together from different
+    sessions are encoded in one forward pass; embed_documents is already a
+    batch and is encoded directly.
+    """
+
+    def __init__(self, model_dir=LOCAL_MODEL_DIR, file_name=None, batch_size=16, max_batch=32, max_wait_ms=5,
+                 max_seq_length=512):
+        from sentence_transformers import SentenceTransformer
+
+        try:
+            self.model = SentenceTransformer(model_dir, backend="onnx", device="cpu",
+                                             model_kwargs={"file_name": file_name or quantized_file()})
+        except ImportError as e:
+            raise ImportError(f"EMBEDDING_BACKEND=local needs the onnx extra: pip install -e \".[onnx]\" ({e})") from e
+        self.model.max_seq_length = max_seq_length
+        self.batch_size = batch_size
+        self.batcher = MicroBatcher(self.encode, max_batch=max_batch, max_wait_ms=max_wait_ms,
+                                    name="local-embeddings")
+
+    def encode(self, texts):
+        vectors = self.model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True,
+                                    convert_to_numpy=True, show_progress_bar=False)
+        return vectors.tolist()
+
+    def embed_documents(self, texts):
+        return self.encode(list(texts))
+
+    def embed_query(self, text):
+        return self.batcher(text)
+
+
+def build_embeddings(backend=None):
+    """Embeddings for the offline index builds: EMBEDDING_BACKEND=local for the ONNX model, fp32 otherwise."""
+    backend = backend or os.environ.get("EMBEDDING_BACKEND", "hf")
+    if backend == "local":
+        return LocalEmbeddings(os.environ.get("LOCAL_EMBEDDING_MODEL_DIR", LOCAL_MODEL_DIR))
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=MODEL_NAME, model_kwargs={'device': 'cpu'},
+                                 encode_kwargs={'normalize_embeddings': True})
+
+
+def parity(local, reference_vectors, texts):
+    """Cosine between the local vectors and fp32 reference vectors of the same texts."""
+    local_vectors = np.asarray(local.embed_documents(texts), dtype=np.float32)
+    reference = np.asarray(reference_vectors, dtype=np.float32)
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    cosines = np.sum(local_vectors * reference, axis=1)
+    return {"min": float(cosines.min()), "mean": float(cosines.mean()),
+            "p01": float(np.percentile(cosines, 1))}
+
+
+def parity_sample(index, n=200):
+    """Row numbers of up to n documents spread evenly over the index."""
+    return np.linspace(0, len(index.docs) - 1, num=min(n, len(index.docs)), dtype=np.int64)
+
+
+def search_overlap(index, query_vectors, reference_query_vectors, k=5):
+    """Mean overlap of the top-k rows found with local and with reference query vectors."""
+    overlaps = []
+    for vector, reference in zip(query_vectors, reference_query_vectors):
+        found = {int(i) for i in index.search(vector, k)[0]}
+        expected = {int(i) for i in index.search(reference, k)[0]}
+        overlaps.append(len(found & expected) / k)
+    return float(np.mean(overlaps))
+
+
+if __name__ == "__main__":
+    import sys
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "parity"
+    if command == "export":
+        print(f"Wrote {export_quantized()}")
+    elif command == "parity":
+        from benchmarks.dense_vs_chroma import QUESTIONS
+        from dense_index import DenseIndex
+
+        index = DenseIndex("./dense_index")
+        if index.meta["dtype"] != "float32":
+            sys.exit("parity needs a float32 ./dense_index as the reference")
+        local = LocalEmbeddings()
+        sample = parity_sample(index)
+        stats = parity(local, index.vectors[sample], [index.docs[i]["page_content"] for i in sample])
+        print(f"documents: cosine min {stats['min']:.4f} p01 {stats['p01']:.4f} mean {stats['mean']:.4f}")
+
+        reference = build_embeddings("hf").embed_documents(QUESTIONS)
+        overlap = search_overlap(index, local.embed_documents(QUESTIONS), reference)
+        print(f"queries: top-5 overlap with fp32 {overlap:.3f}")
+        if stats["p01"] < MIN_COSINE_P01 or overlap < MIN_TOP5_OVERLAP:
+            sys.exit("int8 model drifted too far from fp32")
+    else:
+        sys.exit(f"Unknown command {command!r}")
@@ -0,0 +1,57 @@
+import bisect
+import threading
+
+# upper bounds in ms, Prometheus style; the last bucket catches everything slower
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram: constant memory however many observations, safe to share across threads."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+            self.count += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (the observed max for the last bucket)."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = p / 100 * self.count
+            seen = 0
+            for bound, count in zip(self.buckets, self.counts):
+                seen += count
+                if seen >= rank:
+                    return min(bound, self.max_ms)
+            return self.max_ms
+
+    def cumulative(self):
+        """(upper bound, observations at or below it) per bucket, plus count and total ms, read as one snapshot."""
+        with self._lock:
+            seen = 0
+            buckets = []
+            for bound, count in zip(self.buckets, self.counts):
+                seen += count
+                buckets.append((bound, seen))
+            return buckets, self.count, self.total_ms
+
+    def stats(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms,
+        }
@@ -0,0 +1,115 @@
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Funnels single-item calls from many threads (Streamlit sessions) into one
+    worker that runs fn over a whole batch. A batch is flushed once it holds
+    max_batch items or its first item has waited max_wait_ms, so a lone call
+    pays at most max_wait_ms extra and a burst shares one forward pass.
+
+    When fn raises on a batch, its items are run again one by one, so an
+    error reaches only the caller whose item caused it. close() answers the
+    items already submitted and stops the worker.
+    """
+
+    def __init__(self, fn, max_batch=32, max_wait_ms=5, name="micro-batcher"):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.items = 0
+        self.batch_sizes = Counter()
+        self.max_queue_depth = 0
+        self.wait_seconds = 0.0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"{self._thread.name} is closed")
+            self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def __call__(self, item):
+        return self.submit(item).result()
+
+    def close(self, timeout=None):
+        """Stops taking items; the worker answers the ones already queued, then exits."""
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _collect(self):
+        entry = self._queue.get()
+        if entry is _STOP:
+            self._stopping = True
+            return []
+        batch = [entry]
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize() + 1)
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                # close() puts nothing after the stop marker, so this is the last batch
+                self._stopping = True
+                break
+            batch.append(entry)
+        return batch
+
+    def _apply(self, batch):
+        try:
+            results = self.fn([item for item, _, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            for entry in batch:
+                self._apply([entry])
+            return
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def _run(self):
+        while not self._stopping:
+            batch = self._collect()
+            if not batch:
+                continue
+            started = time.perf_counter()
+            self.batches += 1
+            self.items += len(batch)
+            self.batch_sizes[len(batch)] += 1
+            self.wait_seconds += sum(started - queued for _, _, queued in batch)
+            self._apply(batch)
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch": self.items / self.batches if self.batches else 0.0,
+            "max_batch": max(self.batch_sizes, default=0),
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "mean_wait_ms": self.wait_seconds * 1000 / self.items if self.items else 0.0,
+        }
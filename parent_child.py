@@ -51,12 +51,16 @@ if __name__ == "__main__":
         shutil.rmtree(CHROMA_PATH)
     snapshot_download(repo_id=MODEL_NAME, repo_type='model')
 
-    embeddings = HuggingFaceEmbeddings(
-        model_name=MODEL_NAME,
-        model_kwargs={'device': 'cpu'},
-        encode_kwargs={'normalize_embeddings': True,
-                       'show_progress_bar': True}
-    )
+    if os.environ.get("EMBEDDING_BACKEND") == "local":
+        from local_embeddings import LocalEmbeddings
+        embeddings = LocalEmbeddings()
+    else:
+        embeddings = HuggingFaceEmbeddings(
+            model_name=MODEL_NAME,
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={'normalize_embeddings': True,
+                           'show_progress_bar': True}
+        )
 
     vector_db = Chroma.from_documents(
         embedding=embeddings,
@@ -0,0 +1,273 @@
+import queue
+import threading
+import time
+from contextlib import closing
+
+from generation import stream_answer
+from graph_queries import RETRIEVAL_QUERY, retrieval_params
+from instrumentation import cache_outcome, span
+
+
+HYBRID_TEMPLATE = '''
+            You are an expert Legal Assistant for Indian Consumer Law.
+            Answer the user's question STRICTLY based on the provided context below.
+            Rules:
+            1. If the answer is not in the context, state "I cannot find the answer in the provided legal documents."
+            2. Use the "Relevant Sections" to support your legal arguments.
+            Context: {context}
+
+            My question is {question}
+
+            '''
+
+GRAPH_SYSTEM_PROMPT = """
+            You are an expert Legal Assistant for Indian Consumer Law.
+            Answer the user's question STRICTLY based on the provided context below.
+
+            Rules:
+            1. Use the "Relevant Definitions" to clarify terms.
+            2. Use the "Relevant Sections" to support your legal arguments.
+            3. Pay special attention to "Connected Entities" to understand who is responsible (e.g., Authorities vs Stakeholders).
+            4. If the answer is not in the context, state "I cannot find the answer in the provided legal documents."
+
+            Context:
+            {llm_query}
+            """
+
+def llm_context(context):
+    llm_query=''
+    if context:
+        if context['definitions']:
+            llm_query += 'Relevant Legal Definitions:\n'
+            for item in context['definitions']:
+                llm_query+=f'Term: {item["term"]}\n'
+                llm_query += f'Source: {item["source"]}\n'
+                llm_query += f'Definition: {item["definition"]}\n'
+
+                llm_query += f'Score: {item["score"]}\n\n'
+        # with no sections the definitions are the whole context; nothing at all gives ''
+        if context['sections']:
+            llm_query += 'Relevant Legal Sections:\n'
+            for item in context['sections']:
+                llm_query += f'Title: {item["title"]}\n'
+                llm_query += f'Text: {item["text"]}\n'
+
+                if item['mentions']:
+                    mentions=[m for m in item['mentions']]
+                    llm_query += f'Mentions: {", ".join(mentions)}\n'
+    return llm_query
+
+
+def retrieve_units(retriever, prompt):
+    """(parent_section_id, chunk_index) of the retrieved child units, best first."""
+    if hasattr(retriever, "matched_units"):
+        # FusedHybridRetriever resolves them without building Documents
+        return retriever.matched_units(prompt)
+    return [
+        (doc.metadata.get("parent_section_id"), doc.metadata.get("chunk_index"))
+        for doc in retriever.invoke(prompt)
+        if doc.metadata.get("parent_section_id")
+    ]
+
+
+def retrieve_parent_ids(retriever, prompt):
+    """Unique parent section ids of the retrieved child units, best first."""
+    if hasattr(retriever, "parent_section_ids"):
+        return retriever.parent_section_ids(prompt)
+    parent_ids = []
+    for p_id, _ in retrieve_units(retriever, prompt):
+        if p_id not in parent_ids:
+            parent_ids.append(p_id)
+    return parent_ids
+
+
+# Each pipeline is a generator of (kind, payload) events:
+#   ("status", message) -> progress line for the st.status box
+#   ("context", text)   -> retrieved context, ready to show in the expander
+#   ("sources", (units, expand)) -> hybrid only: the (section_id, chunk_index) units the context was
+#                          packed from, and the ContextStore.pack expand flag it was packed with
+#   ("token", chunk)    -> a piece of the streamed answer
+def parse_citations(citations, prompt):
+    """Section references in the prompt and whether it is nothing but them; none without a CitationIndex."""
+    if citations is None:
+        return [], False
+    with span("citations"):
+        return citations.parse(prompt)
+
+
+def cited_labels(refs):
+    from citations import label
+
+    return ", ".join(f"section {label(ref)}" for ref in refs)
+
+
+def hybrid_pipeline(prompt, ensemble_retriever, vector_llm, context_store, answer_cache=None, citations=None):
+    refs, lookup_only = parse_citations(citations, prompt)
+    if lookup_only:
+        yield "status", f"Looked up {cited_labels(refs)} in the citation index, no retrieval needed"
+        units = citations.units(refs)
+    else:
+        yield "status", "Retrieving relevant context"
+        with span("retrieve"):
+            units = retrieve_units(ensemble_retriever, prompt)
+        if refs:
+            # the cited units lead and retrieval fills what is left of the budget
+            yield "status", f"Added {cited_labels(refs)} from the citation index"
+            units = citations.units(refs) + units
+    with span("context_pack"):
+        # a citation is answered from the cited units alone, not the rest of their sections
+        hybrid_context_text, section_ids = context_store.pack(units, expand=not lookup_only)
+    seen_ids = set(section_ids)
+    yield "context", hybrid_context_text
+    yield "sources", (units, not lookup_only)
+
+    if answer_cache is not None:
+        with span("answer_cache"):
+            cached = answer_cache.lookup("hybrid", prompt, seen_ids)
+        cache_outcome("answer", cached is not None)
+        if cached is not None:
+            yield "status", "Served a cached answer for a similar question"
+            yield "token", cached
+            return
+
+    yield "status", "Generating answer from the retrieved context"
+    from langchain_core.prompts import ChatPromptTemplate
+
+    prompt_template = ChatPromptTemplate.from_template(HYBRID_TEMPLATE)
+    answer = ""
+    with closing(stream_answer(vector_llm, prompt_template,
+                               {"context": hybrid_context_text, "question": prompt})) as chunks:
+        for chunk in chunks:
+            answer += chunk
+            yield "token", chunk
+    if answer_cache is not None and answer:
+        answer_cache.store("hybrid", prompt, seen_ids, answer)
+
+
+def graph_source_ids(context):
+    if not context:
+        return set()
+    ids = {f"section:{item['title']}" for item in context['sections']}
+    ids.update(f"definition:{item['term']}" for item in context['definitions'])
+    return ids
+
+
+def query_graph_context(prompt, graph, embeddings, act_router=None, graph_search=None, graph_params=None):
+    user_query_vector = embeddings.embed_query(prompt)
+    params = retrieval_params(user_query_vector, **(graph_params or {}))
+    with span("graph_query"):
+        if act_router is not None:
+            # multi-Act corpus: only the routed Acts' graph databases are queried
+            from sharding import query_graph_shards
+
+            return query_graph_shards(graph, RETRIEVAL_QUERY, params, act_router.graph_databases(user_query_vector))
+        if graph_search is not None:
+            # in-process GraphSnapshot, or RequestScheduler batching it with other sessions' searches
+            return graph_search(user_query_vector)
+        result = graph.query(RETRIEVAL_QUERY, params=params)
+        if not result:
+            return None
+        return result[0]['context']
+
+
+def graph_pipeline(prompt, graph, embeddings, llm, answer_cache=None, act_router=None, graph_search=None,
+                   graph_params=None, citations=None):
+    refs, lookup_only = parse_citations(citations, prompt)
+    if lookup_only:
+        yield "status", f"Looked up {cited_labels(refs)} in the citation index, no graph query needed"
+        context = citations.graph_context(refs)
+    else:
+        yield "status", "Querying Neo4j graph on vector embedding index"
+        context = query_graph_context(prompt, graph, embeddings, act_router, graph_search, graph_params)
+        if refs:
+            yield "status", f"Added {cited_labels(refs)} from the citation index"
+            context = citations.merge_graph_context(context, refs)
+    with span("llm_context"):
+        graph_context_text = llm_context(context)
+    if not graph_context_text:
+        graph_context_text = "No relevant context from the graph was found"
+    yield "status", "graph context retrieved"
+    yield "context", graph_context_text
+
+    source_ids = graph_source_ids(context)
+    if answer_cache is not None:
+        with span("answer_cache"):
+            cached = answer_cache.lookup("graph", prompt, source_ids)
+        cache_outcome("answer", cached is not None)
+        if cached is not None:
+            yield "status", "Served a cached answer for a similar question"
+            yield "token", cached
+            return
+
+    yield "status", "Generating the answer"
+    from langchain_core.prompts import ChatPromptTemplate
+
+    prompt_template = ChatPromptTemplate.from_messages([('system', GRAPH_SYSTEM_PROMPT), ('user', "{question}")])
+    answer = ""
+    with closing(stream_answer(llm, prompt_template, {'llm_query': graph_context_text, 'question': prompt})) as chunks:
+        for chunk in chunks:
+            answer += chunk
+            yield "token", chunk
+    if answer_cache is not None and answer:
+        answer_cache.store("graph", prompt, source_ids, answer)
+
+
+def _drain(name, pipeline, events, cancel):
+    started = time.perf_counter()
+    try:
+        for kind, payload in pipeline:
+            if cancel.is_set():
+                # nobody is reading any more; closing the pipeline closes its LLM stream
+                pipeline.close()
+                break
+            events.put((name, kind, payload))
+    except Exception as e:
+        events.put((name, "error", e))
+    finally:
+        events.put((name, "done", time.perf_counter() - started))
+
+
+def run_pipelines(pipelines, concurrent=True):
+    """
+    Runs the named pipeline generators and yields (name, kind, payload) events.
+    Every pipeline ends with a ("done", seconds) event carrying its own duration.
+    In concurrent mode each pipeline runs in its own thread and events are
+    yielded as they arrive, so the caller (Streamlit's script thread) can
+    update both columns at once without touching st.* from the workers.
+
+    Closing this generator early (Streamlit stopping the script for a rerun
+    or a new question) cancels the pipelines still running: they are closed at
+    their next event, which closes their LLM streams.
+    """
+    if not concurrent:
+        try:
+            for name, pipeline in pipelines.items():
+                started = time.perf_counter()
+                try:
+                    for kind, payload in pipeline:
+                        yield name, kind, payload
+                except Exception as e:
+                    yield name, "error", e
+                yield name, "done", time.perf_counter() - started
+        finally:
+            for pipeline in pipelines.values():
+                pipeline.close()
+        return
+
+    events = queue.Queue()
+    cancel = threading.Event()
+    workers = [
+        threading.Thread(target=_drain, args=(name, pipeline, events, cancel), daemon=True)
+        for name, pipeline in pipelines.items()
+    ]
+    for worker in workers:
+        worker.start()
+    remaining = len(workers)
+    try:
+        while remaining:
+            name, kind, payload = events.get()
+            if kind == "done":
+                remaining -= 1
+            yield name, kind, payload
+    finally:
+        cancel.set()
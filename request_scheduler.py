@@ -0,0 +1,68 @@
+from langchain_core.embeddings import Embeddings
+
+from micro_batch import MicroBatcher
+
+
+class BatchedEmbeddings(Embeddings):
+    """embed_query calls from every session, coalesced into embed_documents calls on the client."""
+
+    def __init__(self, client, batcher):
+        self.client = client
+        self.batcher = batcher
+
+    def embed_documents(self, texts):
+        return self.client.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.batcher(text)
+
+
+class RequestScheduler:
+    """
+    Process-wide scheduler shared by every Streamlit session (app.py keeps it
+    in st.cache_resource). Query embeddings and graph vector searches that
+    arrive within max_wait_ms of each other go out as one batched call, and
+    each caller gets back its own result.
+    """
+
+    def __init__(self, max_batch=16, max_wait_ms=5):
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.batchers = {}
+
+    def _batcher(self, name, fn):
+        if name not in self.batchers:
+            self.batchers[name] = MicroBatcher(fn, max_batch=self.max_batch, max_wait_ms=self.max_wait_ms,
+                                               name=f"scheduler-{name}")
+        return self.batchers[name]
+
+    def embeddings(self, client):
+        def embed(texts):
+            # the same question asked in two sessions at once is embedded once
+            unique = list(dict.fromkeys(texts))
+            vectors = dict(zip(unique, client.embed_documents(unique)))
+            return [vectors[text] for text in texts]
+
+        return BatchedEmbeddings(client, self._batcher("embed", embed))
+
+    def graph_search(self, graph, batched_query, params=None):
+        """
+        A function vector -> context (or None) that batches calls into one query.
+        batched_query reads the vectors from $embeddings and returns (i, context)
+        rows, like graph_queries.BATCHED_RETRIEVAL_QUERY; params are shared by the batch.
+        """
+        params = dict(params or {})
+
+        def search(vectors):
+            rows = graph.query(batched_query, params=dict(params, embeddings=vectors))
+            contexts = {row["i"]: row["context"] for row in rows}
+            return [contexts.get(i) for i in range(len(vectors))]
+
+        return self._batcher("graph", search)
+
+    def stats(self):
+        return {name: batcher.stats() for name, batcher in self.batchers.items()}
+
+    def close(self):
+        for batcher in self.batchers.values():
+            batcher.close()
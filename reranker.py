@@ -0,0 +1,110 @@
+"""
+Cross-encoder re-ranking of the hybrid retriever's candidates, on CPU.
+
+The default model is the int8-quantized ONNX export of ms-marco-MiniLM-L-6-v2,
+run through sentence-transformers' ONNX backend, which needs the onnx extra
+shared with EMBEDDING_BACKEND=local (pip install -e ".[onnx]"). Without it the
+reranker falls back to the same model on the torch backend and logs a warning;
+self.backend says which one is measured.
+"""
+import logging
+import time
+
+import numpy as np
+
+from instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+ONNX_FILE = "onnx/model_qint8_avx2.onnx"
+
+
+class CrossEncoderReranker:
+    """
+    Scores (query, unit) pairs in one batched forward pass. With a
+    latency_budget_ms it keeps a running estimate of the cost per pair and
+    scores only as many candidates, in retrieval order, as fit the budget.
+    """
+
+    def __init__(self, model_name=RERANKER_MODEL, backend="onnx", onnx_file=ONNX_FILE, max_length=256,
+                 batch_size=32, latency_budget_ms=None):
+        from sentence_transformers import CrossEncoder
+
+        self.model_name = model_name
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.latency_budget_ms = latency_budget_ms
+        self.ms_per_pair = None
+        if backend == "onnx":
+            try:
+                self.model = CrossEncoder(model_name, device="cpu", max_length=max_length, backend="onnx",
+                                          model_kwargs={"file_name": onnx_file})
+            except ImportError as e:
+                logger.warning('ONNX backend unavailable (%s); using torch. Install the onnx extra: '
+                               'pip install -e ".[onnx]"', e)
+                backend = "torch"
+        if backend == "torch":
+            self.model = CrossEncoder(model_name, device="cpu", max_length=max_length)
+        self.backend = backend
+
+    def affordable(self, n_candidates):
+        if self.latency_budget_ms is None or self.ms_per_pair is None:
+            return n_candidates
+        return max(1, min(n_candidates, int(self.latency_budget_ms / self.ms_per_pair)))
+
+    def score(self, query, texts):
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        started = time.perf_counter()
+        with span("rerank"):
+            scores = self.model.predict([(query, text) for text in texts], batch_size=self.batch_size,
+                                        show_progress_bar=False, convert_to_numpy=True)
+        ms_per_pair = (time.perf_counter() - started) * 1000 / len(texts)
+        # smoothed, so one slow call (a cold start, a GC pause) does not starve the next queries
+        self.ms_per_pair = ms_per_pair if self.ms_per_pair is None else 0.8 * self.ms_per_pair + 0.2 * ms_per_pair
+        return np.asarray(scores, dtype=np.float32)
+
+    def rerank(self, query, docs):
+        """docs re-ordered by cross-encoder score; candidates past the latency budget keep their order at the end."""
+        n = self.affordable(len(docs))
+        scores = self.score(query, [doc.page_content for doc in docs[:n]])
+        order = np.argsort(-scores, kind="stable")
+        return [docs[i] for i in order] + docs[n:]
+
+
+class RerankedRetriever:
+    """
+    Wraps a hybrid retriever built with a deep k (e.g. 30 candidates), re-ranks
+    its units with the cross-encoder and keeps the units of the best top_parents
+    sections, so fewer and better sections reach the prompt.
+    """
+
+    def __init__(self, retriever, reranker, top_parents=3):
+        self.retriever = retriever
+        self.reranker = reranker
+        self.top_parents = top_parents
+
+    def invoke(self, query):
+        docs = self.reranker.rerank(query, self.retriever.invoke(query))
+        parent_ids = []
+        kept = []
+        for doc in docs:
+            p_id = doc.metadata.get("parent_section_id")
+            if p_id not in parent_ids:
+                if len(parent_ids) == self.top_parents:
+                    continue
+                parent_ids.append(p_id)
+            kept.append(doc)
+        return kept
+
+    def matched_units(self, query):
+        return [(doc.metadata.get("parent_section_id"), doc.metadata.get("chunk_index"))
+                for doc in self.invoke(query)]
+
+    def parent_section_ids(self, query):
+        parent_ids = []
+        for p_id, _ in self.matched_units(query):
+            if p_id not in parent_ids:
+                parent_ids.append(p_id)
+        return parent_ids
@@ -9,59 +9,98 @@ BASE_URL = "https://www.indiacode.nic.in"
 # The Main Page where all chapters are listed
 MAIN_ACT_URL = "https://www.indiacode.nic.in/handle/123456789/15256"
 
+# India Code files every Act under a publisher: central Acts are abv=CEN under this state handle,
+# each State's Acts under its own abbreviation and handle
+CENTRAL_ABV = "CEN"
+CENTRAL_STATEHANDLE = "123456789/1362"
+
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 }
 
 
-def get_chapter_urls_from_main_page():
+def parse_chapter_links(html, base_url=BASE_URL, abv=CENTRAL_ABV, statehandle=CENTRAL_STATEHANDLE):
     """
-    Parses the main page to find hidden Chapter IDs and constructs their URLs.
+    Finds the hidden Chapter IDs on an Act's main page and constructs their URLs.
     Mimics the JavaScript logic found in the website source code.
+    abv and statehandle identify who publishes the Act (the Centre by default).
     """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # We found that chapters use the class "headingtwo"
+    chapter_links = soup.find_all('a', class_='headingtwo')
+
+    chapter_list = []
+    for link in chapter_links:
+        title = link.get_text(strip=True)
+        element_id = link.get('id')  # This ID holds the secret numbers
+
+        if element_id:
+            # The JS logic splits the ID by '#'
+            # Format: act_id # h1id # h2id # orgID
+            parts = element_id.split('#')
+
+            if len(parts) >= 4:
+                act_id = parts[0]
+                h1id = parts[1]
+                h2id = parts[2]
+                org_id = parts[3]
+
+                # Construct the URL manually (Reverse Engineering the JS)
+                # Note: The JS uses h1id for both h3id and h4id
+                chapter_url = (
+                    f"{base_url}/ChapterIndexWiseSection?"
+                    f"abv={abv}&statehandle={statehandle}"
+                    f"&actid={act_id}&h1id={h1id}&h2id={h2id}"
+                    f"&h3id={h1id}&h4id={h1id}&orgactid={org_id}"
+                    f"&headingno=headingtwo"
+                )
+
+                chapter_list.append({
+                    "title": title,
+                    "url": chapter_url
+                })
+    return chapter_list
+
+
+def parse_section_links(html, base_url=BASE_URL):
+    """(title, absolute url) of every section listed on a chapter page."""
+    soup = BeautifulSoup(html, 'html.parser')
+    links = soup.find_all('a')
+
+    # Find valid section links
+    return [(l.get_text(strip=True), base_url + l['href'])
+            for l in links if l.get('href') and 'show-data' in l.get('href')]
+
+
+def section_api_url(full_url, base_url=BASE_URL):
+    """The hidden SectionPageContent API URL behind a show-data section link, or None."""
+    parsed_url = urlparse(full_url)
+    params = parse_qs(parsed_url.query)
+
+    act_id = params.get('actid', [None])[0]
+    section_id = params.get('sectionId', [None])[0]
+
+    if not act_id or not section_id:
+        return None
+    return f"{base_url}/SectionPageContent?actid={act_id}&sectionID={section_id}"
+
+
+def section_text(payload):
+    return BeautifulSoup(payload['content'], 'html.parser').get_text(separator="\n", strip=True)
+
+
+def get_chapter_urls_from_main_page():
     print(f"🕵️‍♂️ Scanning Main Page for Chapters...")
     response = requests.get(MAIN_ACT_URL, headers=HEADERS)
 
     chapter_list = []
 
     if response.status_code == 200:
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # We found that chapters use the class "headingtwo"
-        chapter_links = soup.find_all('a', class_='headingtwo')
-
-        print(f"✅ Found {len(chapter_links)} Chapters.")
-
-        for link in chapter_links:
-            title = link.get_text(strip=True)
-            element_id = link.get('id')  # This ID holds the secret numbers
-
-            if element_id:
-                # The JS logic splits the ID by '#'
-                # Format: act_id # h1id # h2id # orgID
-                parts = element_id.split('#')
-
-                if len(parts) >= 4:
-                    act_id = parts[0]
-                    h1id = parts[1]
-                    h2id = parts[2]
-                    org_id = parts[3]
-
-                    # Construct the URL manually (Reverse Engineering the JS)
-                    # Note: The JS uses h1id for both h3id and h4id
-                    chapter_url = (
-                        f"{BASE_URL}/ChapterIndexWiseSection?"
-                        f"abv=CEN&statehandle=123456789/1362"
-                        f"&actid={act_id}&h1id={h1id}&h2id={h2id}"
-                        f"&h3id={h1id}&h4id={h1id}&orgactid={org_id}"
-                        f"&headingno=headingtwo"
-                    )
-
-                    chapter_list.append({
-                        "title": title,
-                        "url": chapter_url
-                    })
-                    print(f"   -> Discovered: {title}")
+        chapter_list = parse_chapter_links(response.content)
+        print(f"✅ Found {len(chapter_list)} Chapters.")
+        for chapter in chapter_list:
+            print(f"   -> Discovered: {chapter['title']}")
 
     return chapter_list
 
@@ -69,22 +108,14 @@ def get_chapter_urls_from_main_page():
 def fetch_section_text(full_url):
     """Hits the hidden API to get the text for a specific section."""
     try:
-        parsed_url = urlparse(full_url)
-        params = parse_qs(parsed_url.query)
-
-        act_id = params.get('actid', [None])[0]
-        section_id = params.get('sectionId', [None])[0]
-
-        if not act_id or not section_id:
+        api_url = section_api_url(full_url)
+        if not api_url:
             return None
 
-        api_url = f"{BASE_URL}/SectionPageContent?actid={act_id}&sectionID={section_id}"
         response = requests.get(api_url, headers=HEADERS)
 
         if response.status_code == 200:
-            data = response.json()
-            clean_text = BeautifulSoup(data['content'], 'html.parser').get_text(separator="\n", strip=True)
-            return clean_text
+            return section_text(response.json())
     except:
         return None
     return None
@@ -103,21 +134,14 @@ def scrape_entire_act():
         response = requests.get(chapter['url'], headers=HEADERS)
 
         if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-            links = soup.find_all('a')
-
-            # Find valid section links
-            section_links = [l for l in links if l.get('href') and 'show-data' in l.get('href')]
+            section_links = parse_section_links(response.content)
 
             print(f"   Found {len(section_links)} sections.")
 
             chapter_sections = []
 
             # 3. Loop through each Section in this Chapter
-            for link in section_links:
-                sec_title = link.get_text(strip=True)
-                full_link = BASE_URL + link['href']
-
+            for sec_title, full_link in section_links:
                 print(f"      Downloading: {sec_title[:40]}...")
 
                 content = fetch_section_text(full_link)
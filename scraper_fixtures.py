@@ -0,0 +1,89 @@
+"""
+Local stand-in for indiacode.nic.in, for running async_scraper offline.
+
+Fixtures are simply an HttpCache directory: record them once with
+    python -c "import asyncio, async_scraper as s; asyncio.run(s.scrape_acts(s.ACTS, '/tmp', cache_dir='scraper_fixtures'))"
+and replay them with
+    python scraper_fixtures.py scraper_fixtures 8765
+    python -c "import asyncio, async_scraper as s; asyncio.run(s.scrape_acts(s.ACTS, base_url='http://127.0.0.1:8765'))"
+The server answers conditional requests, so cache behaviour can be checked too.
+tests/fixtures/indiacode holds a small hand-built set in the site's page shapes,
+which tests/test_async_scraper.py replays.
+"""
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+def request_key(url):
+    parts = urlsplit(url)
+    return parts.path + ("?" + parts.query if parts.query else "")
+
+
+def load_fixtures(fixtures_dir):
+    fixtures = {}
+    for name in os.listdir(fixtures_dir):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(fixtures_dir, name), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        fixtures[request_key(entry["url"])] = entry
+    return fixtures
+
+
+class FixtureServer:
+    """Serves recorded responses on 127.0.0.1 from a background thread; usable as a context manager."""
+
+    def __init__(self, fixtures, port=0):
+        self.fixtures = fixtures
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(self.path)
+                entry = server.fixtures.get(self.path)
+                if entry is None:
+                    self.send_error(404)
+                    return
+                etag = f'"{entry["content_hash"]}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                body = entry["body"].encode("utf-8")
+                content_type = "application/json" if "SectionPageContent" in self.path else "text/html"
+                self.send_response(200)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    fixtures_dir = sys.argv[1] if len(sys.argv) > 1 else "scraper_fixtures"
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+    with FixtureServer(load_fixtures(fixtures_dir), port) as fixture_server:
+        print(f"Serving {len(fixture_server.fixtures)} fixtures at {fixture_server.base_url}")
+        threading.Event().wait()
@@ -0,0 +1,252 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import numpy as np
+from langchain_core.documents import Document
+
+from bm25_index import BM25Index, build_bm25_index
+from context_store import build_context_store
+from dense_index import DenseIndex, normalize_rows, write_dense_index
+from graph_ingest import embed_in_batches
+from hybrid_retriever import FusedHybridRetriever, fuse, top_fused
+from parent_child import parent_child
+
+
+SHARDS_ROOT = "./shards"
+
+# Layout of a shards root:
+#   manifest.json               {act_id: {"title": ..., "graph_database": ...}}
+#   <act_id>/bm25_index/        BM25Index
+#   <act_id>/dense_index/       DenseIndex
+#   <act_id>/context_store.json section_id -> section text and its token-counted units
+#   <act_id>/centroids.npy      row 0 is the whole Act, then one row per chapter
+#   router/centroids.npy        every shard's centroid rows stacked
+#   router/acts.json            act_id of each router row
+
+
+def composite_id(act_id, section_id):
+    # section ids repeat across Acts (every Act has a section 2), so shard results carry the act
+    return f"{act_id}/{section_id}"
+
+
+def split_id(p_id):
+    act_id, _, section_id = p_id.partition("/")
+    return act_id, section_id
+
+
+def load_manifest(root=SHARDS_ROOT):
+    path = os.path.join(root, "manifest.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_shard(act_id, anchored_path, embeddings, root=SHARDS_ROOT, title=None, graph_database=None,
+                dtype="float32"):
+    """Builds the BM25, dense and context-store shard of one Act and registers it in the manifest."""
+    if "/" in act_id:
+        raise ValueError(f"act_id may not contain '/': {act_id!r}")
+    shard_dir = os.path.join(root, act_id)
+    parents, children = parent_child(anchored_path)
+
+    build_bm25_index(children, os.path.join(shard_dir, "bm25_index"))
+    vectors = normalize_rows(embed_in_batches(embeddings, [doc.page_content for doc in children]))
+    write_dense_index(vectors, children, os.path.join(shard_dir, "dense_index"), dtype)
+
+    build_context_store(anchored_path, os.path.join(shard_dir, "context_store.json"))
+
+    chapter_of = {doc.metadata["section_id"]: doc.metadata["chapter"] for doc in parents}
+    chapters = {}
+    for doc, vector in zip(children, vectors):
+        chapters.setdefault(chapter_of[doc.metadata["parent_section_id"]], []).append(vector)
+    centroids = [vectors.mean(axis=0)] + [np.mean(rows, axis=0) for rows in chapters.values()]
+    np.save(os.path.join(shard_dir, "centroids.npy"), normalize_rows(np.array(centroids)))
+
+    manifest = load_manifest(root)
+    manifest[act_id] = {"title": title or act_id, "graph_database": graph_database}
+    with open(os.path.join(root, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+
+
+def build_router(root=SHARDS_ROOT):
+    rows = []
+    acts = []
+    for act_id in sorted(load_manifest(root)):
+        centroids = np.load(os.path.join(root, act_id, "centroids.npy"))
+        rows.append(centroids)
+        acts.extend([act_id] * len(centroids))
+    os.makedirs(os.path.join(root, "router"), exist_ok=True)
+    np.save(os.path.join(root, "router", "centroids.npy"), np.concatenate(rows).astype(np.float32))
+    with open(os.path.join(root, "router", "acts.json"), "w", encoding="utf-8") as f:
+        json.dump(acts, f)
+
+
+class ActRouter:
+    """Picks the Acts worth searching from a small matrix of Act and chapter centroids."""
+
+    def __init__(self, root=SHARDS_ROOT):
+        self.manifest = load_manifest(root)
+        self.centroids = np.load(os.path.join(root, "router", "centroids.npy"))
+        with open(os.path.join(root, "router", "acts.json"), encoding="utf-8") as f:
+            row_acts = json.load(f)
+        self.act_ids = sorted(set(row_acts))
+        act_index = {act_id: i for i, act_id in enumerate(self.act_ids)}
+        self.row_act = np.array([act_index[act_id] for act_id in row_acts], dtype=np.int64)
+
+    def route(self, query_vector, n_acts=3):
+        """[(act_id, score)] for the best n_acts, scoring each Act by its best matching centroid."""
+        row_scores = self.centroids @ normalize_rows(query_vector)
+        act_scores = np.full(len(self.act_ids), -np.inf, dtype=np.float32)
+        np.maximum.at(act_scores, self.row_act, row_scores)
+        order = np.argsort(-act_scores)[:n_acts]
+        return [(self.act_ids[i], float(act_scores[i])) for i in order]
+
+    def graph_databases(self, query_vector, n_acts=3):
+        routed = self.route(query_vector, n_acts)
+        return [self.manifest[act_id]["graph_database"] for act_id, _ in routed
+                if self.manifest[act_id].get("graph_database")]
+
+
+class ShardedSections(Mapping):
+    """Context-store sections of every shard, keyed by composite 'act_id/section_id' ids."""
+
+    def __init__(self, retriever):
+        self.retriever = retriever
+
+    def __getitem__(self, p_id):
+        act_id, section_id = split_id(p_id)
+        return self.retriever.shard(act_id)[1][section_id]
+
+    def __iter__(self):
+        for act_id in self.retriever.router.act_ids:
+            for section_id in self.retriever.shard(act_id)[1]:
+                yield composite_id(act_id, section_id)
+
+    def __len__(self):
+        return sum(len(self.retriever.shard(act_id)[1]) for act_id in self.retriever.router.act_ids)
+
+
+class ShardedHybridRetriever:
+    """
+    Routes a query to its most likely Acts and runs the fused hybrid search
+    only inside those shards, so query cost follows n_acts rather than the
+    corpus size. Opened shards are memory mapped and kept in a small LRU.
+    """
+
+    def __init__(self, embeddings, root=SHARDS_ROOT, n_acts=3, k=10, candidate_depth=30, fusion="rrf",
+                 max_open_shards=32):
+        self.embeddings = embeddings
+        self.root = root
+        self.n_acts = n_acts
+        self.k = k
+        self.candidate_depth = candidate_depth
+        self.fusion = fusion
+        self.max_open_shards = max_open_shards
+        self.router = ActRouter(root)
+        self.context_sections = ShardedSections(self)
+        self._shards = OrderedDict()
+        self._lock = threading.Lock()
+
+    def shard(self, act_id):
+        with self._lock:
+            if act_id in self._shards:
+                self._shards.move_to_end(act_id)
+                return self._shards[act_id]
+        shard_dir = os.path.join(self.root, act_id)
+        retriever = FusedHybridRetriever(
+            bm25_index=BM25Index(os.path.join(shard_dir, "bm25_index")),
+            dense_index=DenseIndex(os.path.join(shard_dir, "dense_index")),
+            embeddings=self.embeddings, k=self.k, candidate_depth=self.candidate_depth, fusion=self.fusion)
+        with open(os.path.join(shard_dir, "context_store.json"), encoding="utf-8") as f:
+            sections = json.load(f)
+        with self._lock:
+            self._shards[act_id] = (retriever, sections)
+            while len(self._shards) > self.max_open_shards:
+                self._shards.popitem(last=False)
+        return retriever, sections
+
+    def search(self, query, query_vector=None):
+        """
+        [(act_id, row, fused score)] over the routed shards, best first. The
+        shards' BM25 and dense scores are fused once over their union: RRF ranks
+        and min-max ranges taken per shard would make every shard's top hit tie.
+        """
+        if query_vector is None:
+            query_vector = self.embeddings.embed_query(query)
+        owners = []
+        bm25_parts = []
+        dense_parts = []
+        for act_id, _ in self.router.route(query_vector, self.n_acts):
+            retriever, _ = self.shard(act_id)
+            bm25, dense = retriever.raw_scores(query, query_vector)
+            weights, rrf_c = retriever.weights, retriever.rrf_c
+            owners.append((act_id, len(bm25)))
+            bm25_parts.append(bm25)
+            dense_parts.append(dense)
+        if not owners:
+            return []
+        bm25, dense = np.concatenate(bm25_parts), np.concatenate(dense_parts)
+        fused, first_seen = fuse(bm25, dense, self.fusion, weights, self.candidate_depth, rrf_c)
+        top = top_fused(fused, first_seen, self.k)
+        # global row -> (act_id, row in its shard)
+        offsets = np.cumsum([0] + [n for _, n in owners])
+        shard_of = np.searchsorted(offsets, top, side="right") - 1
+        return [(owners[i][0], int(row - offsets[i]), float(fused[row])) for i, row in zip(shard_of, top)]
+
+    def matched_units(self, query, query_vector=None):
+        units = []
+        for act_id, row, _ in self.search(query, query_vector):
+            metadata = self.shard(act_id)[0].bm25_index.docs[row]["metadata"]
+            units.append((composite_id(act_id, metadata["parent_section_id"]), metadata.get("chunk_index")))
+        return units
+
+    def parent_section_ids(self, query, query_vector=None):
+        parent_ids = []
+        for p_id, _ in self.matched_units(query, query_vector):
+            if p_id not in parent_ids:
+                parent_ids.append(p_id)
+        return parent_ids
+
+    def invoke(self, query):
+        docs = []
+        for act_id, row, _ in self.search(query):
+            doc = self.shard(act_id)[0].bm25_index.document(row)
+            metadata = dict(doc.metadata, act_id=act_id,
+                            parent_section_id=composite_id(act_id, doc.metadata["parent_section_id"]))
+            docs.append(Document(page_content=doc.page_content, metadata=metadata))
+        return docs
+
+
+def query_graph_shards(graph, query, params, databases):
+    """Runs the graph retrieval query in each Act's database and merges the {sections, definitions} contexts."""
+    merged = {"sections": [], "definitions": []}
+    for database in databases:
+        for row in graph.query(query, params, database=database):
+            context = row["context"]
+            merged["sections"].extend(context["sections"])
+            merged["definitions"].extend(context["definitions"])
+    merged["sections"].sort(key=lambda item: -item["score"])
+    merged["definitions"].sort(key=lambda item: -item["score"])
+    return merged if merged["sections"] or merged["definitions"] else None
+
+
+if __name__ == "__main__":
+    import sys
+
+    from dotenv import load_dotenv
+
+    from local_embeddings import build_embeddings
+
+    load_dotenv()
+    if sys.argv[1:2] == ["build"]:
+        # python sharding.py build <act_id> <anchored.json> [title] [graph database]
+        act_id, anchored_path = sys.argv[2], sys.argv[3]
+        title = sys.argv[4] if len(sys.argv) > 4 else None
+        graph_database = sys.argv[5] if len(sys.argv) > 5 else None
+        build_shard(act_id, anchored_path, build_embeddings(), title=title, graph_database=graph_database)
+    build_router()
+    print(f"Router covers {len(load_manifest())} acts")
@@ -0,0 +1,148 @@
+"""
+Startup profiling and background warm-up for app.py.
+
+    python startup.py     # import time of each module app.py loads, each in a fresh interpreter
+"""
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from instrumentation import span
+
+# what app.py imports at the top, and what its resource builders import lazily
+APP_MODULES = [
+    "streamlit", "numpy", "langchain_core.embeddings", "pipelines", "answer_cache", "embedding_cache",
+    "embedding_service", "request_scheduler", "graph_client", "startup",
+]
+LAZY_MODULES = [
+    "bm25_index", "dense_index", "hybrid_retriever", "context_store", "sharding", "reranker", "local_embeddings",
+    "graph_snapshot", "langchain_huggingface", "langchain_google_genai", "langchain_community.vectorstores",
+    "langchain_classic.retrievers", "chromadb", "neo4j", "sentence_transformers",
+]
+
+
+def import_time_ms(module, python=sys.executable):
+    """Cumulative import time of module in a fresh interpreter, from python -X importtime; None if it fails."""
+    completed = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"],
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        return None
+    for line in reversed(completed.stderr.splitlines()):
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.strip() == module and not name[1:].startswith(" "):
+            return int(cumulative) / 1000
+    return None
+
+
+class StartupProfile:
+    """Wall-clock timeline of startup stages, measured from process start (the first import of this module)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, started, time.perf_counter())
+
+    def record(self, name, started, finished):
+        with self._lock:
+            self.stages.append({
+                "stage": name,
+                "thread": threading.current_thread().name,
+                "start_ms": (started - self.started) * 1000,
+                "duration_ms": (finished - started) * 1000,
+            })
+
+    def mark(self, name):
+        """Records the first time a point (e.g. the first render) is reached."""
+        with self._lock:
+            if any(stage["stage"] == name for stage in self.stages):
+                return
+        now = time.perf_counter()
+        self.record(name, now, now)
+
+    def report(self):
+        with self._lock:
+            return sorted(self.stages, key=lambda stage: stage["start_ms"])
+
+
+PROFILE = StartupProfile()
+
+
+class Warmup:
+    """
+    Builds named resources on background threads so the first render does not
+    wait for them. Each resource is awaited on its own, so a pipeline can start
+    as soon as the resources it needs are ready.
+    """
+
+    def __init__(self, profile=PROFILE):
+        self.profile = profile
+        self.futures = {}
+
+    def start(self, name, factory):
+        future = Future()
+        self.futures[name] = future
+
+        def build():
+            try:
+                with self.profile.stage(f"warm-up {name}"):
+                    future.set_result(factory())
+            except Exception as e:
+                future.set_exception(e)
+
+        threading.Thread(target=build, name=f"warmup-{name}", daemon=True).start()
+        return future
+
+    def result(self, name, timeout=None):
+        """The resource, once built; re-raises the error if building it failed."""
+        return self.futures[name].result(timeout)
+
+    def ready(self, name):
+        future = self.futures[name]
+        return future.done() and future.exception() is None
+
+    def status(self):
+        statuses = {}
+        for name, future in self.futures.items():
+            if not future.done():
+                statuses[name] = "loading"
+            elif future.exception() is not None:
+                statuses[name] = f"failed: {future.exception()}"
+            else:
+                statuses[name] = "ready"
+        return statuses
+
+    def wait_all(self):
+        for future in self.futures.values():
+            future.exception()
+
+
+def gated(warmup, name, make_pipeline):
+    """Pipeline events, after waiting for resource `name`; make_pipeline gets the built resource."""
+    if not warmup.ready(name):
+        yield "status", "Waiting for resources to finish loading"
+    with span("warmup_wait"):
+        resource = warmup.result(name)
+    yield from make_pipeline(resource)
+
+
+if __name__ == "__main__":
+    print(f"{'module':<36}{'import ms':>10}")
+    for group, modules in (("top-level", APP_MODULES), ("lazy", LAZY_MODULES)):
+        print(f"-- {group}")
+        for module in modules:
+            ms = import_time_ms(module)
+            print(f"{module:<36}{'n/a' if ms is None else f'{ms:.0f}':>10}")
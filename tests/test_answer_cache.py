@@ -0,0 +1,120 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import answer_cache
+from answer_cache import AnswerCache, corpus_fingerprint
+
+VECTORS = {
+    "what is a consumer": [1.0, 0.0, 0.0],
+    "what is a consumer?": [0.99, 0.1, 0.0],  # cosine 0.995
+    "who is a consumer": [0.9, 0.43, 0.0],  # cosine 0.90
+    "what are goods": [0.0, 1.0, 0.0],
+}
+
+
+class StubEmbeddings:
+    def embed_query(self, text):
+        return VECTORS[text]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(answer_cache, "time", SimpleNamespace(time=clock.time, monotonic=clock.monotonic))
+    return clock
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    (tmp_path / "act.json").write_text("[]")
+    return tmp_path
+
+
+def cache(corpus, **kwargs):
+    return AnswerCache(StubEmbeddings(), [str(corpus)], **kwargs)
+
+
+def test_similar_questions_share_an_answer(clock, corpus):
+    answers = cache(corpus)
+    answers.store("hybrid", "what is a consumer", ["2", "35"], "answer")
+    assert answers.lookup("hybrid", "what is a consumer?", ["35", "2"]) == "answer"
+    assert answers.lookup("hybrid", "who is a consumer", ["2", "35"]) is None
+    assert answers.lookup("hybrid", "what are goods", ["2", "35"]) is None
+    assert answers.stats() == {"size": 1, "hits": 1, "misses": 2, "hit_rate": 1 / 3}
+
+
+def test_threshold_is_configurable(clock, corpus):
+    answers = cache(corpus, threshold=0.85)
+    answers.store("hybrid", "what is a consumer", ["2"], "answer")
+    assert answers.lookup("hybrid", "who is a consumer", ["2"]) == "answer"
+
+
+def test_bucket_is_pipeline_and_source_ids(clock, corpus):
+    answers = cache(corpus)
+    answers.store("hybrid", "what is a consumer", ["2", "35"], "hybrid answer")
+    answers.store("graph", "what is a consumer", ["2", "35"], "graph answer")
+    assert answers.lookup("graph", "what is a consumer", ["35", "2", "2"]) == "graph answer"
+    assert answers.lookup("hybrid", "what is a consumer", ["2"]) is None
+    assert answers.lookup("hybrid", "what is a consumer", ["2", "35", "47"]) is None
+
+
+def test_best_match_wins(clock, corpus):
+    answers = cache(corpus, threshold=0.85)
+    answers.store("hybrid", "who is a consumer", ["2"], "far")
+    answers.store("hybrid", "what is a consumer?", ["2"], "near")
+    assert answers.lookup("hybrid", "what is a consumer", ["2"]) == "near"
+
+
+def test_entries_expire_after_ttl(clock, corpus):
+    answers = cache(corpus, ttl_seconds=60)
+    answers.store("hybrid", "what is a consumer", ["2"], "answer")
+    clock.now += 60
+    assert answers.lookup("hybrid", "what is a consumer", ["2"]) == "answer"
+    clock.now += 1
+    assert answers.lookup("hybrid", "what is a consumer", ["2"]) is None
+    assert answers.stats()["size"] == 0
+
+
+def test_oldest_entries_are_dropped_past_max_entries(clock, corpus):
+    answers = cache(corpus, max_entries=2)
+    answers.store("hybrid", "what is a consumer", ["2"], "first")
+    answers.store("hybrid", "what are goods", ["2"], "second")
+    # a hit makes an entry the most recent
+    assert answers.lookup("hybrid", "what is a consumer", ["2"]) == "first"
+    answers.store("graph", "what are goods", ["2"], "third")
+    assert answers.stats()["size"] == 2
+    assert answers.lookup("hybrid", "what are goods", ["2"]) is None
+    assert answers.lookup("hybrid", "what is a consumer", ["2"]) == "first"
+
+
+def test_corpus_change_clears_the_cache_after_recheck_seconds(clock, corpus):
+    answers = cache(corpus, recheck_seconds=30)
+    answers.store("hybrid", "what is a consumer", ["2"], "answer")
+    (corpus / "act.json").write_text('[{"chapter_name": "CHAPTER I"}]')
+    # the corpus is not walked again until recheck_seconds have passed
+    assert answers.lookup("hybrid", "what is a consumer", ["2"]) == "answer"
+    clock.now += 30
+    assert answers.lookup("hybrid", "what is a consumer", ["2"]) is None
+    assert answers.stats()["size"] == 0
+
+
+def test_fingerprint_of_a_file_removed_mid_walk(tmp_path):
+    (tmp_path / "act.json").write_text("[]")
+    before = corpus_fingerprint([str(tmp_path)])
+    # listed by os.walk, gone by the time it is stat'ed
+    os.symlink(tmp_path / "removed.json", tmp_path / "dangling.json")
+    assert corpus_fingerprint([str(tmp_path)]) != before
+    assert corpus_fingerprint([str(tmp_path / "missing")]) == corpus_fingerprint([])
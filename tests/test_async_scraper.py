@@ -0,0 +1,83 @@
+import asyncio
+import json
+import os
+import socket
+
+import pytest
+
+import async_scraper
+from async_scraper import AsyncScraper, parse_act, scrape_acts
+from scraper_fixtures import FixtureServer, load_fixtures
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "indiacode")
+CPA = parse_act("/handle/123456789/15256")
+STATE_ACT = parse_act("/handle/123456789/2096,KAR,123456789/1501")
+
+
+@pytest.fixture
+def server():
+    with FixtureServer(load_fixtures(FIXTURES)) as fixture_server:
+        yield fixture_server
+
+
+def scrape(server, tmp_path, acts, **kwargs):
+    outputs = asyncio.run(scrape_acts(acts, str(tmp_path / "out"), base_url=server.base_url,
+                                      cache_dir=str(tmp_path / "cache"), rate=1000.0, **kwargs))
+    scraped = []
+    for output in outputs:
+        with open(output, encoding="utf-8") as f:
+            scraped.append(json.load(f))
+    return [os.path.basename(output) for output in outputs], scraped
+
+
+def test_scrapes_chapters_and_sections_in_order(server, tmp_path):
+    names, (cpa, state_act) = scrape(server, tmp_path, [CPA, STATE_ACT])
+    assert names == ["act_15256.json", "act_2096.json"]
+    assert [chapter["chapter_name"] for chapter in cpa] == ["CHAPTER I PRELIMINARY",
+                                                            "CHAPTER IV CONSUMER DISPUTES REDRESSAL COMMISSION"]
+    assert [section["title"] for section in cpa[0]["sections"]] == [
+        "1. Short title, extent, commencement and application.", "2. Definitions."]
+    assert cpa[0]["sections"][0]["content"] == ("(1) This Act may be called the Consumer Protection Act, 2019.\n"
+                                                "(2) It extends to the whole of India.")
+    assert cpa[1]["sections"][0]["url"].startswith(server.base_url + "/show-data?")
+    # the state Act's chapters are only found under its own abv and statehandle
+    assert state_act[0]["sections"][0]["content"] == "(1) This Act may be called the Karnataka Sample Act, 1999."
+    assert len(server.requests) == len(load_fixtures(FIXTURES))
+
+
+def test_wrong_publisher_finds_no_chapter_pages(server, tmp_path):
+    _, (state_act,) = scrape(server, tmp_path, [parse_act("/handle/123456789/2096")], retries=1)
+    assert state_act == [{"chapter_name": "CHAPTER I PRELIMINARY", "sections": []}]
+
+
+def test_second_run_revalidates_from_the_cache(server, tmp_path, capsys):
+    _, first = scrape(server, tmp_path, [CPA])
+    requests = len(server.requests)
+    _, second = scrape(server, tmp_path, [CPA])
+    assert second == first
+    # every URL was asked for again, conditionally, and answered 304
+    assert len(server.requests) == 2 * requests
+    assert f"'requests': {requests}, 'not_modified': {requests}," in capsys.readouterr().out.splitlines()[-1]
+
+
+def test_backs_off_between_attempts_but_not_after_the_last(tmp_path, monkeypatch, capsys):
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(async_scraper.asyncio, "sleep", sleep)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        # nothing listens here once the socket is closed, so every attempt is refused
+        url = f"http://127.0.0.1:{s.getsockname()[1]}/handle/123456789/15256"
+
+    async def fetch():
+        async with AsyncScraper(cache_dir=str(tmp_path), rate=1000.0, retries=3) as scraper:
+            return await scraper.fetch(url), scraper.stats
+
+    body, stats = asyncio.run(fetch())
+    assert body is None
+    assert (stats["requests"], stats["failed"]) == (3, 1)
+    assert sleeps == [0.5, 1.0]
+    assert capsys.readouterr().out.startswith(f"Failed to fetch {url}")
@@ -0,0 +1,147 @@
+import pytest
+
+from citations import CitationIndex, clause_paths, label
+from context_store import ContextStore, count_tokens
+
+
+def units(*texts):
+    return [{"text": text, "tokens": count_tokens(text)} for text in texts]
+
+
+# trimmed copies of the Act's sections, split the way parse_atomic_units splits them
+SECTIONS = {
+    "2": {"title": "Definitions.", "units": units(
+        '(1) "advertisement" means any audio or visual publicity;',
+        '(7) "consumer" means any person who --- (i) buys any goods; or (ii) hires or avails of any service;',
+        '(9) "consumer rights" includes,-- (i) the right to be protected against hazardous goods;',
+    )},
+    "34": {"title": "Jurisdiction of District Commission.", "units": units(
+        "(1) Subject to the other provisions of this Act, the District Commission shall have jurisdiction;",
+        "(2) A complaint shall be instituted in a District Commission within the local limits of whose jurisdiction,--",
+        "(a) the opposite party ordinarily resides; or",
+        "(b) the cause of action, wholly or in part, arises.",
+    )},
+    "35": {"title": "Manner in which complaint shall be made.", "units": units(
+        "(1) A complaint may be filed with a District Commission by--",
+        "(a) the consumer,--",
+        "(i) to whom such goods are sold;",
+        "(ii) who alleges unfair trade practice;",
+        "(b) any recognised consumer association;",
+        "(c) one or more consumers, where there are numerous consumers having the same interest;",
+        "(d) the Central Government or the State Government:",
+        "Provided that the complaint under this sub-section may be filed electronically.",
+        "(2) Every complaint filed under sub-section",
+        "(1) shall be accompanied with such fee as may be prescribed.",
+    )},
+    "47": {"title": "Jurisdiction of State Commission.", "units": units(
+        "(1) Subject to the other provisions of this Act, the State Commission shall have jurisdiction--",
+        "(a) to entertain complaints;",
+        "(b) to call for the records.",
+    )},
+    "60": {"title": "Clauses past (h).", "units": units(
+        "(1) The regulations may provide for--",
+        "(h) the eighth matter;",
+        "(i) the ninth matter;",
+        "(j) the tenth matter.",
+    )},
+}
+for section in SECTIONS.values():
+    section["text"] = " ".join(unit["text"] for unit in section["units"])
+
+
+@pytest.fixture(scope="module")
+def index():
+    return CitationIndex(ContextStore(SECTIONS))
+
+
+def cited(index, text):
+    refs, _ = index.parse(text)
+    return [label(ref) for ref in refs]
+
+
+def test_clause_paths_nest_markers_and_keep_provisos_and_cross_references_in_place():
+    assert clause_paths(SECTIONS["35"]["units"]) == [
+        ("1",), ("1", "a"), ("1", "a", "i"), ("1", "a", "ii"), ("1", "b"), ("1", "c"), ("1", "d"),
+        ("1",),  # the proviso belongs to its sub-section
+        ("2",), ("2",),  # "(1) shall be accompanied" is the tail of "under sub-section (1)"
+    ]
+
+
+def test_i_after_h_is_a_clause_unless_ii_follows():
+    assert clause_paths(SECTIONS["60"]["units"])[2] == ("1", "i")
+
+
+def test_definition_clause(index):
+    assert cited(index, "section 2(9)") == ["2(9)"]
+    assert index.units(index.parse("section 2(9)")[0]) == [("2", 2)]
+
+
+def test_descriptors_read_innermost_first(index):
+    refs, _ = index.parse("clause (c) of sub-section (1) of section 35")
+    assert [label(ref) for ref in refs] == ["35(1)(c)"]
+    assert index.units(refs) == [("35", 5)]
+
+
+def test_clause_without_its_sub_section(index):
+    assert cited(index, "section 35(c)") == ["35(1)(c)"]
+
+
+def test_inline_sub_clause_falls_back_to_its_unit(index):
+    assert cited(index, "section 2(7)(i)") == ["2(7)"]
+
+
+def test_listed_sections(index):
+    assert cited(index, "sections 34, 35 and 47") == ["34", "35", "47"]
+    assert cited(index, "Compare sections 34 and 35(2)") == ["34", "35(2)"]
+
+
+def test_only_plural_keyword_starts_a_list(index):
+    assert cited(index, "section 35 and 2 others") == ["35"]
+
+
+def test_whole_section_covers_every_unit(index):
+    refs, _ = index.parse("s. 35")
+    assert index.units(refs) == [("35", i) for i in range(len(SECTIONS["35"]["units"]))]
+
+
+@pytest.mark.parametrize("question", [
+    "What does section 35 say?",
+    "what is s. 2(9)",
+    "Explain the meaning of section 2(9) of the Consumer Protection Act",
+    "clause (c) of sub-section (1) of section 35",
+])
+def test_lookup_only(index, question):
+    refs, lookup_only = index.parse(question)
+    assert refs and lookup_only
+
+
+@pytest.mark.parametrize("question", [
+    "Who can file a complaint under section 35?",
+    "What fee is payable with a complaint under section 35(2)?",
+])
+def test_question_beyond_the_citation(index, question):
+    refs, lookup_only = index.parse(question)
+    assert refs and not lookup_only
+
+
+def test_other_acts_are_excluded(index):
+    assert index.parse("section 2 of the Indian Contract Act") == ([], False)
+    assert cited(index, "section 2 of the Consumer Protection Act") == ["2"]
+
+
+@pytest.mark.parametrize("question", ["what does section 500 say", "how do I file a complaint"])
+def test_no_citation(index, question):
+    assert index.parse(question) == ([], False)
+
+
+def test_graph_context_and_merge(index):
+    refs, _ = index.parse("section 35(1)(c)")
+    graph = {"sections": [{"title": "manner in which complaint shall be made.", "text": "...", "score": 0.9,
+                           "mentions": []},
+                          {"title": "other", "text": "...", "score": 0.8, "mentions": []}],
+             "definitions": [{"term": "consumer", "source": "definitions.", "definition": "...", "score": 0.7}]}
+    merged = index.merge_graph_context(graph, refs)
+    # the graph's lower-cased copy of the cited section is dropped, the rest follows the citation
+    assert [item["title"] for item in merged["sections"]] == ["Section 35(1)(c). Manner in which complaint shall be made.",
+                                                              "other"]
+    assert merged["definitions"] == graph["definitions"]
@@ -0,0 +1,60 @@
+from context_store import ContextStore, count_tokens
+
+
+def section(title, *texts):
+    units = [{"text": text, "tokens": count_tokens(text)} for text in texts]
+    return {"title": title, "chapter": "chapter i", "text": " ".join(texts),
+            "tokens": sum(unit["tokens"] for unit in units), "units": units}
+
+
+# every unit is 4 tokens
+SECTIONS = {
+    "1": section("Short title.", "one one one one", "two two two two", "three three three three",
+                 "four four four four", "five five five five"),
+    "2": section("Definitions.", "alpha alpha alpha alpha", "beta beta beta beta", "gamma gamma gamma gamma"),
+}
+
+
+def header_tokens(section_id):
+    return count_tokens(ContextStore(SECTIONS).header(section_id))
+
+
+def test_unbounded_pack_takes_whole_sections_in_match_order():
+    text, section_ids = ContextStore(SECTIONS).pack([("2", 1), ("1", 3)])
+    assert section_ids == ["2", "1"]
+    assert text == ("Section 2. Definitions.\n" + SECTIONS["2"]["text"] + "\n\n"
+                    "Section 1. Short title.\n" + SECTIONS["1"]["text"])
+
+
+def test_neighbours_come_before_the_rest_of_the_section():
+    # room for the header, the match and exactly two more units
+    store = ContextStore(SECTIONS, budget=header_tokens("1") + 12, neighbours=1)
+    text, section_ids = store.pack([("1", 2)])
+    assert section_ids == ["1"]
+    assert text == "Section 1. Short title.\n... two two two two three three three three four four four four ..."
+
+
+def test_budget_counts_units_and_headers():
+    # both headers and four 4-token units: the three matches, then the first neighbour that fits
+    budget = header_tokens("1") + header_tokens("2") + 16
+    text, section_ids = ContextStore(SECTIONS, budget=budget, neighbours=2).pack([("1", 0), ("2", 2), ("1", 4)])
+    assert section_ids == ["1", "2"]
+    assert text == ("Section 1. Short title.\none one one one two two two two ... five five five five\n\n"
+                    "Section 2. Definitions.\n... gamma gamma gamma gamma")
+
+
+def test_best_unit_goes_in_even_over_budget():
+    text, section_ids = ContextStore(SECTIONS, budget=1).pack([("2", 1), ("1", 0)])
+    assert section_ids == ["2"]
+    assert text == "Section 2. Definitions.\n... beta beta beta beta ..."
+
+
+def test_expand_false_packs_only_the_matches():
+    text, _ = ContextStore(SECTIONS, neighbours=2).pack([("1", 1), ("1", 3)], expand=False)
+    assert text == "Section 1. Short title.\n... two two two two ... four four four four ..."
+
+
+def test_unknown_sections_and_repeats_are_skipped():
+    text, section_ids = ContextStore(SECTIONS, budget=100).pack([("9", 0), ("2", 0), ("2", 0)])
+    assert section_ids == ["2"]
+    assert text.startswith("Section 2. Definitions.\nalpha")
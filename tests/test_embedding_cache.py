@@ -0,0 +1,53 @@
+import sqlite3
+
+from embedding_cache import EmbeddingCache
+
+
+def last_used(path):
+    with sqlite3.connect(path) as conn:
+        return dict(conn.execute("SELECT key, last_used FROM embeddings"))
+
+
+def test_hits_are_written_in_batches(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = EmbeddingCache(path, "model", flush_every=2, flush_seconds=3600)
+    cache.put("one", [1.0])
+    cache.put("two", [2.0])
+    before = last_used(path)
+
+    assert cache.get("One?") == [1.0]
+    assert last_used(path) == before
+    assert cache.get("two") == [2.0]
+    after = last_used(path)
+    assert all(after[key] > before[key] for key in before)
+    assert cache.get("three") is None
+    cache.close()
+
+
+def test_eviction_sees_unflushed_hits(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), "model", max_entries=2, flush_seconds=3600)
+    cache.put("one", [1.0])
+    cache.put("two", [2.0])
+    cache.get("one")
+    cache.put("three", [3.0])
+    assert cache.get("two") is None
+    assert cache.get("one") == [1.0] and cache.get("three") == [3.0]
+    assert cache.stats()["size"] == 2
+    cache.close()
+
+
+def test_size_counts_rows_from_other_processes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = EmbeddingCache(path, "model", max_entries=2)
+    second = EmbeddingCache(path, "model", max_entries=2)
+    first.put("one", [1.0])
+    second.put("one", [1.5])
+    second.put("two", [2.0])
+    # first only counted its own row, so it goes over max_entries once, then recounts before it evicts
+    first.put("three", [3.0])
+    first.put("four", [4.0])
+    assert first.get("one") is None and first.get("two") is None
+    assert first.stats()["size"] == 2
+    assert EmbeddingCache(path, "model").stats()["size"] == 2
+    first.close()
+    second.close()
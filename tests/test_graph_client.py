@@ -0,0 +1,130 @@
+import pytest
+
+import graph_client
+from metrics import LatencyHistogram
+
+
+def test_histogram_buckets_are_upper_bounds():
+    histogram = LatencyHistogram(buckets=(1, 10, 100, float("inf")))
+    for ms in (0.5, 1, 1.5, 10, 50, 20000):
+        histogram.observe(ms)
+    buckets, count, total_ms = histogram.cumulative()
+    assert buckets == [(1, 2), (10, 4), (100, 5), (float("inf"), 6)]
+    assert (count, total_ms) == (6, pytest.approx(20063.0))
+
+
+def test_histogram_percentiles_and_stats():
+    histogram = LatencyHistogram(buckets=(1, 10, 100, float("inf")))
+    assert histogram.percentile(50) == 0.0
+    for ms in (2, 3, 4, 5, 60):
+        histogram.observe(ms)
+    # the bucket's upper bound, or the slowest observation when that is lower
+    assert histogram.percentile(50) == 10
+    assert histogram.percentile(99) == 60
+    histogram.observe(20000)
+    assert histogram.percentile(100) == 20000
+    assert histogram.stats() == {"count": 6, "mean_ms": pytest.approx(20074 / 6), "p50_ms": 10, "p95_ms": 20000,
+                                 "p99_ms": 20000, "max_ms": 20000}
+
+
+class FakeRecord(dict):
+    def data(self):
+        return dict(self)
+
+
+class FakeTransaction:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, params):
+        self.driver.attempts += 1
+        if self.driver.errors:
+            raise self.driver.errors.pop(0)
+        return [FakeRecord(query=query, **params)]
+
+    def commit(self):
+        pass
+
+
+class FakeDriver:
+    """Raises the queued errors from tx.run, one per attempt, then answers."""
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.attempts = 0
+        self.sessions = []
+
+    def session(self, **kwargs):
+        self.sessions.append(kwargs)
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def begin_transaction(self, timeout=None):
+        self.timeout = timeout
+        return FakeTransaction(self)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def neo4j(monkeypatch):
+    neo4j = pytest.importorskip("neo4j")
+    sleeps = []
+    monkeypatch.setattr(graph_client.time, "sleep", sleeps.append)
+    neo4j.sleeps = sleeps
+    return neo4j
+
+
+def managed(neo4j, monkeypatch, errors=(), **kwargs):
+    driver = FakeDriver(errors)
+    monkeypatch.setattr(neo4j.GraphDatabase, "driver", lambda uri, auth=None, **config: driver)
+    return graph_client.ManagedGraph("bolt://fake", "neo4j", "secret", database="cpa", **kwargs), driver
+
+
+def test_transient_error_is_retried_with_jittered_backoff(neo4j, monkeypatch):
+    from neo4j.exceptions import TransientError
+
+    graph, driver = managed(neo4j, monkeypatch, [TransientError("deadlock")], backoff=0.2, query_timeout=7.0)
+    rows = graph.query("RETURN $x", {"x": 1}, name="lookup")
+    assert rows == [{"query": "RETURN $x", "x": 1}]
+    assert driver.attempts == 2
+    assert driver.timeout == 7.0
+    assert {session["database"] for session in driver.sessions} == {"cpa"}
+    assert len(neo4j.sleeps) == 1 and 0.1 <= neo4j.sleeps[0] <= 0.3
+    stats = graph.stats()["lookup"]
+    assert (stats["count"], stats["retries"], stats["failures"]) == (1, 1, 0)
+
+
+def test_backoff_doubles_until_retries_run_out(neo4j, monkeypatch):
+    from neo4j.exceptions import ServiceUnavailable
+
+    errors = [ServiceUnavailable("down") for _ in range(3)]
+    graph, driver = managed(neo4j, monkeypatch, errors, max_retries=2, backoff=0.2)
+    with pytest.raises(ServiceUnavailable):
+        graph.query("RETURN 1", name="lookup")
+    assert driver.attempts == 3
+    first, second = neo4j.sleeps
+    assert 0.1 <= first <= 0.3 and 0.2 <= second <= 0.6
+    assert graph.retries["lookup"] == 2 and graph.failures["lookup"] == 1
+    # a failed query is not timed
+    assert "lookup" not in graph.stats()
+
+
+def test_other_errors_are_not_retried(neo4j, monkeypatch):
+    graph, driver = managed(neo4j, monkeypatch, [ValueError("bad parameter")])
+    with pytest.raises(ValueError):
+        graph.query("RETURN 1")
+    assert driver.attempts == 1 and neo4j.sleeps == []
+    assert graph.failures["adhoc"] == 1
@@ -0,0 +1,32 @@
+from types import SimpleNamespace
+
+from graph_ingest import clean_rel_type, graph_rows
+
+
+def node(node_id, node_type):
+    return SimpleNamespace(id=node_id, type=node_type, properties={})
+
+
+def test_relationship_types_are_normalized_like_add_graph_documents():
+    assert clean_rel_type("Liable for") == "LIABLE_FOR"
+    assert clean_rel_type("LIABLE_FOR") == "LIABLE_FOR"
+    assert clean_rel_type("appeals `to`") == "APPEALS_TO"
+
+
+def test_graph_rows_clean_ids_and_merge_relationship_types():
+    manufacturer, liability = node(" Product Manufacturer", "Actor"), node("Product Liability ", "Violation")
+    graph_doc = SimpleNamespace(nodes=[manufacturer, liability], relationships=[
+        SimpleNamespace(source=node("product manufacturer", "Actor"), target=node("PRODUCT LIABILITY", "Violation"),
+                        type="Liable for", properties={}),
+        SimpleNamespace(source=manufacturer, target=liability, type="LIABLE_FOR", properties={"since": "2019"}),
+    ])
+    nodes, rels, anchors = graph_rows(graph_doc, "Section", "84", "CONTAINS")
+    assert {label: list(by_id) for label, by_id in nodes.items()} == {
+        "Actor": ["product manufacturer"], "Violation": ["product liability"]}
+    assert list(rels) == [("Actor", "LIABLE_FOR", "Violation")]
+    assert rels[("Actor", "LIABLE_FOR", "Violation")] == [
+        {"source": "product manufacturer", "target": "product liability", "properties": {}, "anchor": "Section:84"},
+        {"source": "product manufacturer", "target": "product liability", "properties": {"since": "2019"},
+         "anchor": "Section:84"},
+    ]
+    assert anchors[("Section", "CONTAINS", "Actor")] == [{"anchor": "84", "id": "product manufacturer"}]
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from graph_snapshot import GraphSnapshot, csr, write_snapshot
+
+SECTIONS = [
+    {"id": "1", "title": "short title.", "text": "one", "embedding": [1.0, 0.0, 0.0]},
+    {"id": "2", "title": "definitions.", "text": "two", "embedding": [0.0, 1.0, 0.0]},
+    # not normalized: written as [1, 1, 0] / sqrt(2)
+    {"id": "3", "title": "authority.", "text": "three", "embedding": [2.0, 2.0, 0.0]},
+]
+CONCEPTS = [
+    {"id": "consumer", "definition": "any person who buys", "source": "definitions.", "embedding": [0.0, 0.0, 1.0]},
+    {"id": "goods", "definition": "every kind of movable property", "source": "definitions.",
+     "embedding": [1.0, 0.0, 0.0]},
+]
+# out of source order, with one edge from an unknown section
+EDGES = [
+    {"source": "1", "source_label": "Section", "type": "CONTAINS", "id": "district commission", "label": "Authority"},
+    {"source": "3", "source_label": "Section", "type": "CONTAINS", "id": "district commission", "label": "Authority"},
+    {"source": "1", "source_label": "Section", "type": "CONTAINS", "id": "complaint", "label": "Remedy"},
+    {"source": "consumer", "source_label": "LegalConcept", "type": "MENTIONS", "id": "goods", "label": "Category"},
+    {"source": "1", "source_label": "Section", "type": "CONTAINS", "id": "penalty", "label": "Penalty"},
+    {"source": "99", "source_label": "Section", "type": "CONTAINS", "id": "stray", "label": "Actor"},
+]
+
+
+@pytest.fixture(scope="module")
+def snapshot(tmp_path_factory):
+    snapshot_dir = str(tmp_path_factory.mktemp("snapshot"))
+    write_snapshot(SECTIONS, CONCEPTS, EDGES, snapshot_dir, source="test")
+    return GraphSnapshot(snapshot_dir)
+
+
+def test_csr_groups_rows_and_keeps_column_order():
+    indptr, indices = csr([(2, 5), (0, 1), (2, 3), (0, 4)], 4)
+    assert indptr.tolist() == [0, 2, 2, 4, 4]
+    assert indices.tolist() == [1, 4, 5, 3]
+
+
+def test_meta_counts(snapshot):
+    assert {key: snapshot.meta[key] for key in ("sections", "concepts", "entities", "contains", "mentions")} == {
+        "sections": 3, "concepts": 2, "entities": 5, "contains": 4, "mentions": 1}
+
+
+def test_scores_are_half_one_plus_cosine(snapshot):
+    context = snapshot.context([3.0, 0.0, 0.0], k=5, threshold=0.0)
+    assert [s["title"] for s in context["sections"]] == ["short title.", "authority.", "definitions."]
+    assert [s["score"] for s in context["sections"]] == pytest.approx([1.0, (1 + np.sqrt(0.5)) / 2, 0.5])
+    assert [d["term"] for d in context["definitions"]] == ["goods", "consumer"]
+    assert [d["score"] for d in context["definitions"]] == pytest.approx([1.0, 0.5])
+    assert context["definitions"][0] == {"type": "definition", "term": "goods",
+                                         "definition": "every kind of movable property", "score": 1.0,
+                                         "source": "definitions."}
+
+
+def test_threshold_and_k(snapshot):
+    context = snapshot.context([1.0, 0.0, 0.0], k=5, threshold=0.6)
+    assert [s["title"] for s in context["sections"]] == ["short title.", "authority."]
+    assert [d["term"] for d in context["definitions"]] == ["goods"]
+    context = snapshot.context([1.0, 0.0, 0.0], k=1, threshold=0.0)
+    assert [s["title"] for s in context["sections"]] == ["short title."]
+    assert [d["term"] for d in context["definitions"]] == ["goods"]
+    assert snapshot.context([-1.0, -1.0, -1.0], k=5, threshold=0.9) == {"sections": [], "definitions": []}
+
+
+def test_mentions_follow_contains_edges_up_to_max_entities(snapshot):
+    sections = {s["title"]: s["mentions"]
+                for s in snapshot.context([1.0, 1.0, 0.0], k=3, threshold=0.0, max_entities=5)["sections"]}
+    assert sections == {
+        "short title.": ["district commission (Authority)", "complaint (Remedy)", "penalty (Penalty)"],
+        "authority.": ["district commission (Authority)"],
+        "definitions.": [],
+    }
+    (first,) = snapshot.context([1.0, 0.0, 0.0], k=1, threshold=0.0, max_entities=2)["sections"]
+    assert first["mentions"] == ["district commission (Authority)", "complaint (Remedy)"]
+
+
+def test_concept_mentions(snapshot):
+    assert snapshot.neighbours(snapshot.mentions, 0) == ["goods (Category)"]
+    assert snapshot.neighbours(snapshot.mentions, 1) == []
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from langchain_classic.retrievers import EnsembleRetriever
+from langchain_core.documents import Document
+
+from benchmarks.stand_ins import HashingEmbeddings
+from bm25_index import BM25Index, BM25IndexRetriever, build_bm25_index
+from dense_index import DenseIndex, DenseIndexRetriever, build_dense_index
+from hybrid_retriever import FusedHybridRetriever
+
+TEXTS = [
+    "A consumer may file a complaint with the District Commission.",
+    "The District Commission shall have jurisdiction over complaints up to one crore rupees.",
+    "An appeal against an order of the District Commission lies to the State Commission.",
+    "The State Commission hears complaints above one crore and up to ten crore rupees.",
+    "An appeal against an order of the State Commission lies to the National Commission.",
+    "The National Commission hears complaints above ten crore rupees.",
+    "Product liability action may be brought against a product manufacturer.",
+    "A product seller is liable for a defective product in certain cases.",
+    "Unfair trade practice includes false representation about goods or services.",
+    "The Central Authority may order a recall of goods that are dangerous.",
+    "Misleading advertisement may attract a penalty imposed by the Central Authority.",
+    "A complaint shall be accompanied with the prescribed fee.",
+]
+QUERIES = [
+    "complaint to the District Commission",
+    "appeal against an order of the commission",
+    "complaint to a commission above one crore rupees",
+]
+DEPTH = 4
+
+
+@pytest.fixture(scope="module")
+def indexes(tmp_path_factory):
+    root = tmp_path_factory.mktemp("indexes")
+    docs = [Document(page_content=text, metadata={"parent_section_id": str(i // 2), "chunk_index": i % 2})
+            for i, text in enumerate(TEXTS)]
+    embeddings = HashingEmbeddings()
+    build_bm25_index(docs, str(root / "bm25"))
+    # the dense index in the reverse order, as Chroma exports rows in its own order
+    build_dense_index(docs[::-1], embeddings, str(root / "dense"))
+    return BM25Index(str(root / "bm25")), DenseIndex(str(root / "dense")), embeddings
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_rrf_matches_ensemble_retriever(indexes, query):
+    bm25_index, dense_index, embeddings = indexes
+    # the fused retriever drops zero-score BM25 rows; the ensemble keeps them, so the queries match enough rows
+    assert (bm25_index.scores(query) > 0).sum() >= DEPTH
+
+    ensemble = EnsembleRetriever(retrievers=[BM25IndexRetriever(index=bm25_index, k=DEPTH),
+                                             DenseIndexRetriever(index=dense_index, embeddings=embeddings, k=DEPTH)],
+                                 weights=[0.5, 0.5])
+    fused = FusedHybridRetriever(bm25_index=bm25_index, dense_index=dense_index, embeddings=embeddings,
+                                 k=2 * DEPTH, candidate_depth=DEPTH, fusion="rrf")
+    expected = [doc.page_content for doc in ensemble.invoke(query)]
+    assert [doc.page_content for doc in fused.invoke(query)] == expected
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_weighted_fusion_matches_min_max_reference(indexes, query):
+    bm25_index, dense_index, embeddings = indexes
+    fused = FusedHybridRetriever(bm25_index=bm25_index, dense_index=dense_index, embeddings=embeddings,
+                                 k=5, fusion="weighted", weights=(0.3, 0.7))
+
+    bm25 = bm25_index.scores(query)
+    by_text = {doc["page_content"]: i for i, doc in enumerate(dense_index.docs)}
+    dense = dense_index.scores(embeddings.embed_query(query))[[by_text[text] for text in TEXTS]]
+    reference = (0.3 * (bm25 - bm25.min()) / (bm25.max() - bm25.min())
+                 + 0.7 * (dense - dense.min()) / (dense.max() - dense.min()))
+
+    top, scores = fused.search(query)
+    assert list(top) == list(np.argsort(-reference, kind="stable")[:5])
+    np.testing.assert_allclose(scores, reference[top], rtol=1e-5)
+
+
+def test_units_and_parents_follow_the_ranking(indexes):
+    bm25_index, dense_index, embeddings = indexes
+    fused = FusedHybridRetriever(bm25_index=bm25_index, dense_index=dense_index, embeddings=embeddings, k=4)
+    units = fused.matched_units(QUERIES[0])
+    assert units == [(doc.metadata["parent_section_id"], doc.metadata["chunk_index"])
+                     for doc in fused.invoke(QUERIES[0])]
+    assert fused.parent_section_ids(QUERIES[0]) == list(dict.fromkeys(p_id for p_id, _ in units))
+
+
+def test_indexes_over_different_documents_are_rejected(indexes, tmp_path):
+    bm25_index, _, embeddings = indexes
+    build_dense_index([Document(page_content="other", metadata={"parent_section_id": "99", "chunk_index": 0})],
+                      embeddings, str(tmp_path / "dense"))
+    with pytest.raises(ValueError, match="different documents"):
+        FusedHybridRetriever(bm25_index=bm25_index, dense_index=DenseIndex(str(tmp_path / "dense")),
+                             embeddings=embeddings)
+
+
+def test_missing_dense_index_says_how_to_build_it(tmp_path):
+    with pytest.raises(FileNotFoundError, match="python incremental_index.py dense"):
+        DenseIndex(str(tmp_path / "dense_index"))
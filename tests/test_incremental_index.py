@@ -0,0 +1,166 @@
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+import incremental_index
+from benchmarks.stand_ins import HashingEmbeddings
+from dense_index import DenseIndex
+from graph_ingest import load_units
+from incremental_index import (DELETE_ORPHANS, DETACH_EXTRACTED_RELS, DETACH_SECTION_ENTITIES, content_hash, diff,
+                               load_manifest, save_manifest, unit_id, update_dense, update_neo4j)
+
+SOURCE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "cpa_anchored_refined_v2.json")
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+def child(section_id, chunk_index, text):
+    return Document(page_content=text, metadata={"parent_section_id": section_id, "chunk_index": chunk_index,
+                                                 "doc_type": "child"})
+
+
+def test_diff_reports_changed_added_and_removed_keys():
+    old = {"1:0": "a", "1:1": "b", "2:0": "c"}
+    new = {"1:0": "a", "1:1": "B", "3:0": "d"}
+    assert diff(old, new) == (["1:1", "3:0"], ["2:0"])
+    assert diff({}, new) == (list(new), [])
+
+
+def test_content_hash_and_unit_id():
+    assert content_hash("text", {"b": 1, "a": 2}) == content_hash("text", {"a": 2, "b": 1})
+    # the parts are delimited, so moving text between them changes the hash
+    assert content_hash("ab", "c") != content_hash("a", "bc")
+    assert unit_id({"parent_section_id": "35", "chunk_index": 2}) == "35:2"
+
+
+def test_manifest_round_trip(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    assert load_manifest(path) == {}
+    manifest = {"dense": {"1:0": "a"}, "neo4j": {"sections": {"1": "b"}, "definitions": {}}}
+    save_manifest(manifest, path)
+    assert load_manifest(path) == manifest
+    assert not os.path.exists(path + ".tmp")
+
+
+@pytest.mark.parametrize("dtype", ["float32", "int8"])
+def test_update_dense_reembeds_only_changed_units(tmp_path, monkeypatch, dtype):
+    monkeypatch.setattr(incremental_index, "DENSE_PATH", str(tmp_path / "dense"))
+    children = [child("1", 0, "short title"), child("1", 1, "extent"), child("2", 0, "definitions")]
+    embeddings = CountingEmbeddings()
+    manifest, embedded, removed = update_dense(children, {}, embeddings)
+    assert (embedded, removed) == (3, 0)
+    if dtype != "float32":
+        index = DenseIndex(str(tmp_path / "dense"))
+        incremental_index.write_dense_index(index.vectors, children, str(tmp_path / "dense"), dtype)
+
+    embeddings.embedded.clear()
+    children = [child("1", 0, "short title"), child("1", 1, "extent and commencement"), child("3", 0, "new")]
+    manifest, embedded, removed = update_dense(children, manifest, embeddings)
+    assert (embedded, removed) == (2, 1)
+    assert embeddings.embedded == ["extent and commencement", "new"]
+    assert manifest == {unit_id(doc.metadata): content_hash(doc.page_content, doc.metadata) for doc in children}
+
+    index = DenseIndex(str(tmp_path / "dense"))
+    assert index.meta["dtype"] == dtype
+    assert [doc["page_content"] for doc in index.docs] == [doc.page_content for doc in children]
+    # the reused row is the vector embedded on the first run
+    vectors = np.asarray(index.vectors, dtype=np.float32)
+    if index.scales is not None:
+        vectors = vectors * index.scales[:, None]
+    expected = np.asarray(HashingEmbeddings().embed_documents([doc.page_content for doc in children]))
+    np.testing.assert_allclose(vectors, expected, atol=1e-2 if dtype == "int8" else 1e-6)
+
+
+class FakeResult(list):
+    def consume(self):
+        return None
+
+
+class FakeTransaction:
+    def __init__(self, queries):
+        self.queries = queries
+
+    def run(self, query, **params):
+        self.queries.append((query, params))
+        if query == DETACH_SECTION_ENTITIES:
+            # every section had one entity
+            return FakeResult({"node": f"entity-of-{sid}"} for sid in params["ids"])
+        return FakeResult()
+
+
+class FakeDriver:
+    def __init__(self):
+        self.queries = []
+
+    def session(self, database=None):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_write(self, work):
+        return work(FakeTransaction(self.queries))
+
+
+class FailingTransformer:
+    """Extracts one Provision node per text, and fails on the texts containing `fail_on`."""
+
+    def __init__(self, fail_on):
+        self.fail_on = fail_on
+
+    def convert_to_graph_documents(self, documents):
+        text = documents[0].page_content
+        if self.fail_on in text:
+            raise RuntimeError("quota exceeded")
+        node = SimpleNamespace(id=text[:20], type="Provision", properties={})
+        return [SimpleNamespace(nodes=[node], relationships=[])]
+
+
+def test_failed_extraction_keeps_the_old_entities_and_hash(monkeypatch):
+    monkeypatch.setattr(incremental_index, "SOURCE", SOURCE)
+    sections, definitions = load_units(SOURCE)
+    old = {"sections": {s["sid"]: content_hash(s) for s in sections},
+           "definitions": {d["term"]: content_hash(d) for d in definitions}}
+    failing, updated = sections[34], sections[35]
+    old["sections"][failing["sid"]] = old["sections"][updated["sid"]] = "stale"
+    del old["sections"]["1"]
+
+    driver = FakeDriver()
+    new, changed, removed = update_neo4j(old, driver, HashingEmbeddings(), FailingTransformer(failing["text"][:40]),
+                                         requests_per_minute=60000)
+    assert (changed, removed) == (3, 0)
+    # the failed section keeps its stale hash, so the next run retries it
+    assert new["sections"][failing["sid"]] == "stale"
+    assert new["sections"][updated["sid"]] == content_hash(updated)
+    assert new["sections"]["1"] == content_hash(sections[0])
+    (detached,) = [params["ids"] for query, params in driver.queries if query == DETACH_SECTION_ENTITIES]
+    assert sorted(detached) == sorted(["1", updated["sid"]])
+    (rels,) = [params for query, params in driver.queries if query == DETACH_EXTRACTED_RELS]
+    assert sorted(rels["nodes"]) == sorted(["entity-of-1", f"entity-of-{updated['sid']}"])
+    assert sorted(rels["anchors"]) == sorted(["Section:1", f"Section:{updated['sid']}"])
+    (orphans,) = [params for query, params in driver.queries if query == DELETE_ORPHANS]
+    assert sorted(orphans["nodes"]) == sorted(rels["nodes"])
+
+
+def test_failed_new_section_is_left_out_of_the_manifest(monkeypatch):
+    monkeypatch.setattr(incremental_index, "SOURCE", SOURCE)
+    sections, definitions = load_units(SOURCE)
+    old = {"sections": {s["sid"]: content_hash(s) for s in sections[1:]},
+           "definitions": {d["term"]: content_hash(d) for d in definitions}}
+    new, _, _ = update_neo4j(old, FakeDriver(), HashingEmbeddings(), FailingTransformer(sections[0]["text"][:40]),
+                             requests_per_minute=60000)
+    assert sections[0]["sid"] not in new["sections"]
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from dense_index import DenseIndex
+from local_embeddings import (LOCAL_MODEL_DIR, MIN_COSINE_P01, MIN_TOP5_OVERLAP, LocalEmbeddings, build_embeddings,
+                              parity, parity_sample, search_overlap)
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+MODEL_DIR = os.path.join(ROOT, LOCAL_MODEL_DIR)
+DENSE_DIR = os.path.join(ROOT, "dense_index")
+
+# the same check as `python local_embeddings.py parity`, against the fp32 vectors of ./dense_index
+pytestmark = [
+    pytest.mark.skipif(not os.path.isdir(MODEL_DIR), reason="no exported model (python local_embeddings.py export)"),
+    pytest.mark.skipif(not os.path.exists(os.path.join(DENSE_DIR, "meta.json")), reason="no ./dense_index"),
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    index = DenseIndex(DENSE_DIR)
+    if index.meta["dtype"] != "float32":
+        pytest.skip("parity needs a float32 ./dense_index as the reference")
+    return index
+
+
+@pytest.fixture(scope="module")
+def local():
+    pytest.importorskip("optimum.onnxruntime")
+    return LocalEmbeddings(MODEL_DIR)
+
+
+def test_int8_document_vectors_match_fp32(index, local):
+    sample = parity_sample(index)
+    stats = parity(local, index.vectors[sample], [index.docs[i]["page_content"] for i in sample])
+    assert stats["p01"] >= MIN_COSINE_P01
+
+
+def test_int8_queries_find_the_fp32_top5(index, local):
+    pytest.importorskip("langchain_huggingface")
+    from benchmarks.golden import QUESTIONS
+
+    reference = build_embeddings("hf").embed_documents(QUESTIONS)
+    assert search_overlap(index, local.embed_documents(QUESTIONS), reference) >= MIN_TOP5_OVERLAP
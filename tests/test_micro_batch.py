@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+
+from micro_batch import MicroBatcher
+from request_scheduler import RequestScheduler
+
+
+class CountingEncode:
+    """Upper-cases its items, records every batch, and fails on items starting with "bad"."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        if any(item.startswith("bad") for item in items):
+            raise ValueError(f"cannot encode {items}")
+        return [item.upper() for item in items]
+
+
+def test_batches_fill_up_to_max_batch():
+    encode = CountingEncode()
+    # max_wait_ms is far longer than the test, so only max_batch and close() end a batch
+    batcher = MicroBatcher(encode, max_batch=3, max_wait_ms=60_000)
+    futures = [batcher.submit(text) for text in "abcdefg"]
+    batcher.close(timeout=5)
+    assert [future.result(timeout=0) for future in futures] == list("ABCDEFG")
+    assert encode.batches == [["a", "b", "c"], ["d", "e", "f"], ["g"]]
+    stats = batcher.stats()
+    assert (stats["batches"], stats["items"], stats["batch_sizes"]) == (3, 7, {1: 1, 3: 2})
+
+
+def test_lone_item_is_flushed_after_max_wait():
+    encode = CountingEncode()
+    batcher = MicroBatcher(encode, max_batch=32, max_wait_ms=10)
+    assert batcher("a") == "A"
+    assert encode.batches == [["a"]]
+    batcher.close(timeout=5)
+
+
+def test_error_reaches_only_its_own_future():
+    encode = CountingEncode()
+    batcher = MicroBatcher(encode, max_batch=3, max_wait_ms=60_000)
+    good, bad, other = batcher.submit("a"), batcher.submit("bad"), batcher.submit("c")
+    assert good.result(timeout=5) == "A" and other.result(timeout=5) == "C"
+    with pytest.raises(ValueError, match="bad"):
+        bad.result(timeout=5)
+    # the failed batch is retried item by item
+    assert encode.batches == [["a", "bad", "c"], ["a"], ["bad"], ["c"]]
+    batcher.close(timeout=5)
+
+
+def test_close_stops_the_worker_and_refuses_new_items():
+    batcher = MicroBatcher(CountingEncode(), name="embeddings")
+    batcher.close(timeout=5)
+    assert not batcher._thread.is_alive()
+    with pytest.raises(RuntimeError, match="embeddings is closed"):
+        batcher.submit("a")
+    batcher.close(timeout=5)
+
+
+def test_close_waits_for_the_batch_in_flight():
+    started, release = threading.Event(), threading.Event()
+
+    def slow(items):
+        started.set()
+        release.wait(5)
+        return items
+
+    batcher = MicroBatcher(slow, max_batch=1)
+    future = batcher.submit("a")
+    started.wait(5)
+    queued = batcher.submit("b")
+    closer = threading.Thread(target=batcher.close, kwargs={"timeout": 5})
+    closer.start()
+    release.set()
+    closer.join(5)
+    assert (future.result(timeout=0), queued.result(timeout=0)) == ("a", "b")
+
+
+class CountingClient:
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+
+def test_scheduler_embeds_each_distinct_query_once_per_batch():
+    client = CountingClient()
+    scheduler = RequestScheduler(max_batch=3, max_wait_ms=60_000)
+    embeddings = scheduler.embeddings(client)
+    futures = [embeddings.batcher.submit(text) for text in ("consumer", "goods", "consumer")]
+    scheduler.close()
+    assert [future.result(timeout=0) for future in futures] == [[8.0], [5.0], [8.0]]
+    assert client.calls == [["consumer", "goods"]]
+    assert scheduler.stats()["embed"]["batches"] == 1
@@ -0,0 +1,93 @@
+import threading
+import time
+from contextlib import closing
+
+import pytest
+
+from pipelines import run_pipelines
+
+
+def failing():
+    yield "status", "Retrieving"
+    raise RuntimeError("graph unavailable")
+
+
+def llm_stream(log, name):
+    try:
+        yield from ("a", "b", "c")
+    finally:
+        log.append(f"{name} stream closed")
+
+
+def answering(log, name, gate=None):
+    """Streams three tokens from its LLM stream; with a gate, waits for it after the first one."""
+    try:
+        yield "status", "Generating the answer"
+        with closing(llm_stream(log, name)) as chunks:
+            for i, chunk in enumerate(chunks):
+                if i and gate is not None:
+                    gate.wait(5)
+                yield "token", chunk
+    except GeneratorExit:
+        log.append(f"{name} closed")
+        raise
+
+
+def by_name(events):
+    grouped = {}
+    for name, kind, payload in events:
+        grouped.setdefault(name, []).append((kind, payload))
+    return grouped
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize("concurrent", [True, False])
+def test_every_pipeline_ends_with_done_and_errors_become_events(concurrent):
+    log = []
+    events = by_name(run_pipelines({"graph": failing(), "hybrid": answering(log, "hybrid")}, concurrent=concurrent))
+
+    (status, error, done) = events["graph"]
+    assert status == ("status", "Retrieving")
+    assert error[0] == "error" and isinstance(error[1], RuntimeError)
+    assert done[0] == "done" and done[1] >= 0
+
+    assert events["hybrid"][:-1] == [
+        ("status", "Generating the answer"), ("token", "a"), ("token", "b"), ("token", "c")]
+    assert events["hybrid"][-1][0] == "done"
+    assert log == ["hybrid stream closed"]
+
+
+def test_sequential_runs_pipelines_in_order():
+    log = []
+    events = run_pipelines({"hybrid": answering(log, "hybrid"), "graph": failing()}, concurrent=False)
+    names = [name for name, _, _ in events]
+    assert names == ["hybrid"] * 5 + ["graph"] * 3
+
+
+def test_closing_cancels_the_running_pipelines_sequential():
+    log = []
+    events = run_pipelines({"hybrid": answering(log, "hybrid"), "graph": answering(log, "graph")}, concurrent=False)
+    assert next(events) == ("hybrid", "status", "Generating the answer")
+    assert next(events) == ("hybrid", "token", "a")
+    events.close()
+    # the started pipeline and its LLM stream are closed; the one not started yet never runs
+    assert log == ["hybrid stream closed", "hybrid closed"]
+
+
+def test_closing_cancels_the_running_pipelines_concurrent():
+    log = []
+    gate = threading.Event()
+    events = run_pipelines({"hybrid": answering(log, "hybrid", gate)}, concurrent=True)
+    assert next(events) == ("hybrid", "status", "Generating the answer")
+    assert next(events) == ("hybrid", "token", "a")
+    events.close()
+    # the worker is closed at its next event, which closes the LLM stream it is reading
+    gate.set()
+    wait_for(lambda: "hybrid closed" in log)
+    assert log == ["hybrid stream closed", "hybrid closed"]